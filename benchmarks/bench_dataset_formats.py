@@ -0,0 +1,49 @@
+"""
+Load-time benchmark for the cleaned food and workout datasets in each output format
+
+Run from the repository root:
+    python -m benchmarks.bench_dataset_formats
+"""
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from diet_workout_planning.utils.dataset_io import (
+    ColumnarDataset, iter_ndjson, load_dataframe, load_records, write_dataset
+)
+
+DATASETS = {
+    "foods": "data/foods_cleaned_with_portion.json",
+    "workouts": "data/workouts_cleaned.json",
+}
+
+
+def best_time(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, path in DATASETS.items():
+            df = pd.read_json(path)
+            ndjson_path = os.path.join(tmp, f"{name}.ndjson")
+            columnar_path = os.path.join(tmp, f"{name}.cols")
+            write_dataset(df, ndjson_path, "ndjson")
+            write_dataset(df, columnar_path, "columnar")
+
+            print(f"{name} ({len(df)} rows)")
+            print(f"  json       load_records   {best_time(lambda: load_records(path)):8.2f} ms")
+            print(f"  json       load_dataframe {best_time(lambda: load_dataframe(path)):8.2f} ms")
+            print(f"  ndjson     load_records   {best_time(lambda: load_records(ndjson_path)):8.2f} ms")
+            print(f"  ndjson     first record   {best_time(lambda: next(iter_ndjson(ndjson_path))):8.2f} ms")
+            print(f"  columnar   load_records   {best_time(lambda: load_records(columnar_path)):8.2f} ms")
+            print(f"  columnar   load_dataframe {best_time(lambda: load_dataframe(columnar_path)):8.2f} ms")
+            first_column = df.columns[0]
+            print(f"  columnar   mmap 1 column  {best_time(lambda: ColumnarDataset(columnar_path).column(first_column)):8.2f} ms")
@@ -0,0 +1,43 @@
+"""
+Load-time and memory benchmark for the food catalog
+
+Run from the repository root:
+    python -m benchmarks.bench_food_catalog
+"""
+import time
+import tracemalloc
+
+from diet_workout_planning.diet.data_loader import get_food_data, get_combined_food_data
+from diet_workout_planning.diet.food_model import FoodDatabase
+
+
+def measure(label, func, repeat=3):
+    """Print the best wall time and the peak traced memory of func()"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<40} {best * 1000:8.1f} ms   peak {peak / 2**20:7.1f} MiB")
+    return result
+
+
+def build_database(df):
+    food_db = FoodDatabase()
+    food_db.load_from_dataframe(df)
+    return food_db
+
+
+if __name__ == "__main__":
+    foundation = measure("get_food_data (Foundation)", get_food_data)
+    combined = measure("get_combined_food_data", get_combined_food_data)
+    print(f"Foundation foods: {len(foundation)}, combined foods: {len(combined)}")
+
+    measure("FoodDatabase (Foundation)", lambda: build_database(foundation))
+    measure("FoodDatabase (combined)", lambda: build_database(combined))
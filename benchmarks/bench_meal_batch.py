@@ -0,0 +1,97 @@
+"""
+Users per second of the daily meal plan fill: per-call load and sort vs preprocessed single and batch calls,
+and the knapsack engine
+
+Run from the repository root:
+    python -m benchmarks.bench_meal_batch
+"""
+import os
+import random
+import sys
+import time
+
+# generate_meals and its siblings are scripts that import each other by bare module name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "diet_workout_planning"))
+
+from diet_workout_planning.utils.dataset_io import load_records
+from food_ranking import get_ranked_foods
+from generate_meals import generate_daily_meal_plan, generate_daily_meal_plans
+from user_profile import UserProfile
+
+FOOD_FILE = "data/foods_cleaned_with_portion.json"
+NUM_USERS = 10_000
+RESTRICTIONS = ["pork", "beef", "chicken", "milk", "cheese", "egg", "fish", "nuts", "bread", "oil"]
+
+
+def generate_daily_meal_plan_per_call(user: UserProfile, food_file=FOOD_FILE):
+    """The previous implementation: load and sort the foods on every call"""
+    foods = load_records(food_file)
+
+    calorie_target = user.daily_calories()
+    total_cal = 0
+    total_protein = 0
+    total_fiber = 0
+    meals = []
+
+    sorted_foods = sorted(foods, key=lambda x: x["protein"] / (x["calories"] + 1), reverse=True)
+
+    for food in sorted_foods:
+        if any(restriction.lower() in food['name'].lower() for restriction in user.dietary_restrictions):
+            continue
+
+        if total_cal + food["calories"] <= calorie_target:
+            meals.append(food)
+            total_cal += food["calories"]
+            total_protein += food["protein"]
+            total_fiber += food.get("fiber", 0) or 0
+
+        if total_cal >= calorie_target * 0.95:
+            break
+
+    return {
+        "calorie_target": round(calorie_target, 2),
+        "total_calories": round(total_cal, 2),
+        "total_protein": round(total_protein, 2),
+        "total_fiber": round(total_fiber, 2),
+        "meals": meals
+    }
+
+
+def random_users(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        UserProfile(
+            age=rng.randint(18, 75),
+            gender=rng.choice(["male", "female"]),
+            weight_kg=rng.uniform(45, 130),
+            height_cm=rng.uniform(150, 200),
+            goal=rng.choice(["weight_loss", "muscle_gain", "maintenance"]),
+            activity_level=rng.choice(["light", "moderate", "active"]),
+            dietary_restrictions=rng.sample(RESTRICTIONS, rng.randint(0, 3))
+        )
+        for _ in range(n)
+    ]
+
+
+def users_per_second(func, users):
+    start = time.perf_counter()
+    func(users)
+    return len(users) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    users = random_users(NUM_USERS)
+
+    start = time.perf_counter()
+    get_ranked_foods(FOOD_FILE)
+    print(f"load + rank foods            {(time.perf_counter() - start) * 1000:10.1f} ms (once)")
+
+    # The per-call version re-reads the file for every user, so it is timed on a slice
+    old = users_per_second(lambda batch: [generate_daily_meal_plan_per_call(user) for user in batch], users[:1000])
+    single = users_per_second(lambda batch: [generate_daily_meal_plan(user) for user in batch], users)
+    batch = users_per_second(generate_daily_meal_plans, users)
+    knapsack = users_per_second(lambda batch: generate_daily_meal_plans(batch, engine="knapsack"), users)
+    print(f"per-call load and sort       {old:10.0f} users/s (1,000 users)")
+    print(f"preprocessed, one by one     {single:10.0f} users/s ({NUM_USERS:,} users)")
+    print(f"preprocessed, batch          {batch:10.0f} users/s ({NUM_USERS:,} users)")
+    print(f"knapsack engine              {knapsack:10.0f} users/s ({NUM_USERS:,} users)")
@@ -0,0 +1,67 @@
+"""
+Allocation and time cost of MealCreativityEngine.enhance_meal_plan
+
+Run from the repository root:
+    python -m benchmarks.bench_plan_copy
+"""
+import random
+import time
+import tracemalloc
+
+from diet_workout_planning.diet.catalog import get_shared_food_database
+from diet_workout_planning.diet.creativity_engine import MealCreativityEngine
+from diet_workout_planning.diet.food_model import DailyPlan, Meal, MealAssignment, MealType, WeeklyPlan
+
+
+def random_plan(food_db, foods_per_meal=4, seed=0):
+    """A weekly plan with random foods, standing in for an optimizer result"""
+    rng = random.Random(seed)
+    foods = list(food_db.foods.values())
+    plan = WeeklyPlan()
+    for day_num in range(1, 8):
+        day = DailyPlan(day_of_week=day_num)
+        for meal_type in MealType:
+            meal = Meal(meal_type=meal_type)
+            for food in rng.sample(foods, foods_per_meal):
+                meal.add_food(MealAssignment(
+                    food_id=food.id,
+                    food_name=food.name,
+                    quantity=float(rng.randint(1, 3)),
+                    calories=food.calories,
+                    proteins=food.proteins,
+                    diet_guide_group=food.diet_guide_group
+                ))
+            day.meals[meal_type] = meal
+        plan.days.append(day)
+    return plan
+
+
+if __name__ == "__main__":
+    food_db = get_shared_food_database()
+    engine = MealCreativityEngine(food_db)
+    plan = random_plan(food_db)
+    runs = 200
+
+    for creativity_level in (0.2, 0.5, 0.9):
+        enhance = lambda: engine.enhance_meal_plan(plan, creativity_level=creativity_level, flavor_exploration=0.5)
+        enhance()  # build lazy indexes outside the measurement
+
+        random.seed(0)
+        start = time.perf_counter()
+        for _ in range(runs):
+            enhance()
+        elapsed = (time.perf_counter() - start) / runs
+
+        # Keep every result alive so the snapshot counts the blocks each enhanced plan owns
+        random.seed(0)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        results = [enhance() for _ in range(runs)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        diff = after.compare_to(before, "filename")
+        blocks = sum(stat.count_diff for stat in diff)
+        size = sum(stat.size_diff for stat in diff)
+
+        print(f"creativity {creativity_level:.1f}: {elapsed * 1000:7.3f} ms/enhancement, "
+              f"{blocks / runs:7.1f} blocks / {size / runs / 1024:6.1f} KiB allocated per enhanced plan")
@@ -0,0 +1,28 @@
+"""
+Throughput of best-of-K creative variant generation
+
+Run from the repository root:
+    python -m benchmarks.bench_plan_variants
+"""
+import os
+import time
+
+from benchmarks.bench_plan_copy import random_plan
+from diet_workout_planning.diet.catalog import get_shared_food_database
+from diet_workout_planning.diet.variants import generate_variants
+
+
+if __name__ == "__main__":
+    food_db = get_shared_food_database()
+    plan = random_plan(food_db)
+    cpus = os.cpu_count() or 1
+    generate_variants(food_db, plan, k=2, workers=1)  # build lazy indexes outside the measurement
+
+    for k in (16, 64):
+        for workers in sorted({1, cpus, 4}):
+            start = time.perf_counter()
+            best = generate_variants(food_db, plan, k=k, seed=0, workers=workers,
+                                     creativity_level=0.5, flavor_exploration=0.5)[0]
+            elapsed = time.perf_counter() - start
+            print(f"K={k:3d} workers={workers}: {elapsed * 1000:8.1f} ms, {k / elapsed:7.1f} variants/s "
+                  f"(best seed {best.seed}, score {best.score:.3f})")
@@ -0,0 +1,156 @@
+"""
+Load test for the local planning service: p50/p95/p99 latency and throughput
+
+Starts the service itself (--start-server) or targets one already running, e.g.
+    python diet_workout_planning/service.py --workers 4
+Then, from the repository root:
+    python -m benchmarks.bench_service_load --endpoint /plan --concurrency 32 --requests 5000
+
+Clients keep their connections alive and draw profiles from a pool of
+--distinct profiles, so a smaller pool means more identical requests in
+flight for the service to coalesce.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESTRICTIONS = ["pork", "beef", "chicken", "milk", "cheese", "egg", "fish", "nuts", "bread", "oil"]
+EQUIPMENT = ["Body Only", "Dumbbells", "Barbell", "Cable", "Kettlebells", "Machine", "Bands"]
+
+
+def random_profiles(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "age": rng.randint(18, 75),
+            "gender": rng.choice(["male", "female"]),
+            "weight_kg": round(rng.uniform(45, 130), 1),
+            "height_cm": round(rng.uniform(150, 200), 1),
+            "goal": rng.choice(["weight_loss", "muscle_gain", "maintenance"]),
+            "activity_level": rng.choice(["light", "moderate", "active"]),
+            "dietary_restrictions": rng.sample(RESTRICTIONS, rng.randint(0, 3)),
+            "fitness_level": rng.choice(["beginner", "intermediate", "expert"]),
+            "available_equipment": rng.sample(EQUIPMENT, rng.randint(1, 3))
+        }
+        for _ in range(n)
+    ]
+
+
+async def request(reader, writer, host, method, path, payload=None):
+    """Send one keep-alive request and return (status, parsed JSON body)"""
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def run_load(host, port, endpoint, profiles, num_requests, concurrency, engine, seed=0):
+    """Latencies (s) and statuses of num_requests requests sent by concurrency clients, plus the wall time"""
+    rng = random.Random(seed)
+    bodies = [dict(rng.choice(profiles), engine=engine) for _ in range(num_requests)]
+    latencies = []
+    statuses = []
+
+    async def client(next_request):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in next_request:
+                start = time.perf_counter()
+                status, _ = await request(reader, writer, host, "POST", endpoint, bodies[i])
+                latencies.append(time.perf_counter() - start)
+                statuses.append(status)
+        finally:
+            writer.close()
+
+    next_request = iter(range(num_requests))  # shared: each client takes the next unsent request
+    start = time.perf_counter()
+    await asyncio.gather(*(client(next_request) for _ in range(concurrency)))
+    return np.array(latencies), np.array(statuses), time.perf_counter() - start
+
+
+async def health(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return (await request(reader, writer, host, "GET", "/health"))[1]
+    finally:
+        writer.close()
+
+
+def start_server(host, port, workers, max_queue):
+    """Start service.py in a subprocess and wait until it answers /health"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "diet_workout_planning", "service.py"), "--host", host,
+         "--port", str(port), "--workers", str(workers), "--max-queue", str(max_queue)],
+        cwd=ROOT, stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(health(host, port))
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Planning service did not start within 60 s")
+
+
+def report(latencies, statuses, elapsed, before, after):
+    ok = latencies[statuses == 200]
+    print(f"requests      {len(latencies):10d} in {elapsed:.2f} s")
+    print(f"throughput    {len(latencies) / elapsed:10.1f} req/s ({len(ok) / elapsed:.1f} ok/s)")
+    for status, count in zip(*np.unique(statuses, return_counts=True)):
+        print(f"status {status}    {count:10d}")
+    if len(ok):
+        p50, p95, p99 = np.percentile(ok, [50, 95, 99]) * 1000
+        print(f"latency (ok)  p50 {p50:8.1f} ms   p95 {p95:8.1f} ms   p99 {p99:8.1f} ms   max {ok.max() * 1000:8.1f} ms")
+    jobs = after["jobs"] - before["jobs"]
+    coalesced = after["coalesced"] - before["coalesced"]
+    print(f"service       {jobs} jobs run, {coalesced} coalesced, {after['rejected'] - before['rejected']} rejected")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the local planning service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--endpoint", default="/plan", choices=["/plan", "/meal-plan", "/workout"])
+    parser.add_argument("--engine", default="greedy", choices=["greedy", "knapsack"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16, help="clients, one keep-alive connection each")
+    parser.add_argument("--distinct", type=int, default=500, help="size of the profile pool")
+    parser.add_argument("--start-server", action="store_true", help="run service.py for the test")
+    parser.add_argument("--workers", type=int, default=4, help="with --start-server")
+    parser.add_argument("--max-queue", type=int, default=32, help="with --start-server")
+    args = parser.parse_args()
+
+    server = start_server(args.host, args.port, args.workers, args.max_queue) if args.start_server else None
+    try:
+        before = asyncio.run(health(args.host, args.port))
+        latencies, statuses, elapsed = asyncio.run(run_load(
+            args.host, args.port, args.endpoint, random_profiles(args.distinct),
+            args.requests, args.concurrency, args.engine
+        ))
+        report(latencies, statuses, elapsed, before, asyncio.run(health(args.host, args.port)))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
@@ -0,0 +1,69 @@
+"""
+Selections per second of select_daily_workout, re-reading the dataset on every call vs the indexed catalog
+
+Run from the repository root:
+    python -m benchmarks.bench_workout_selection
+"""
+import os
+import sys
+import time
+
+# generate_workout and its siblings are scripts that import each other by bare module name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "diet_workout_planning"))
+
+from diet_workout_planning.utils.dataset_io import load_dataframe
+from generate_workout import select_daily_workout
+from user_profile import UserProfile
+from workout_catalog import get_workout_catalog
+
+WORKOUT_FILE = "data/workouts_cleaned.json"
+
+USERS = [
+    UserProfile(25, "male", 75, 180, "muscle_gain", "moderate",
+                fitness_level="beginner", available_equipment=["Body Only", "Dumbbell"]),
+    UserProfile(40, "female", 62, 165, "weight_loss", "light",
+                fitness_level="intermediate", available_equipment=["Cable", "Machine", "Bands"]),
+    UserProfile(31, "male", 88, 185, "maintenance", "active",
+                fitness_level="Expert", available_equipment=["Barbell"]),
+]
+
+
+def select_daily_workout_dataframe(user: UserProfile, workout_file=WORKOUT_FILE):
+    """The previous implementation: load and filter the whole DataFrame per call"""
+    df = load_dataframe(workout_file)
+
+    df_filtered = df[
+        (df["level"].str.lower() == user.fitness_level.lower()) &
+        (df["equipment"].isin(user.available_equipment))
+    ]
+
+    if df_filtered.empty:
+        df_filtered = df
+
+    selected = df_filtered.sample(n=2 if user.goal == "muscle_gain" else 1)
+
+    return selected.to_dict(orient="records")
+
+
+def selections_per_second(select, min_time=1.0):
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for user in USERS:
+            select(user)
+        calls += len(USERS)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    get_workout_catalog(WORKOUT_FILE)
+    print(f"catalog load + index        {(time.perf_counter() - start) * 1000:10.1f} ms (once)")
+
+    old = selections_per_second(select_daily_workout_dataframe)
+    new = selections_per_second(select_daily_workout)
+    print(f"DataFrame per call          {old:10.0f} selections/s")
+    print(f"indexed catalog             {new:10.0f} selections/s")
+    print(f"speedup                     {new / old:10.0f}x")
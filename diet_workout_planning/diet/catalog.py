@@ -0,0 +1,33 @@
+import threading
+
+from diet_workout_planning.diet.food_model import FoodDatabase
+from diet_workout_planning.diet.data_loader import get_food_data
+
+# Process-wide food catalog shared by every DietPlanner. It is built on first use
+# and must be treated as read-only: planners keep their own requirements and solver state.
+_shared_food_db = None
+_lock = threading.Lock()
+
+
+def get_shared_food_database() -> FoodDatabase:
+    """Return the shared food database, loading it on the first call"""
+    global _shared_food_db
+    if _shared_food_db is None:
+        with _lock:
+            if _shared_food_db is None:
+                food_db = FoodDatabase()
+                food_db.load_from_dataframe(get_food_data())
+                _shared_food_db = food_db
+    return _shared_food_db
+
+
+def warmup() -> FoodDatabase:
+    """Load the shared catalog now, e.g. before a server starts taking requests"""
+    return get_shared_food_database()
+
+
+def reset_shared_food_database():
+    """Drop the shared catalog so the next use reloads it from disk"""
+    global _shared_food_db
+    with _lock:
+        _shared_food_db = None
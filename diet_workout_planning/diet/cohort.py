@@ -0,0 +1,64 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from diet_workout_planning.user_profile import (
+    ACTIVITY_MULTIPLIERS, DEFAULT_ACTIVITY_MULTIPLIER, GOAL_ADJUSTMENTS
+)
+from diet_workout_planning.diet.diet_profiles import get_profile_levels
+
+COHORT_COLUMNS = ("age", "gender", "weight_kg", "height_cm", "goal", "activity_level")
+
+
+def _lookup(keys, table, default):
+    """Vectorized table.get(key, default) over an array of keys"""
+    values = np.full(len(keys), default, dtype=np.float64)
+    for key, value in table.items():
+        values[keys == key] = value
+    return values
+
+
+def cohort_calorie_targets(age, gender, weight_kg, height_cm, goal, activity_level) -> Dict[str, np.ndarray]:
+    """
+    BMR, daily calorie target and dietary profile level for a whole cohort
+
+    Takes one array-like per UserProfile field and evaluates
+    UserProfile.calculate_bmr, UserProfile.daily_calories and
+    diet_profiles.get_profile in one pass with the same float64 arithmetic,
+    so every value equals the scalar methods' result exactly.
+
+    Returns a dict of arrays: 'bmr', 'daily_calories' and 'profile_level'
+    (the dietary_profiles key get_profile would pick).
+    """
+    age = np.asarray(age, dtype=np.float64)
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    height_cm = np.asarray(height_cm, dtype=np.float64)
+    gender = np.asarray(gender, dtype=object)
+    goal = np.asarray(goal, dtype=object)
+    activity_level = np.asarray(activity_level, dtype=object)
+
+    # Mifflin-St Jeor, evaluated in the same order as calculate_bmr
+    bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age
+    bmr = np.where(gender == "male", bmr + 5, bmr - 161)
+
+    maintenance = bmr * _lookup(activity_level, ACTIVITY_MULTIPLIERS, DEFAULT_ACTIVITY_MULTIPLIER)
+    daily_calories = maintenance.copy()
+    for goal_name, adjustment in GOAL_ADJUSTMENTS.items():
+        selected = goal == goal_name
+        daily_calories[selected] = maintenance[selected] + adjustment
+
+    return {
+        "bmr": bmr,
+        "daily_calories": daily_calories,
+        "profile_level": get_profile_levels(daily_calories)
+    }
+
+
+def cohort_calorie_targets_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Cohort version for a DataFrame with the UserProfile columns; returns the three results as columns"""
+    missing = [column for column in COHORT_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Cohort is missing columns: {missing}")
+    results = cohort_calorie_targets(*(df[column].to_numpy() for column in COHORT_COLUMNS))
+    return pd.DataFrame(results, index=df.index)
@@ -0,0 +1,124 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from diet_workout_planning.diet.food_model import (
+    FoodDatabase, MealAssignment, Meal, DailyPlan, WeeklyPlan, MealType
+)
+from diet_workout_planning.diet.creativity_engine import FLAG_SURPRISE
+
+MEAL_TYPES = list(MealType)
+_MEAL_CODES = {meal_type: code for code, meal_type in enumerate(MEAL_TYPES)}
+
+
+class CompactPlan:
+    """
+    Structure-of-arrays form of a WeeklyPlan
+
+    One entry per food assignment: int32 food ids, uint8 day positions and
+    meal codes (index into MealType), float32 quantities and a uint8 flags
+    bitfield (FLAG_SURPRISE). Per day it keeps the day of week, a bitmask of
+    the meals present and the theme, if any. Food names and nutrients are
+    not stored; they are looked up in the catalog when the plan is turned
+    back into dataclasses (surprise foods get their "Surprise" name prefix
+    back), and quantities round-trip at float32 precision.
+    """
+
+    def __init__(self, food_id, day, meal, quantity, flags, day_of_week, meal_mask, themes):
+        self.food_id = food_id
+        self.day = day
+        self.meal = meal
+        self.quantity = quantity
+        self.flags = flags
+        self.day_of_week = day_of_week
+        self.meal_mask = meal_mask
+        self.themes: List[Optional[str]] = themes
+
+    @classmethod
+    def from_weekly_plan(cls, plan: WeeklyPlan) -> 'CompactPlan':
+        """Encode a plan; assignments may only carry the attributes the flags can hold"""
+        food_ids, days, meals, quantities, flags = [], [], [], [], []
+        meal_mask = np.zeros(len(plan.days), dtype=np.uint8)
+
+        for d, day in enumerate(plan.days):
+            for meal_type, meal in day.meals.items():
+                code = _MEAL_CODES[meal_type]
+                meal_mask[d] |= 1 << code
+                for food in meal.food_items:
+                    attributes = food.additional_attributes
+                    if attributes and set(attributes) - {'is_surprise'}:
+                        raise ValueError(f"Cannot store assignment attributes {sorted(attributes)} in a CompactPlan")
+                    food_ids.append(food.food_id)
+                    days.append(d)
+                    meals.append(code)
+                    quantities.append(food.quantity)
+                    flags.append(FLAG_SURPRISE if attributes and attributes.get('is_surprise', False) else 0)
+
+        return cls(
+            food_id=np.array(food_ids, dtype=np.int32),
+            day=np.array(days, dtype=np.uint8),
+            meal=np.array(meals, dtype=np.uint8),
+            quantity=np.array(quantities, dtype=np.float32),
+            flags=np.array(flags, dtype=np.uint8),
+            day_of_week=np.array([day.day_of_week for day in plan.days], dtype=np.uint8),
+            meal_mask=meal_mask,
+            themes=[getattr(day, 'theme', None) for day in plan.days]
+        )
+
+    def to_weekly_plan(self, food_db: FoodDatabase) -> WeeklyPlan:
+        """Rebuild the dataclass plan, filling names and nutrients from the catalog"""
+        plan = WeeklyPlan()
+        for d, day_of_week in enumerate(self.day_of_week.tolist()):
+            day = DailyPlan(day_of_week=day_of_week)
+            for code, meal_type in enumerate(MEAL_TYPES):
+                if self.meal_mask[d] & (1 << code):
+                    day.meals[meal_type] = Meal(meal_type=meal_type)
+            if self.themes[d] is not None:
+                day.theme = self.themes[d]
+            plan.days.append(day)
+
+        for food_id, d, code, quantity, flags in zip(self.food_id.tolist(), self.day.tolist(), self.meal.tolist(),
+                                                    self.quantity.tolist(), self.flags.tolist()):
+            food = food_db.get_by_id(food_id)
+            surprise = bool(flags & FLAG_SURPRISE)
+            plan.days[d].meals[MEAL_TYPES[code]].add_food(MealAssignment(
+                food_id=food_id,
+                food_name=f"Surprise {food.name}" if surprise else food.name,
+                quantity=quantity,
+                calories=food.calories,
+                proteins=food.proteins,
+                diet_guide_group=food.diet_guide_group,
+                additional_attributes={'is_surprise': True} if surprise else {}
+            ))
+        return plan
+
+    def __len__(self):
+        return len(self.food_id)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the array buffers"""
+        return sum(array.nbytes for array in (
+            self.food_id, self.day, self.meal, self.quantity, self.flags, self.day_of_week, self.meal_mask
+        ))
+
+
+def compact_batch(plans: List[CompactPlan]) -> Dict[str, np.ndarray]:
+    """Concatenate compact plans into the arrays measure_creativity_batch takes"""
+    lengths = [len(plan) for plan in plans]
+    columns = {
+        'food_id': [plan.food_id for plan in plans],
+        'day': [plan.day for plan in plans],
+        'meal': [plan.meal for plan in plans],
+        'quantity': [plan.quantity for plan in plans],
+        'flags': [plan.flags for plan in plans],
+    }
+    batch = {
+        name: np.concatenate(arrays).astype(np.float64 if name == 'quantity' else np.int64)
+        if arrays else np.zeros(0, dtype=np.float64 if name == 'quantity' else np.int64)
+        for name, arrays in columns.items()
+    }
+    batch['plan'] = np.repeat(np.arange(len(plans), dtype=np.int64), lengths)
+    batch['num_days'] = np.array([len(plan.day_of_week) for plan in plans], dtype=np.int64)
+    batch['has_themes'] = np.array([any(theme is not None for theme in plan.themes) for plan in plans], dtype=bool)
+    return batch
@@ -2,12 +2,64 @@ import random
 import numpy as np
 from collections import defaultdict
 from typing import Dict, List, Set, Tuple, Optional, Any
-import copy
+import dataclasses
 
 from diet_workout_planning.diet.food_model import (
     FoodItem, MealAssignment, Meal, DailyPlan, WeeklyPlan, FoodDatabase,
-    MealType, DietGuideGroup
+    MealType, DietGuideGroup, DietaryRequirements
 )
+from diet_workout_planning.diet.nutrition_repair import RepairTargets, repair_daily_nutrition
+from diet_workout_planning.diet.restrictions import get_food_restrictions
+from diet_workout_planning.diet.keyword_index import KeywordFoodIndex
+from diet_workout_planning.diet.substitution_index import SubstitutionIndex, get_substitution_index
+
+
+# Meal themes used to create coherent daily experiences
+MEAL_THEMES = {
+    'mediterranean': {
+        'food_groups_emphasis': [DietGuideGroup.OIL, DietGuideGroup.SEAFOOD],
+        'compatible_foods': ['olive', 'feta', 'cucumber', 'tomato', 'fish']
+    },
+    'asian': {
+        'food_groups_emphasis': [DietGuideGroup.SEAFOOD, DietGuideGroup.OTHER_VEGETABLES],
+        'compatible_foods': ['rice', 'soy', 'ginger', 'tofu', 'noodle']
+    },
+    'mexican': {
+        'food_groups_emphasis': [DietGuideGroup.BEANS_PEAS_LENTILS, DietGuideGroup.RED_ORANGE_VEGETABLES],
+        'compatible_foods': ['bean', 'corn', 'avocado', 'tomato', 'pepper']
+    },
+    'comfort': {
+        'food_groups_emphasis': [DietGuideGroup.WHOLE_GRAINS, DietGuideGroup.DAIRY],
+        'compatible_foods': ['cheese', 'potato', 'pasta', 'soup', 'bread']
+    }
+}
+
+# Flavor principles (very simplified) - a real implementation would require a flavor database
+FLAVOR_PRINCIPLES = {
+    'sweet_salty': {
+        'sweet_foods': ['fruit', 'honey', 'sweet potato'],
+        'salty_foods': ['cheese', 'ham', 'soy sauce']
+    },
+    'acid_fat': {
+        'acid_foods': ['lemon', 'vinegar', 'tomato'],
+        'fatty_foods': ['olive oil', 'avocado', 'cheese']
+    },
+    'umami_acid': {
+        'umami_foods': ['mushroom', 'tomato', 'meat'],
+        'acid_foods': ['lemon', 'vinegar', 'tomato']
+    }
+}
+
+
+def _all_keywords():
+    """Every keyword used by the themes and flavor principles"""
+    keywords = set()
+    for theme in MEAL_THEMES.values():
+        keywords.update(theme['compatible_foods'])
+    for principle in FLAVOR_PRINCIPLES.values():
+        for category_keywords in principle.values():
+            keywords.update(category_keywords)
+    return keywords
 
 
 class MealCreativityEngine:
@@ -23,6 +75,7 @@ class MealCreativityEngine:
             The database of available foods
         """
         self.food_db = food_database
+        self._keyword_index = None
         
         # Creativity strategies - different ways to introduce creativity
         self.creativity_strategies = [
@@ -32,11 +85,24 @@ class MealCreativityEngine:
             self._apply_surprise_ingredients
         ]
     
+    @property
+    def keyword_index(self) -> KeywordFoodIndex:
+        """Theme and flavor keyword matches, compiled on first use"""
+        if self._keyword_index is None:
+            self._keyword_index = KeywordFoodIndex(self.food_db, _all_keywords())
+        return self._keyword_index
+
+    @property
+    def substitution_index(self) -> SubstitutionIndex:
+        """Shared per-catalog index of replacement candidates"""
+        return get_substitution_index(self.food_db)
+    
     def enhance_meal_plan(self, original_plan: WeeklyPlan, 
                          creativity_level: float = 0.5,
                          flavor_exploration: float = 0.3,
                          maintain_nutrition: bool = True,
-                         theme_consistency: float = 0.5) -> WeeklyPlan:
+                         theme_consistency: float = 0.5,
+                         requirements: Optional[DietaryRequirements] = None) -> WeeklyPlan:
         """
         Enhance a meal plan with creativity while maintaining constraints
         
@@ -52,13 +118,17 @@ class MealCreativityEngine:
             Whether to strictly maintain nutritional equivalence during substitutions
         theme_consistency : float (0-1)
             How consistent meal themes should be (higher means more day-to-day consistency)
+        requirements : DietaryRequirements, optional
+            Daily constraints (calorie range, meal balance, food group minimums) to restore
+            when maintaining nutrition; without them each day is kept within 5% of its
+            original calories. Foods excluded by their restrictions are never added.
             
         Returns:
         --------
         WeeklyPlan : Enhanced meal plan with added creativity
         """
-        # Create a deep copy of the original plan to modify
-        enhanced_plan = copy.deepcopy(original_plan)
+        # Copy-on-write copy: strategies only clone the meals they actually change
+        enhanced_plan = original_plan.copy_on_write()
         
         # Store original nutritional values if we need to maintain them
         if maintain_nutrition:
@@ -68,13 +138,17 @@ class MealCreativityEngine:
         num_strategies = max(1, int(len(self.creativity_strategies) * creativity_level))
         selected_strategies = random.sample(self.creativity_strategies, num_strategies)
         
+        # Added foods must respect the dietary restrictions too
+        restricted = (get_food_restrictions(self.food_db).excluded_food_ids(requirements.restrictions)
+                      if requirements else set())
+        
         # Apply each selected strategy
         for strategy in selected_strategies:
-            strategy(enhanced_plan, creativity_level, flavor_exploration, theme_consistency)
+            strategy(enhanced_plan, creativity_level, flavor_exploration, theme_consistency, restricted)
         
         # If needed, check and adjust nutrition to maintain constraints
         if maintain_nutrition:
-            self._adjust_for_nutritional_equivalence(enhanced_plan, original_nutrition)
+            self._adjust_for_nutritional_equivalence(enhanced_plan, original_nutrition, requirements)
             
         return enhanced_plan
     
@@ -97,43 +171,35 @@ class MealCreativityEngine:
             
             # Count food groups per day
             for meal in day.meals.values():
-                for food in meal.food_items:
-                    day_profile['food_groups'][food.diet_guide_group] += food.quantity
+                for group, servings in meal.group_totals.items():
+                    day_profile['food_groups'][group] += servings
             
             profile['daily'].append(day_profile)
             
         return profile
     
-    def _adjust_for_nutritional_equivalence(self, plan: WeeklyPlan, target_profile: Dict):
-        """Adjust a meal plan to better match a target nutritional profile"""
-        # This is a simplified version that focuses on calorie adjustment
-        # A more comprehensive version would balance all nutrients and food groups
-        
-        # Check and adjust total calories
-        current_calories = plan.total_calories
-        target_calories = target_profile['total_calories']
-        
-        # If calories are off by more than 5%, adjust
-        if abs(current_calories - target_calories) / target_calories > 0.05:
-            adjustment_factor = target_calories / current_calories
-            
-            # Apply adjustment to all food quantities
-            for day in plan.days:
-                for meal in day.meals.values():
-                    for food in meal.food_items:
-                        # Adjust quantity
-                        food.quantity *= adjustment_factor
-                        # Update derived values
-                        food.calories = food.quantity * self.food_db.get_by_id(food.food_id).calories
-                        food.proteins = food.quantity * self.food_db.get_by_id(food.food_id).proteins
-        
-        # Similarly, we could adjust for protein and food group targets
-        # This would be more complex and might require solving another optimization problem
+    def _adjust_for_nutritional_equivalence(self, plan: WeeklyPlan, target_profile: Dict,
+                                            requirements: Optional[DietaryRequirements] = None):
+        """
+        Adjust a meal plan to better match a target nutritional profile
+
+        Each day that drifted out of its calorie range, meal balance band or
+        food group minimums is repaired with a small per-day optimization over
+        the quantities already in the plan (see nutrition_repair).
+        """
+        fallback_calories = [
+            (day['calories'] * 0.95, day['calories'] * 1.05) for day in target_profile['daily']
+        ]
+        targets = RepairTargets.from_requirements(
+            requirements, num_days=len(plan.days), fallback_calories=fallback_calories
+        )
+        repair_daily_nutrition(plan, self.food_db, targets)
     
     def _apply_food_substitutions(self, plan: WeeklyPlan, 
                                  creativity_level: float,
                                  flavor_exploration: float,
-                                 theme_consistency: float):
+                                 theme_consistency: float,
+                                 restricted: Set[int] = frozenset()):
         """
         Apply random food substitutions to introduce variety
         
@@ -158,20 +224,30 @@ class MealCreativityEngine:
                 # Find a suitable replacement
                 original_food = self.food_db.get_by_id(food.food_id)
                 
-                # Get alternatives in the same food group
-                alternatives = [f for f in self.food_db.get_by_food_group(original_food.diet_guide_group)
-                               if f.id != original_food.id and 
-                                  meal_type in f.meal_suitability]
+                # Alternatives are the other allowed foods in the same food group. Every
+                # food has an entry for every meal type, so no meal filter applies here.
+                group = original_food.diet_guide_group
+                group_foods = self.substitution_index.foods(group)
+                if restricted:
+                    group_foods = [f for f in group_foods if f.id not in restricted and f.id != original_food.id]
+                    original_index = None
+                else:
+                    original_index = self.substitution_index.index_in_bucket(original_food.id, group)
+                num_alternatives = len(group_foods) - (original_index is not None)
                 
-                if alternatives:
+                if num_alternatives:
                     # Based on flavor_exploration, either pick a similar food or a more different one
                     if random.random() < flavor_exploration:
-                        # More exploration - pick more randomly
-                        replacement = random.choice(alternatives)
+                        # More exploration - pick more randomly, stepping over the original food
+                        choice = random.randrange(num_alternatives)
+                        if original_index is not None and choice >= original_index:
+                            choice += 1
+                        replacement = group_foods[choice]
                     else:
                         # Less exploration - pick something with similar calories
-                        alternatives.sort(key=lambda f: abs(f.calories - original_food.calories))
-                        replacement = alternatives[0]
+                        replacement = self.substitution_index.nearest_by_calories(
+                            original_food.calories, k=1, group=group, exclude=restricted | {original_food.id}
+                        )[0]
                     
                     # Calculate new quantity to maintain nutrition
                     new_quantity = food.quantity * (original_food.calories / replacement.calories) if replacement.calories > 0 else food.quantity
@@ -181,42 +257,25 @@ class MealCreativityEngine:
                         food_id=replacement.id,
                         food_name=replacement.name,
                         quantity=new_quantity,
-                        calories=new_quantity * replacement.calories,
-                        proteins=new_quantity * replacement.proteins,
+                        calories=replacement.calories,
+                        proteins=replacement.proteins,
                         diet_guide_group=replacement.diet_guide_group
                     )
                     
                     # Apply the substitution
-                    plan.days[day_idx].meals[meal_type].food_items[food_idx] = new_food
+                    plan.mutable_meal(day_idx, meal_type).replace_food(food_idx, new_food)
     
     def _apply_meal_themes(self, plan: WeeklyPlan, 
                           creativity_level: float,
                           flavor_exploration: float,
-                          theme_consistency: float):
+                          theme_consistency: float,
+                          restricted: Set[int] = frozenset()):
         """
         Apply meal themes to create coherent daily experiences
         
         This strategy introduces themed days (e.g., Mediterranean Monday, Taco Tuesday)
         """
-        # Define some meal themes
-        themes = {
-            'mediterranean': {
-                'food_groups_emphasis': [DietGuideGroup.OIL, DietGuideGroup.SEAFOOD],
-                'compatible_foods': ['olive', 'feta', 'cucumber', 'tomato', 'fish']
-            },
-            'asian': {
-                'food_groups_emphasis': [DietGuideGroup.SEAFOOD, DietGuideGroup.OTHER_VEGETABLES],
-                'compatible_foods': ['rice', 'soy', 'ginger', 'tofu', 'noodle']
-            },
-            'mexican': {
-                'food_groups_emphasis': [DietGuideGroup.BEANS_PEAS_LENTILS, DietGuideGroup.RED_ORANGE_VEGETABLES],
-                'compatible_foods': ['bean', 'corn', 'avocado', 'tomato', 'pepper']
-            },
-            'comfort': {
-                'food_groups_emphasis': [DietGuideGroup.WHOLE_GRAINS, DietGuideGroup.DAIRY],
-                'compatible_foods': ['cheese', 'potato', 'pasta', 'soup', 'bread']
-            }
-        }
+        themes = MEAL_THEMES
         
         # Determine how many days to apply themes to
         num_days_to_theme = int(len(plan.days) * creativity_level)
@@ -240,20 +299,19 @@ class MealCreativityEngine:
             plan.days[day_idx].theme = theme_name
             
             # For each meal in the day, try to incorporate themed elements
-            for meal_type, meal in plan.days[day_idx].meals.items():
-                self._apply_theme_to_meal(meal, theme, flavor_exploration)
+            for meal_type in list(plan.days[day_idx].meals):
+                self._apply_theme_to_meal(plan, day_idx, meal_type, theme, flavor_exploration, restricted)
     
-    def _apply_theme_to_meal(self, meal: Meal, theme: Dict, flavor_exploration: float):
+    def _apply_theme_to_meal(self, plan: WeeklyPlan, day_idx: int, meal_type: MealType,
+                             theme: Dict, flavor_exploration: float, restricted: Set[int] = frozenset()):
         """Apply a theme to a specific meal"""
         # This is a simplified implementation - a full version would be more sophisticated
+        meal = plan.days[day_idx].meals[meal_type]
         
         # Find theme-compatible foods in our database
-        compatible_foods = []
-        for food in self.food_db.foods.values():
-            if meal.meal_type in food.meal_suitability:
-                # Check if the food name contains any of the theme's compatible food keywords
-                if any(keyword in food.name.lower() for keyword in theme['compatible_foods']):
-                    compatible_foods.append(food)
+        compatible_foods = self.keyword_index.foods_matching(theme['compatible_foods'], meal.meal_type)
+        if restricted:
+            compatible_foods = [f for f in compatible_foods if f.id not in restricted]
         
         if not compatible_foods:
             return  # No theme-compatible foods found
@@ -272,69 +330,54 @@ class MealCreativityEngine:
                     food_id=theme_food.id,
                     food_name=theme_food.name,
                     quantity=quantity,
-                    calories=quantity * theme_food.calories,
-                    proteins=quantity * theme_food.proteins,
+                    calories=theme_food.calories,
+                    proteins=theme_food.proteins,
                     diet_guide_group=theme_food.diet_guide_group
                 )
                 
-                meal.add_food(new_food)
+                plan.mutable_meal(day_idx, meal_type).add_food(new_food)
     
     def _apply_complementary_flavors(self, plan: WeeklyPlan, 
                                     creativity_level: float,
                                     flavor_exploration: float,
-                                    theme_consistency: float):
+                                    theme_consistency: float,
+                                    restricted: Set[int] = frozenset()):
         """
         Apply flavor theory to create complementary combinations
         
         This strategy uses flavor principles (e.g., sweet+salty, acid+fat) 
         to create interesting combinations
         """
-        # This is a placeholder - a real implementation would require a flavor database
-        # Define some flavor principles (very simplified)
-        flavor_principles = {
-            'sweet_salty': {
-                'sweet_foods': ['fruit', 'honey', 'sweet potato'],
-                'salty_foods': ['cheese', 'ham', 'soy sauce']
-            },
-            'acid_fat': {
-                'acid_foods': ['lemon', 'vinegar', 'tomato'],
-                'fatty_foods': ['olive oil', 'avocado', 'cheese']
-            },
-            'umami_acid': {
-                'umami_foods': ['mushroom', 'tomato', 'meat'],
-                'acid_foods': ['lemon', 'vinegar', 'tomato']
-            }
-        }
+        flavor_principles = FLAVOR_PRINCIPLES
         
         # For each day, randomly select a meal to apply flavor principles to
-        for day in plan.days:
+        for day_idx, day in enumerate(plan.days):
             if random.random() < creativity_level:
                 # Select a random meal
                 if not day.meals:
                     continue
                     
                 meal_type = random.choice(list(day.meals.keys()))
-                meal = day.meals[meal_type]
                 
                 # Select a random flavor principle
                 principle_name = random.choice(list(flavor_principles.keys()))
                 principle = flavor_principles[principle_name]
                 
                 # Try to apply the principle
-                self._apply_flavor_principle(meal, principle, flavor_exploration)
+                self._apply_flavor_principle(plan, day_idx, meal_type, principle, flavor_exploration, restricted)
     
-    def _apply_flavor_principle(self, meal: Meal, principle: Dict, flavor_exploration: float):
+    def _apply_flavor_principle(self, plan: WeeklyPlan, day_idx: int, meal_type: MealType,
+                                principle: Dict, flavor_exploration: float, restricted: Set[int] = frozenset()):
         """Apply a flavor principle to a meal"""
         # This is a simplified implementation
+        meal = plan.days[day_idx].meals[meal_type]
         
         # For each category in the principle, try to find foods in the database
         principle_foods = {}
         for category, keywords in principle.items():
-            category_foods = []
-            for food in self.food_db.foods.values():
-                if meal.meal_type in food.meal_suitability:
-                    if any(keyword in food.name.lower() for keyword in keywords):
-                        category_foods.append(food)
+            category_foods = self.keyword_index.foods_matching(keywords, meal.meal_type)
+            if restricted:
+                category_foods = [f for f in category_foods if f.id not in restricted]
             
             if category_foods:
                 principle_foods[category] = category_foods
@@ -350,6 +393,7 @@ class MealCreativityEngine:
                 principle_food = random.choice(foods)
                 
                 # Check if it's already in the meal
+                meal = plan.days[day_idx].meals[meal_type]
                 if principle_food.id not in [f.food_id for f in meal.food_items]:
                     # Add it as a small portion
                     quantity = 0.5  # Small portion
@@ -358,17 +402,18 @@ class MealCreativityEngine:
                         food_id=principle_food.id,
                         food_name=principle_food.name,
                         quantity=quantity,
-                        calories=quantity * principle_food.calories,
-                        proteins=quantity * principle_food.proteins,
+                        calories=principle_food.calories,
+                        proteins=principle_food.proteins,
                         diet_guide_group=principle_food.diet_guide_group
                     )
                     
-                    meal.add_food(new_food)
+                    plan.mutable_meal(day_idx, meal_type).add_food(new_food)
     
     def _apply_surprise_ingredients(self, plan: WeeklyPlan, 
                                    creativity_level: float,
                                    flavor_exploration: float,
-                                   theme_consistency: float):
+                                   theme_consistency: float,
+                                   restricted: Set[int] = frozenset()):
         """
         Add occasional surprise ingredients to meals
         
@@ -396,8 +441,8 @@ class MealCreativityEngine:
                 suitable_foods = [f for f in self.food_db.foods.values() 
                                  if meal_type in f.meal_suitability]
                 
-                # Filter out foods already in the meal
-                current_food_ids = {food.food_id for food in meal.food_items}
+                # Filter out foods already in the meal and foods the restrictions exclude
+                current_food_ids = {food.food_id for food in meal.food_items} | restricted
                 surprise_options = [f for f in suitable_foods if f.id not in current_food_ids]
                 
                 if surprise_options:
@@ -427,13 +472,41 @@ class MealCreativityEngine:
                         food_id=surprise_food.id,
                         food_name=f"Surprise {surprise_food.name}",  # Mark as surprise
                         quantity=quantity,
-                        calories=quantity * surprise_food.calories,
-                        proteins=quantity * surprise_food.proteins,
+                        calories=surprise_food.calories,
+                        proteins=surprise_food.proteins,
                         diet_guide_group=surprise_food.diet_guide_group,
                         additional_attributes={'is_surprise': True}
                     )
                     
-                    meal.add_food(surprise_assignment)
+                    plan.mutable_meal(day_idx, meal_type).add_food(surprise_assignment)
+
+
+# Bit flags of a food assignment in the array encoding of plans
+FLAG_SURPRISE = 1
+
+
+def _creativity_metrics(total_unique_foods, daily_unique_total, num_days, max_repetition,
+                        num_assignments, has_themes, surprise_count) -> Dict:
+    """Assemble the measure_creativity metrics from its raw counts"""
+    metrics = {}
+    metrics['total_unique_foods'] = total_unique_foods
+    metrics['avg_daily_unique'] = daily_unique_total / num_days if num_days else 0
+    metrics['max_repetition'] = max_repetition
+    metrics['avg_repetition'] = num_assignments / total_unique_foods if total_unique_foods else 0
+    metrics['has_themes'] = has_themes
+    metrics['surprise_count'] = surprise_count
+    
+    # Calculate an overall creativity score (simplified)
+    creativity_score = (
+        metrics['total_unique_foods'] / 30 +  # Normalize to approx 0-1
+        (7 - metrics['max_repetition']) / 7 +  # Lower repetition is better
+        (1 if has_themes else 0) + 
+        min(1, surprise_count / 5)  # Up to 1 point for surprises
+    ) / 4  # Average the components
+    
+    metrics['creativity_score'] = min(1, max(0, creativity_score))  # Clamp to 0-1
+    
+    return metrics
 
 
 def measure_creativity(plan: WeeklyPlan) -> Dict:
@@ -449,54 +522,105 @@ def measure_creativity(plan: WeeklyPlan) -> Dict:
     --------
     Dict : Various creativity metrics
     """
-    metrics = {}
-    
-    # Measure diversity - count unique foods
-    all_foods = set()
-    daily_unique = []
+    # One pass over the plan: unique foods (overall and per day), repetition counts and surprises
+    food_counts = defaultdict(int)
+    daily_unique_total = 0
+    num_assignments = 0
+    surprise_count = 0
     
     for day in plan.days:
         day_foods = set()
-        for meal in day.meals.values():
-            for food in meal.food_items:
-                all_foods.add(food.food_id)
-                day_foods.add(food.food_id)
-        daily_unique.append(len(day_foods))
-    
-    metrics['total_unique_foods'] = len(all_foods)
-    metrics['avg_daily_unique'] = sum(daily_unique) / len(daily_unique) if daily_unique else 0
-    
-    # Measure repetition - count how often each food appears
-    food_counts = defaultdict(int)
-    for day in plan.days:
         for meal in day.meals.values():
             for food in meal.food_items:
                 food_counts[food.food_id] += 1
+                day_foods.add(food.food_id)
+                if food.additional_attributes and food.additional_attributes.get('is_surprise', False):
+                    surprise_count += 1
+            num_assignments += len(meal.food_items)
+        daily_unique_total += len(day_foods)
     
-    metrics['max_repetition'] = max(food_counts.values()) if food_counts else 0
-    metrics['avg_repetition'] = sum(food_counts.values()) / len(food_counts) if food_counts else 0
+    return _creativity_metrics(
+        total_unique_foods=len(food_counts),
+        daily_unique_total=daily_unique_total,
+        num_days=len(plan.days),
+        max_repetition=max(food_counts.values()) if food_counts else 0,
+        num_assignments=num_assignments,
+        has_themes=any(hasattr(day, 'theme') for day in plan.days),
+        surprise_count=surprise_count
+    )
+
+
+def encode_plan_batch(plans: List[WeeklyPlan]) -> Dict[str, np.ndarray]:
+    """
+    Flatten plans into parallel arrays, one entry per food assignment
+
+    'plan', 'day' (position in plan.days), 'meal' (index into MealType),
+    'food_id', 'quantity' and 'flags' (FLAG_SURPRISE) are per assignment;
+    'num_days' and 'has_themes' are per plan.
+    """
+    meal_codes = {meal_type: code for code, meal_type in enumerate(MealType)}
+    plan_idx, day_idx, meal_code, food_ids, quantities, flags = [], [], [], [], [], []
     
-    # Check for themes and surprises
-    has_themes = any(hasattr(day, 'theme') for day in plan.days)
+    for p, plan in enumerate(plans):
+        for d, day in enumerate(plan.days):
+            for meal_type, meal in day.meals.items():
+                for food in meal.food_items:
+                    plan_idx.append(p)
+                    day_idx.append(d)
+                    meal_code.append(meal_codes[meal_type])
+                    food_ids.append(food.food_id)
+                    quantities.append(food.quantity)
+                    surprise = food.additional_attributes and food.additional_attributes.get('is_surprise', False)
+                    flags.append(FLAG_SURPRISE if surprise else 0)
     
-    surprise_count = 0
-    for day in plan.days:
-        for meal in day.meals.values():
-            for food in meal.food_items:
-                if food.additional_attributes and food.additional_attributes.get('is_surprise', False):
-                    surprise_count += 1
+    return {
+        'plan': np.array(plan_idx, dtype=np.int64),
+        'day': np.array(day_idx, dtype=np.int64),
+        'meal': np.array(meal_code, dtype=np.int64),
+        'food_id': np.array(food_ids, dtype=np.int64),
+        'quantity': np.array(quantities, dtype=float),
+        'flags': np.array(flags, dtype=np.int64),
+        'num_days': np.array([len(plan.days) for plan in plans], dtype=np.int64),
+        'has_themes': np.array([any(hasattr(day, 'theme') for day in plan.days) for plan in plans], dtype=bool),
+    }
+
+
+def measure_creativity_batch(plans) -> List[Dict]:
+    """
+    measure_creativity for many plans at once
+
+    Takes a list of WeeklyPlans or the arrays from encode_plan_batch and
+    returns one metrics dict per plan, identical to measure_creativity's.
+    """
+    batch = encode_plan_batch(plans) if isinstance(plans, list) else plans
+    num_plans = len(batch['num_days'])
+    plan_idx, food_ids = batch['plan'], batch['food_id']
     
-    metrics['has_themes'] = has_themes
-    metrics['surprise_count'] = surprise_count
+    # Unique (plan, food) pairs give overall uniqueness and repetition counts
+    food_span = int(food_ids.max()) + 1 if len(food_ids) else 1
+    day_span = int(batch['day'].max()) + 1 if len(food_ids) else 1
+    unique_foods, repetitions = np.unique(plan_idx * food_span + food_ids, return_counts=True)
+    unique_plan = unique_foods // food_span
+    total_unique = np.bincount(unique_plan, minlength=num_plans)
+    max_repetition = np.zeros(num_plans, dtype=np.int64)
+    np.maximum.at(max_repetition, unique_plan, repetitions)
     
-    # Calculate an overall creativity score (simplified)
-    creativity_score = (
-        metrics['total_unique_foods'] / 30 +  # Normalize to approx 0-1
-        (7 - metrics['max_repetition']) / 7 +  # Lower repetition is better
-        (1 if has_themes else 0) + 
-        min(1, surprise_count / 5)  # Up to 1 point for surprises
-    ) / 4  # Average the components
+    # Unique (plan, day, food) triples, summed per plan, give the daily unique totals
+    daily_keys = np.unique((plan_idx * day_span + batch['day']) * food_span + food_ids)
+    daily_unique_total = np.bincount(daily_keys // (day_span * food_span), minlength=num_plans)
     
-    metrics['creativity_score'] = min(1, max(0, creativity_score))  # Clamp to 0-1
+    num_assignments = np.bincount(plan_idx, minlength=num_plans)
+    surprise_count = np.bincount(plan_idx, weights=(batch['flags'] & FLAG_SURPRISE) != 0, minlength=num_plans)
     
-    return metrics
\ No newline at end of file
+    return [
+        _creativity_metrics(
+            total_unique_foods=int(total_unique[p]),
+            daily_unique_total=int(daily_unique_total[p]),
+            num_days=int(batch['num_days'][p]),
+            max_repetition=int(max_repetition[p]),
+            num_assignments=int(num_assignments[p]),
+            has_themes=bool(batch['has_themes'][p]),
+            surprise_count=int(surprise_count[p])
+        )
+        for p in range(num_plans)
+    ]
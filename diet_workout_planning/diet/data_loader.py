@@ -1,55 +1,182 @@
+import os
 import pandas as pd
 import numpy as np
 
-def get_food_data():
-    food_data = pd.read_csv("data/foundation_food_with_nutrients_and_diet_group.csv")
+from diet_workout_planning.diet.food_labels import label_diet_groups, label_meal_suitability
+from diet_workout_planning.utils.fdc_release import read_release_csv, release_has_file
+
+FOUNDATION_DIR = "data/FoodData_Central_foundation_food_csv_2024-10-31"
+FOUNDATION_ZIP = FOUNDATION_DIR + ".zip"
+SR_LEGACY_DIR = "data/FoodData_Central_sr_legacy_food_csv_2018-04"
+DIET_GROUP_CSV = "data/foundation_food_with_nutrients_and_diet_group.csv"
+
+FOOD_COLUMNS = ["fdc_id", "name", "diet_guide_group", "calories", "proteins", "breakfast", "lunch", "dinner"]
+
+# vegetables and fruits use cup as the unit
+CUP_GROUPS = ["Dark-Green Vegetables", "Red and Orange Vegetables", "Starchy Vegetables", "Other Vegetables", "Beans, Peas, Lentils", "Fruits"]
+OUNCE_GROUPS = ["Meats, Poultry, Eggs", "Seafood", "Nuts, Seeds, Soy Products", "Dairy", "Whole Grains", "Refined Grains"]
+OUNCE_TO_GRAMS = 28.3495
+DEFAULT_CUP_TO_GRAMS = 250
+
+CUP_UNIT_ID = 1000
+TABLESPOON_UNIT_ID = 1001
+UNDETERMINED_UNIT_ID = 9999
+
+# Placeholder calories for foods without any energy value, keeps them out of the optimizer's way
+MISSING_CALORIES = 10000
+
+# FoodData Central nutrient ids
+ENERGY_KCAL_ID = 1008
+ENERGY_ATWATER_GENERAL_ID = 2047
+PROTEIN_ID = 1003
+
+
+def _portion_units(food_portion_data):
+    """Label every portion row as 'cup', 'tablespoon' or None"""
+    unit_ids = food_portion_data["measure_unit_id"]
+    units = pd.Series(None, index=food_portion_data.index, dtype=object)
+    units[unit_ids == CUP_UNIT_ID] = "cup"
+    units[unit_ids == TABLESPOON_UNIT_ID] = "tablespoon"
+
+    # SR Legacy stores every portion with an undetermined unit and names it in the modifier instead
+    if "modifier" in food_portion_data.columns:
+        modifier = food_portion_data["modifier"].astype("string").str.lower().str.split(r"[\s,]", n=1, regex=True).str[0]
+        undetermined = unit_ids == UNDETERMINED_UNIT_ID
+        units[undetermined & (modifier == "cup")] = "cup"
+        units[undetermined & (modifier == "tbsp")] = "tablespoon"
+
+    return units
+
+
+def _cup_to_grams(fdc_ids, food_portion_data):
+    """
+    Grams in one cup of each food, aligned with fdc_ids
+
+    Uses the first cup portion of a food, then the first tablespoon portion
+    (16 per cup), and falls back to 250 g when neither exists.
+    """
+    units = _portion_units(food_portion_data)
+    grams_per_unit = food_portion_data["gram_weight"] / food_portion_data["amount"]
+
+    def first_per_food(unit):
+        rows = food_portion_data[units == unit]
+        return grams_per_unit[rows.index].groupby(rows["fdc_id"], sort=False).first()
+
+    cup = fdc_ids.map(first_per_food("cup"))
+    tablespoon = fdc_ids.map(first_per_food("tablespoon")) * 16
+    return cup.fillna(tablespoon).fillna(DEFAULT_CUP_TO_GRAMS)
+
+
+def _apply_serving_sizes(food_data, food_portion_data):
+    """Convert per-100 g nutrient values into cup or ounce equivalent servings"""
+    food_data = food_data.copy()
+
+    is_cup = food_data["diet_guide_group"].isin(CUP_GROUPS)
+    cup_to_grams = _cup_to_grams(food_data.loc[is_cup, "fdc_id"], food_portion_data)
+    food_data.loc[is_cup, "calories"] = food_data.loc[is_cup, "calories"] / (100 / cup_to_grams)
+    food_data.loc[is_cup, "proteins"] = food_data.loc[is_cup, "proteins"] / (100 / cup_to_grams)
+
+    is_ounce = food_data["diet_guide_group"].isin(OUNCE_GROUPS)
+    has_calories = food_data["calories"] != MISSING_CALORIES
+    food_data.loc[is_ounce & has_calories, "calories"] = food_data.loc[is_ounce & has_calories, "calories"] / (100 / OUNCE_TO_GRAMS)
+    food_data.loc[is_ounce, "proteins"] = food_data.loc[is_ounce, "proteins"] / (100 / OUNCE_TO_GRAMS)
+
+    return food_data
+
+
+def _default_foundation_source():
+    """Prefer the extracted Foundation release, otherwise read from its zip"""
+    return FOUNDATION_DIR if os.path.isdir(FOUNDATION_DIR) else FOUNDATION_ZIP
+
+
+def get_food_data(foundation_source=None):
+    """
+    Load the curated Foundation foods with per-serving calories and proteins
+
+    foundation_source is the Foundation release folder or its zip; only
+    food_portion.csv is read from it.
+    """
+    if foundation_source is None:
+        foundation_source = _default_foundation_source()
+
+    food_data = pd.read_csv(DIET_GROUP_CSV)
     food_data.rename(columns={"Energy": "calories", "Protein": "proteins"}, inplace=True)
 
-    food_portion_data = pd.read_csv("data/FoodData_Central_foundation_food_csv_2024-10-31/food_portion.csv")
+    food_portion_data = read_release_csv("food_portion.csv", foundation_source)
+
+    food_data["calories"] = food_data["calories"].fillna(food_data["Energy (Atwater General Factors)"]).fillna(MISSING_CALORIES)
+
+    food_data = food_data[FOOD_COLUMNS]
+
+    return _apply_serving_sizes(food_data, food_portion_data)
+
 
-    for index, row in food_data.iterrows():
-        if np.isnan(row["calories"]):
-            if not np.isnan(row["Energy (Atwater General Factors)"]):
-                food_data.at[index, "calories"] = row["Energy (Atwater General Factors)"]
-            else:
-                food_data.at[index, "calories"] = 10000
+def normalize_description(descriptions: pd.Series) -> pd.Series:
+    """Lowercase descriptions and collapse punctuation so near-identical names compare equal"""
+    return (
+        descriptions.fillna("")
+        .str.lower()
+        .str.replace(r"[^a-z0-9%]+", " ", regex=True)
+        .str.strip()
+    )
 
-    food_data = food_data[["fdc_id", "name", "diet_guide_group", "calories", "proteins", "breakfast", "lunch", "dinner"]]
 
-    # vegetables and fruits use cup as the unit
-    cup_groups = ["Dark-Green Vegetables", "Red and Orange Vegetables", "Starchy Vegetables", "Other Vegetables", "Beans, Peas, Lentils", "Fruits"]
+def _load_usda_source(source, food_list_csv):
+    """
+    Load one raw FoodData Central release with machine-made labels
 
-    cup_food = food_data[food_data["diet_guide_group"].isin(cup_groups)]
-    # print(cup_food)
+    source is the release folder or zip. Nutrients are pivoted in a single
+    pass over food_nutrient.csv, restricted to the foods listed in
+    food_list_csv (e.g. sr_legacy_food.csv).
+    """
+    food_ids = read_release_csv(food_list_csv, source, usecols=["fdc_id"])["fdc_id"]
+    food_df = read_release_csv("food.csv", source, usecols=["fdc_id", "description"])
+    food_df = food_df[food_df["fdc_id"].isin(food_ids)]
 
-    for index, row in cup_food.iterrows():
-        food_portion_data_rows = food_portion_data[food_portion_data["fdc_id"] == row["fdc_id"]]
-        cup_rows = food_portion_data_rows[food_portion_data_rows["measure_unit_id"] == 1000]
+    nutrient_ids = [ENERGY_KCAL_ID, ENERGY_ATWATER_GENERAL_ID, PROTEIN_ID]
+    food_nutrient_df = read_release_csv("food_nutrient.csv", source, usecols=["fdc_id", "nutrient_id", "amount"])
+    food_nutrient_df = food_nutrient_df[
+        food_nutrient_df["nutrient_id"].isin(nutrient_ids) & food_nutrient_df["fdc_id"].isin(food_ids)
+    ]
+    nutrients = food_nutrient_df.pivot_table(
+        index="fdc_id", columns="nutrient_id", values="amount", aggfunc="first"
+    ).reindex(columns=nutrient_ids)
 
-        if len(cup_rows) != 0:
-            cup_to_grams = cup_rows["gram_weight"].values[0] / cup_rows["amount"].values[0]
+    food_data = food_df.rename(columns={"description": "name"}).set_index("fdc_id")
+    food_data["calories"] = nutrients[ENERGY_KCAL_ID].fillna(nutrients[ENERGY_ATWATER_GENERAL_ID])
+    food_data["proteins"] = nutrients[PROTEIN_ID]
+    food_data = food_data.reset_index()
+
+    food_data["calories"] = food_data["calories"].fillna(MISSING_CALORIES)
+    food_data["proteins"] = food_data["proteins"].fillna(0)
+
+    food_data["diet_guide_group"] = label_diet_groups(food_data["name"])
+    food_data = food_data.dropna(subset=["diet_guide_group"])
+    food_data = pd.concat([food_data, label_meal_suitability(food_data["name"], food_data["diet_guide_group"])], axis=1)
+
+    food_portion_data = read_release_csv("food_portion.csv", source)
+    return _apply_serving_sizes(food_data[FOOD_COLUMNS], food_portion_data)
+
+
+def get_combined_food_data(include_sr_legacy=True, foundation_source=None, sr_legacy_source=SR_LEGACY_DIR):
+    """
+    Load Foundation foods merged with SR Legacy foods
+
+    Foundation foods keep their hand-curated diet groups and meal labels;
+    SR Legacy foods are labelled by keyword. Foods whose normalized
+    description already exists in an earlier source are dropped, so
+    Foundation wins over SR Legacy. Either source may be a release folder
+    or a release zip.
+    """
+    frames = [get_food_data(foundation_source)]
+
+    if include_sr_legacy:
+        if release_has_file("food_nutrient.csv", sr_legacy_source):
+            frames.append(_load_usda_source(sr_legacy_source, "sr_legacy_food.csv"))
         else:
-            tablespoon_rows = food_portion_data_rows[food_portion_data_rows["measure_unit_id"] == 1001]
-
-            if len(tablespoon_rows) != 0:
-                cup_to_grams = tablespoon_rows["gram_weight"].values[0] / tablespoon_rows["amount"].values[0] * 16
-            else:
-                cup_to_grams = 250
-        
-        food_data.at[index, "calories"] = row["calories"] / (100 / cup_to_grams)
-        food_data.at[index, "proteins"] = row["proteins"] / (100 / cup_to_grams)
-
-    # print(food_data[food_data["diet_guide_group"].isin(cup_groups)])
-
-    ounce_groups = ["Meats, Poultry, Eggs", "Seafood", "Nuts, Seeds, Soy Products", "Dairy", "Whole Grains", "Refined Grains"]
-    ounce_to_grams = 28.3495
-
-    ounce_food = food_data[food_data["diet_guide_group"].isin(ounce_groups)]
-    # print(ounce_food)
-    for index, row in ounce_food.iterrows():
-        if row["calories"] != 10000:
-            food_data.at[index, "calories"] = row["calories"] / (100 / ounce_to_grams)
-        food_data.at[index, "proteins"] = row["proteins"] / (100 / ounce_to_grams)
-    # print(food_data[food_data["diet_guide_group"].isin(ounce_groups)])
-
-    return food_data
\ No newline at end of file
+            print(f"Warning: {sr_legacy_source} has no food_nutrient.csv, skipping SR Legacy foods")
+
+    food_data = pd.concat(frames, ignore_index=True)
+    food_data = food_data[~normalize_description(food_data["name"]).duplicated(keep="first")]
+
+    return food_data.reset_index(drop=True)
@@ -1,3 +1,5 @@
+import numpy as np
+
 # Dictionary of user profiles for different calorie levels based on USDA dietary guidelines
 
 dietary_profiles = {
@@ -321,4 +323,16 @@ def get_profile(calorie_target):
             return dietary_profiles[level]
     
     # If target exceeds all available levels, return the highest
-    return dietary_profiles[available_levels[-1]]
\ No newline at end of file
+    return dietary_profiles[available_levels[-1]]
+
+
+def get_profile_levels(calorie_targets):
+    """
+    Vectorized get_profile: the calorie level (a key of dietary_profiles) for every target
+
+    Same rule as get_profile: the smallest level not below the target,
+    or the highest level when the target exceeds them all.
+    """
+    available_levels = np.array(sorted(dietary_profiles.keys()))
+    positions = np.searchsorted(available_levels, np.asarray(calorie_targets, dtype=np.float64), side="left")
+    return available_levels[np.minimum(positions, len(available_levels) - 1)]
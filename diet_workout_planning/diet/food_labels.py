@@ -0,0 +1,136 @@
+import re
+import numpy as np
+import pandas as pd
+
+from diet_workout_planning.diet.food_model import DietGuideGroup
+
+
+# Keywords per food group, based on the examples in the Dietary Guidelines (see data/food_category.py).
+# The order matters: when a description matches several groups, the first group wins.
+DIET_GROUP_KEYWORDS = {
+    DietGuideGroup.SEAFOOD: [
+        "fish", "anchovy", "bass", "catfish", "clam", "cod", "crab", "crayfish", "crustaceans",
+        "flounder", "haddock", "hake", "herring", "lobster", "mackerel", "mollusks", "mullet",
+        "oyster", "perch", "pollock", "salmon", "sardine", "scallop", "shrimp", "sole", "squid",
+        "tilapia", "trout", "tuna", "whiting"
+    ],
+    DietGuideGroup.MEATS_POULTRY_EGGS: [
+        "beef", "goat", "lamb", "pork", "veal", "chicken", "duck", "goose", "turkey", "egg",
+        "ham", "bacon", "sausage", "frankfurter", "game meat"
+    ],
+    DietGuideGroup.NUTS_SEEDS_SOY: [
+        "nuts", "almond", "brazilnut", "cashew", "chestnut", "filbert", "hazelnut", "macadamia",
+        "peanut", "pecan", "pistachio", "walnut", "seeds", "tofu", "soybean", "tempeh"
+    ],
+    DietGuideGroup.BEANS_PEAS_LENTILS: [
+        "beans", "chickpea", "cowpea", "edamame", "hummus", "lentil", "split pea", "pigeon pea"
+    ],
+    DietGuideGroup.DARK_GREEN_VEGETABLES: [
+        "amaranth leaves", "arugula", "basil", "beet greens", "bok choy", "broccoli", "chard",
+        "cilantro", "collards", "cress", "dandelion greens", "kale", "mustard greens", "romaine",
+        "spinach", "turnip greens", "watercress"
+    ],
+    DietGuideGroup.RED_ORANGE_VEGETABLES: [
+        "sweet potato", "calabaza", "carrot", "pimento", "pumpkin", "tomato", "butternut",
+        "squash, winter", "peppers, sweet, red", "peppers, sweet, orange"
+    ],
+    DietGuideGroup.STARCHY_VEGETABLES: [
+        "potato", "breadfruit", "cassava", "corn, sweet", "jicama", "plantain", "taro", "yam",
+        "yucca", "water chestnut", "peas, green"
+    ],
+    DietGuideGroup.OTHER_VEGETABLES: [
+        "artichoke", "asparagus", "avocado", "bamboo shoots", "beets", "brussels sprouts",
+        "cabbage", "cauliflower", "celery", "cucumber", "eggplant", "garlic", "kohlrabi", "leek",
+        "lettuce", "mushroom", "okra", "onion", "radish", "squash, summer", "zucchini", "turnip"
+    ],
+    DietGuideGroup.FRUITS: [
+        "apple", "apricot", "banana", "blackberries", "blueberries", "cranberries", "raspberries",
+        "strawberries", "grapefruit", "lemon", "lime", "tangerine", "orange", "cherries", "dates",
+        "figs", "grape", "guava", "kiwifruit", "mango", "melon", "cantaloupe", "nectarine",
+        "papaya", "peach", "pear", "persimmon", "pineapple", "plum", "pomegranate", "prune",
+        "raisin"
+    ],
+    DietGuideGroup.WHOLE_GRAINS: [
+        "whole grain", "whole-grain", "whole wheat", "whole-wheat", "brown rice", "wild rice",
+        "amaranth", "buckwheat", "bulgur", "millet", "oat", "popcorn", "quinoa", "rye",
+        "sorghum", "spelt", "teff"
+    ],
+    DietGuideGroup.REFINED_GRAINS: [
+        "bread", "bagel", "cereal", "cracker", "couscous", "flour", "grits", "macaroni",
+        "noodle", "pasta", "rice", "spaghetti", "tortilla", "barley"
+    ],
+    DietGuideGroup.DAIRY: [
+        "milk", "buttermilk", "cheese", "yogurt", "kefir", "cream", "butter"
+    ],
+    DietGuideGroup.OIL: [
+        "oil", "margarine", "shortening"
+    ],
+}
+
+# Which meals each group is usually eaten at, following the hand-labelled Foundation data
+DEFAULT_MEAL_SUITABILITY = {
+    DietGuideGroup.SEAFOOD: (0, 1, 1),
+    DietGuideGroup.MEATS_POULTRY_EGGS: (0, 1, 1),
+    DietGuideGroup.NUTS_SEEDS_SOY: (1, 1, 1),
+    DietGuideGroup.BEANS_PEAS_LENTILS: (0, 1, 1),
+    DietGuideGroup.DARK_GREEN_VEGETABLES: (0, 1, 1),
+    DietGuideGroup.RED_ORANGE_VEGETABLES: (0, 1, 1),
+    DietGuideGroup.STARCHY_VEGETABLES: (0, 1, 1),
+    DietGuideGroup.OTHER_VEGETABLES: (0, 1, 1),
+    DietGuideGroup.FRUITS: (1, 1, 1),
+    DietGuideGroup.WHOLE_GRAINS: (1, 1, 1),
+    DietGuideGroup.REFINED_GRAINS: (1, 1, 1),
+    DietGuideGroup.DAIRY: (1, 1, 0),
+    DietGuideGroup.OIL: (0, 0, 0),
+}
+
+# Foods that are breakfast staples regardless of their group
+BREAKFAST_KEYWORDS = ["egg", "bacon", "sausage", "cereal", "oatmeal", "pancake", "waffle", "juice"]
+
+
+def _keyword_pattern(keywords):
+    """Build a word-boundary regex that also accepts simple plurals"""
+    alternatives = "|".join(re.escape(keyword) for keyword in keywords)
+    return rf"\b(?:{alternatives})(?:e?s)?\b"
+
+
+def label_diet_groups(descriptions: pd.Series) -> pd.Series:
+    """
+    Assign a diet guide group to each food description
+
+    The leading segment of a USDA description (before the first comma) names
+    the food itself, so it is matched first; the full description is only
+    used when the leading segment matches no group. Foods that match nothing
+    are labelled NaN.
+    """
+    lowered = descriptions.fillna("").str.lower()
+    leading = lowered.str.split(",", n=1).str[0]
+    groups = [group.value for group in DIET_GROUP_KEYWORDS]
+
+    labels = pd.Series(np.nan, index=descriptions.index, dtype=object)
+    for text in (leading, lowered):
+        conditions = [
+            text.str.contains(_keyword_pattern(keywords), regex=True)
+            for keywords in DIET_GROUP_KEYWORDS.values()
+        ]
+        matched = pd.Series(np.select(conditions, groups, default=""), index=descriptions.index)
+        labels = labels.where(labels.notna(), matched.replace("", np.nan))
+
+    return labels
+
+
+def label_meal_suitability(descriptions: pd.Series, diet_groups: pd.Series) -> pd.DataFrame:
+    """Return breakfast/lunch/dinner flags (0 or 1) for each labelled food"""
+    defaults = {group.value: flags for group, flags in DEFAULT_MEAL_SUITABILITY.items()}
+    flags = pd.DataFrame(
+        [defaults.get(group, (0, 0, 0)) for group in diet_groups],
+        index=descriptions.index,
+        columns=["breakfast", "lunch", "dinner"]
+    )
+
+    is_breakfast_food = descriptions.fillna("").str.lower().str.contains(
+        _keyword_pattern(BREAKFAST_KEYWORDS), regex=True
+    )
+    flags.loc[is_breakfast_food & diet_groups.notna(), "breakfast"] = 1
+
+    return flags
@@ -1,6 +1,8 @@
+import copy
 from dataclasses import dataclass, field
 from typing import Dict, List, Set, Optional, Union, Any
 from enum import Enum
+import numpy as np
 import pandas as pd
 
 
@@ -21,6 +23,23 @@ class DietGuideGroup(Enum):
     OIL = "Oil"
 
 
+# Aggregated food group categories used by category constraints
+FOOD_GROUP_CATEGORIES = {
+    "protein": [
+        DietGuideGroup.MEATS_POULTRY_EGGS,
+        DietGuideGroup.SEAFOOD,
+        DietGuideGroup.BEANS_PEAS_LENTILS,
+        DietGuideGroup.NUTS_SEEDS_SOY
+    ],
+    "vegetable": [
+        DietGuideGroup.DARK_GREEN_VEGETABLES,
+        DietGuideGroup.RED_ORANGE_VEGETABLES,
+        DietGuideGroup.STARCHY_VEGETABLES,
+        DietGuideGroup.OTHER_VEGETABLES
+    ]
+}
+
+
 class MealType(Enum):
     """Enum representing different meal types"""
     BREAKFAST = "breakfast"
@@ -43,6 +62,16 @@ class ConstraintOperation(Enum):
     RANGE = "range"
 
 
+# How far a plan may miss a constraint bound and still meet it, relative to the
+# bound's magnitude; the validator and the nutrition repair both check with it
+CONSTRAINT_RTOL = 1e-9
+
+
+def constraint_tolerance(bound):
+    """Allowed miss for a bound (a number or an array), never below CONSTRAINT_RTOL"""
+    return CONSTRAINT_RTOL * np.maximum(np.abs(bound), 1.0)
+
+
 @dataclass
 class FoodItem:
     """Class representing a food item in the database"""
@@ -114,6 +143,7 @@ class DietaryRequirements:
     """Collection of all dietary requirements"""
     constraints: List[Constraint] = field(default_factory=list)
     objectives: List[OptimizationObjective] = field(default_factory=list)
+    restrictions: List[str] = field(default_factory=list)  # Foods whose name contains any of these are excluded
     
     def add_constraint(self, constraint: Constraint):
         """Add a new constraint"""
@@ -132,9 +162,14 @@ class DietaryRequirements:
         return [c for c in self.constraints if c.type == ConstraintType.WEEKLY]
 
 
-@dataclass
+@dataclass(frozen=True)
 class MealAssignment:
-    """Assignment of a food item to a specific meal"""
+    """
+    Assignment of a food item to a specific meal
+
+    Frozen, so Meal's cached totals cannot go stale behind its back; change
+    a quantity with dataclasses.replace and Meal.replace_food.
+    """
     food_id: int
     food_name: str
     quantity: float  # Number of servings
@@ -144,22 +179,111 @@ class MealAssignment:
     additional_attributes: Dict[str, Any] = field(default_factory=dict)
 
 
+class MealTotals:
+    """Running calorie, protein and per-group serving totals of a meal's food items"""
+    __slots__ = ('calories', 'proteins', 'groups', 'items')
+
+    def __init__(self, food_items=()):
+        self.calories = 0
+        self.proteins = 0
+        self.groups = {}
+        self.items = tuple(food_items)  # the food items these totals describe
+        for item in self.items:
+            self.add(item)
+
+    def add(self, item: MealAssignment):
+        self.calories += item.calories * item.quantity
+        self.proteins += item.proteins * item.quantity
+        self.groups[item.diet_guide_group] = self.groups.get(item.diet_guide_group, 0) + item.quantity
+
+    def remove(self, item: MealAssignment) -> bool:
+        """Take an item back out; returns False if the totals have to be rebuilt instead"""
+        calories, proteins = item.calories * item.quantity, item.proteins * item.quantity
+        if calories != calories or proteins != proteins:  # NaN can't be subtracted back out
+            return False
+        self.calories -= calories
+        self.proteins -= proteins
+        self.groups[item.diet_guide_group] -= item.quantity
+        return True
+
+    def copy(self):
+        totals = MealTotals()
+        totals.calories, totals.proteins, totals.items = self.calories, self.proteins, self.items
+        totals.groups = dict(self.groups)
+        return totals
+
+
 @dataclass
 class Meal:
     """A collection of food items for a specific meal"""
     meal_type: MealType
     food_items: List[MealAssignment] = field(default_factory=list)
+    # Built on first use and kept current by add_food/replace_food/remove_food. The totals
+    # remember the items they describe, so direct edits of food_items are noticed too.
+    _totals: Optional[MealTotals] = field(default=None, init=False, repr=False, compare=False)
+
+    def _valid_totals(self) -> Optional[MealTotals]:
+        """The cached totals if they still describe food_items"""
+        totals = self._totals
+        if totals is not None and totals.items == tuple(self.food_items):
+            return totals
+        return None
+
+    def _current_totals(self) -> MealTotals:
+        totals = self._valid_totals()
+        if totals is None:
+            totals = self._totals = MealTotals(self.food_items)
+        return totals
     
     @property
     def total_calories(self):
-        return sum(item.calories * item.quantity for item in self.food_items)
+        return self._current_totals().calories
     
     @property
     def total_proteins(self):
-        return sum(item.proteins * item.quantity for item in self.food_items)
+        return self._current_totals().proteins
+
+    @property
+    def group_totals(self) -> Dict[Any, float]:
+        """Servings per diet guide group (read-only)"""
+        return self._current_totals().groups
     
     def add_food(self, food_assignment: MealAssignment):
+        totals = self._valid_totals()
         self.food_items.append(food_assignment)
+        if totals is not None:
+            totals.add(food_assignment)
+            totals.items = tuple(self.food_items)
+
+    def replace_food(self, index: int, food_assignment: MealAssignment):
+        """Swap the assignment at index for another one"""
+        totals = self._valid_totals()
+        if totals is not None and not totals.remove(self.food_items[index]):
+            totals = self._totals = None
+        self.food_items[index] = food_assignment
+        if totals is not None:
+            totals.add(food_assignment)
+            totals.items = tuple(self.food_items)
+
+    def remove_food(self, index: int):
+        """Drop the assignment at index"""
+        totals = self._valid_totals()
+        if totals is not None and not totals.remove(self.food_items[index]):
+            totals = self._totals = None
+        del self.food_items[index]
+        if totals is not None:
+            totals.items = tuple(self.food_items)
+
+    def invalidate(self):
+        """Forget the cached totals (not needed after editing food_items, which is detected)"""
+        self._totals = None
+
+    def clone(self):
+        """Copy of the meal with its own item list (assignments are shared)"""
+        meal = Meal(meal_type=self.meal_type, food_items=list(self.food_items))
+        if self._totals is not None:
+            meal._totals = self._totals.copy()
+        return meal
 
 
 @dataclass
@@ -176,11 +300,41 @@ class DailyPlan:
     def total_proteins(self):
         return sum(meal.total_proteins for meal in self.meals.values())
 
+    def shallow_copy(self):
+        """Copy of the day (including its theme) that shares the Meal objects"""
+        day = copy.copy(self)
+        day.meals = dict(self.meals)
+        return day
+
 
 @dataclass
 class WeeklyPlan:
     """Complete weekly meal plan"""
     days: List[DailyPlan] = field(default_factory=list)
+    # id -> meal for the meals this plan owns; None unless the plan is a copy-on-write copy.
+    # Holding the meals keeps their ids from being reused by other objects.
+    _owned_meals: Optional[Dict[int, "Meal"]] = field(default=None, repr=False, compare=False)
+
+    def copy_on_write(self):
+        """
+        Cheap copy of the plan that shares meals with the original
+
+        Days are copied but their Meal objects (and the MealAssignments in
+        them) are shared until a meal is fetched through mutable_meal(), which
+        clones just that meal. Code modifying a copy must go through
+        mutable_meal() and replace MealAssignments rather than edit them.
+        """
+        return WeeklyPlan(days=[day.shallow_copy() for day in self.days], _owned_meals={})
+
+    def mutable_meal(self, day_idx, meal_type) -> Meal:
+        """Return a meal that is safe to modify, cloning it first if it is still shared"""
+        day = self.days[day_idx]
+        meal = day.meals[meal_type]
+        if self._owned_meals is not None and self._owned_meals.get(id(meal)) is not meal:
+            meal = meal.clone()
+            day.meals[meal_type] = meal
+            self._owned_meals[id(meal)] = meal
+        return meal
     
     @property
     def total_calories(self):
@@ -192,12 +346,15 @@ class WeeklyPlan:
     
     def get_food_group_counts(self):
         """Count occurrences of each food group in the plan"""
-        counts = {group: 0 for group in DietGuideGroup}
-        
+        servings_by_group = {}
         for day in self.days:
             for meal in day.meals.values():
-                for food in meal.food_items:
-                    counts[DietGuideGroup(food.diet_guide_group)] += food.quantity
+                for group, servings in meal.group_totals.items():
+                    servings_by_group[group] = servings_by_group.get(group, 0) + servings
+        
+        counts = dict.fromkeys(DietGuideGroup, 0)
+        for group, servings in servings_by_group.items():
+            counts[DietGuideGroup(group)] += servings
         
         return counts
     
@@ -223,9 +380,11 @@ class FoodDatabase:
     """Manager for the food database"""
     def __init__(self):
         self.foods = {}  # id -> FoodItem
+        self.version = 0  # Bumped on every load so derived indexes know to rebuild
         
     def load_from_dataframe(self, df):
         """Load food items from a pandas DataFrame"""
+        self.version += 1
         id_counter = iter(range(1, len(df) + 1))
         for _, row in df.iterrows():
             food_item = FoodItem.from_dataframe_row(row, id_counter)
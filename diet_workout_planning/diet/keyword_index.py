@@ -0,0 +1,105 @@
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+from diet_workout_planning.diet.food_model import FoodDatabase, FoodItem, MealType
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher that reports every (possibly overlapping) keyword in one pass"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+
+        for keyword in keywords:
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].add(keyword)
+
+        # Breadth-first pass to build failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def find_all(self, text: str) -> Set[str]:
+        """Return the set of keywords occurring anywhere in text"""
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state]:
+                found |= self.output[state]
+        return found
+
+
+class KeywordFoodIndex:
+    """
+    Precomputed keyword -> matching foods table, per meal type
+
+    Food names are scanned once with an Aho-Corasick matcher over all
+    keywords. Lookups return foods in catalog order, so callers see the same
+    lists as a linear scan of food_db.foods would produce. The index
+    rebuilds itself when the food database is reloaded.
+    """
+
+    def __init__(self, food_db: FoodDatabase, keywords: Iterable[str]):
+        self.food_db = food_db
+        self.keywords = sorted(set(keywords))
+        self._matcher = AhoCorasick(self.keywords)
+        self._version = None
+        self._build()
+
+    def _build(self):
+        self._position = {}
+        self._by_keyword: Dict[MealType, Dict[str, List[int]]] = {
+            meal_type: {keyword: [] for keyword in self.keywords} for meal_type in MealType
+        }
+
+        for position, food in enumerate(self.food_db.foods.values()):
+            self._position[food.id] = position
+            matched = self._matcher.find_all(food.name.lower())
+            for meal_type in MealType:
+                if meal_type in food.meal_suitability:
+                    for keyword in matched:
+                        self._by_keyword[meal_type][keyword].append(food.id)
+
+        self._cache = {}
+        self._version = self.food_db.version
+
+    def foods_matching(self, keywords: Iterable[str], meal_type: MealType) -> List[FoodItem]:
+        """Foods suitable for meal_type whose name contains any of the keywords"""
+        key = (frozenset(keywords), meal_type)
+
+        missing = key[0].difference(self.keywords)
+        if missing:
+            self.keywords = sorted(missing.union(self.keywords))
+            self._matcher = AhoCorasick(self.keywords)
+            self._build()
+        elif self._version != self.food_db.version:
+            self._build()
+
+        if key not in self._cache:
+            food_ids = set()
+            for keyword in key[0]:
+                food_ids.update(self._by_keyword[meal_type].get(keyword, ()))
+            self._cache[key] = [
+                self.food_db.foods[food_id]
+                for food_id in sorted(food_ids, key=self._position.__getitem__)
+            ]
+        return self._cache[key]
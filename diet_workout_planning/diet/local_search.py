@@ -0,0 +1,327 @@
+import math
+import random
+import time
+
+import numpy as np
+
+from diet_workout_planning.diet.food_model import DietaryRequirements, FoodDatabase, MealType
+from diet_workout_planning.diet.optimizer import DietOptimizer
+from diet_workout_planning.diet.plan_validator import PlanValidator
+from diet_workout_planning.diet.restrictions import get_food_restrictions
+
+
+class LocalSearchOptimizer(DietOptimizer):
+    """
+    Simulated annealing alternative to the CBC MIP in DietOptimizer
+
+    Works on the same decision variables as the MIP (0-3 integer servings of
+    each suitable food per meal and day) with four moves: change the
+    servings of a food, add a food, swap a food for another one and move a
+    food to another meal of the same day. The requirements' constraints
+    become penalties and its objectives (diversity, consecutive-day
+    repetition, protein) are kept as running totals, so a move is evaluated
+    by updating the totals of the one day it touches instead of re-scoring
+    the plan. The search stops after max_iterations or time_limit seconds,
+    whichever comes first, and keeps the best plan it has seen.
+
+    solve() returns a solution in the same format as DietOptimizer.solve(),
+    so generate_meal_plan() and enhance_creativity() work unchanged.
+    """
+
+    MAX_SERVINGS = 3  # same bound as the MIP
+    PENALTY_WEIGHT = 1000.0  # cost of a fully violated constraint relative to one unit of objective
+
+    def __init__(self, food_database: FoodDatabase, dietary_requirements: DietaryRequirements,
+                 max_iterations: int = 20000, time_limit: float = 5.0, seed=None,
+                 initial_temperature: float = 2.0, final_temperature: float = 0.01):
+        super().__init__(food_database, dietary_requirements)
+        self.max_iterations = max_iterations
+        self.time_limit = time_limit
+        self.seed = seed
+        self.initial_temperature = initial_temperature
+        self.final_temperature = final_temperature
+        self.num_days = 7
+        self.stats = {}
+
+    def create_optimization_problem(self):
+        """Compile the requirements into coefficient arrays and objective weights"""
+        validator = PlanValidator(self.requirements, self.foods, num_days=self.num_days)
+        self._validator = validator
+        self._coef = validator.coefficients.T.copy()  # food id -> measures
+        self._cal = validator.coefficients[validator.calorie_measure]
+        self._cal_row = validator.calorie_measure
+
+        proteins = np.zeros(len(self._cal))
+        for food in self.foods.foods.values():
+            proteins[food.id] = food.proteins
+        self._proteins = np.nan_to_num(proteins)
+
+        def bounds(scope):
+            checks = [check for check in validator.checks if check[1] == scope]
+            lower = np.array([check[3] for check in checks], dtype=float)
+            upper = np.array([check[4] for check in checks], dtype=float)
+            finite = np.where(np.isfinite(lower), np.abs(lower), 0)
+            finite = np.maximum(finite, np.where(np.isfinite(upper), np.abs(upper), 0))
+            return np.array([check[2] for check in checks], dtype=np.int64), lower, upper, np.maximum(finite, 1)
+
+        self._daily_checks = bounds('daily')
+        self._weekly_checks = bounds('weekly')
+        _, share_lower, share_upper, _ = bounds('meal_share')
+        self._share_bounds = (share_lower[:, None], share_upper[:, None]) if len(share_lower) else None
+
+        # Objective weights, with the same signs as the MIP objective handlers
+        self._diversity_weight = 0.0
+        self._consecutive_weight = 0.0
+        self._protein_weight = 0.0
+        self._calorie_weight = 0.0
+        handled = False
+        for objective in self.requirements.objectives:
+            sign = -1 if objective.maximize else 1
+            if objective.attribute == 'diversity':
+                self._diversity_weight += sign * objective.weight
+            elif objective.attribute == 'creativity':
+                self._consecutive_weight += objective.weight
+            elif objective.attribute == 'proteins':
+                self._protein_weight += sign * objective.weight
+            else:
+                print(f"Warning: No local search handler for objective attribute '{objective.attribute}'")
+                continue
+            handled = True
+        if not handled:
+            self._calorie_weight = 1.0
+
+        meal_types = list(MealType)
+        self._meal_types = meal_types
+        # As in the MIP, restricted foods are never candidates
+        self.food_ids = get_food_restrictions(self.foods).allowed_food_ids(self.requirements.restrictions)
+        self._suitable = [
+            [food_id for food_id in self.food_ids if self.foods.get_by_id(food_id).meal_suitability.get(meal_type, False)]
+            for meal_type in meal_types
+        ]
+        self._suitable_sets = [set(food_ids) for food_ids in self._suitable]
+        self._position = {food_id: i for i, food_id in enumerate(self.foods.foods)}
+
+        self.problem = validator
+        return self.problem
+
+    # ---------- incremental state ---------- #
+
+    def _reset_state(self):
+        num_measures = self._coef.shape[1]
+        self._meals = [[{} for _ in self._meal_types] for _ in range(self.num_days)]
+        self._usage = [{} for _ in range(self.num_days)]  # food id -> number of meals using it that day
+        self._daily = np.zeros((self.num_days, num_measures))
+        self._weekly = np.zeros(num_measures)
+        self._meal_cal = np.zeros((self.num_days, len(self._meal_types)))
+        self._objective = 0.0
+
+    def _set_servings(self, day, meal, food_id, servings):
+        """Set one decision variable and update every running total it feeds"""
+        foods = self._meals[day][meal]
+        old = foods.get(food_id, 0)
+        change = servings - old
+        if servings:
+            foods[food_id] = servings
+        else:
+            foods.pop(food_id, None)
+
+        contribution = self._coef[food_id] * change
+        self._daily[day] += contribution
+        self._weekly += contribution
+        self._meal_cal[day, meal] += self._cal[food_id] * change
+        objective = (self._protein_weight * self._proteins[food_id] + self._calorie_weight * self._cal[food_id]) * change
+
+        usage = self._usage[day]
+        if old == 0 and servings:
+            objective += self._diversity_weight
+            count = usage.get(food_id, 0)
+            usage[food_id] = count + 1
+            if count == 0:
+                objective += self._consecutive_weight * self._used_next_to(food_id, day)
+        elif old and servings == 0:
+            objective -= self._diversity_weight
+            usage[food_id] -= 1
+            if usage[food_id] == 0:
+                del usage[food_id]
+                objective -= self._consecutive_weight * self._used_next_to(food_id, day)
+
+        self._objective += objective
+        return old
+
+    def _used_next_to(self, food_id, day):
+        return ((day > 0 and food_id in self._usage[day - 1]) +
+                (day < self.num_days - 1 and food_id in self._usage[day + 1]))
+
+    def _violation(self, values, checks):
+        rows, lower, upper, scale = checks
+        if not len(rows):
+            return 0.0
+        v = values[rows]
+        return float(((np.maximum(lower - v, 0) + np.maximum(v - upper, 0)) / scale).sum())
+
+    def _day_penalty(self, day):
+        values = self._daily[day]
+        penalty = self._violation(values, self._daily_checks)
+        if self._share_bounds is not None:
+            lower, upper = self._share_bounds
+            day_calories = values[self._cal_row]
+            meals = self._meal_cal[day]
+            excess = np.maximum(lower * day_calories - meals, 0) + np.maximum(meals - upper * day_calories, 0)
+            penalty += float(excess.sum()) / max(day_calories, 1.0)
+        return penalty
+
+    # ---------- search ---------- #
+
+    def _initial_plan(self, rng):
+        """Fill each meal with random suitable foods up to a third of the daily calorie target"""
+        rows, lower, upper, _ = self._daily_checks
+        calorie_bounds = [(lo, hi) for row, lo, hi in zip(rows, lower, upper) if row == self._cal_row]
+        if calorie_bounds and all(np.isfinite(calorie_bounds[0])):
+            target = sum(calorie_bounds[0]) / 2
+        elif calorie_bounds and np.isfinite(calorie_bounds[0][0]):
+            target = calorie_bounds[0][0]
+        else:
+            target = 2000.0
+
+        for day in range(self.num_days):
+            for meal in range(len(self._meal_types)):
+                for _ in range(20):
+                    if self._meal_cal[day, meal] >= target / len(self._meal_types) or not self._suitable[meal]:
+                        break
+                    food_id = rng.choice(self._suitable[meal])
+                    if food_id not in self._meals[day][meal]:
+                        self._set_servings(day, meal, food_id, 1)
+
+    def _propose(self, rng):
+        """A random move as a list of (day, meal, food id, servings) changes, or None"""
+        day = rng.randrange(self.num_days)
+        meal = rng.randrange(len(self._meal_types))
+        foods = self._meals[day][meal]
+        kind = rng.random()
+
+        if not foods or kind < 0.25:
+            # Add a food
+            if not self._suitable[meal]:
+                return None
+            food_id = rng.choice(self._suitable[meal])
+            if food_id in foods:
+                return None
+            return [(day, meal, food_id, rng.randint(1, self.MAX_SERVINGS))]
+
+        food_id = rng.choice(list(foods))
+        servings = foods[food_id]
+        if kind < 0.55:
+            # Change servings (0 removes the food)
+            new_servings = rng.randint(0, self.MAX_SERVINGS)
+            return None if new_servings == servings else [(day, meal, food_id, new_servings)]
+        if kind < 0.85:
+            # Swap for another food suitable for the same meal
+            other = rng.choice(self._suitable[meal])
+            return None if other in foods else [(day, meal, food_id, 0), (day, meal, other, servings)]
+        # Move to another meal of the same day
+        other_meal = rng.randrange(len(self._meal_types))
+        if other_meal == meal or food_id not in self._suitable_sets[other_meal] or food_id in self._meals[day][other_meal]:
+            return None
+        return [(day, meal, food_id, 0), (day, other_meal, food_id, servings)]
+
+    def solve(self):
+        """Run the search and return the best solution found"""
+        if self.problem is None:
+            self.create_optimization_problem()
+
+        rng = random.Random(self.seed)
+        start = time.perf_counter()
+        self._reset_state()
+        self._initial_plan(rng)
+
+        day_penalties = [self._day_penalty(day) for day in range(self.num_days)]
+        weekly_penalty = self._violation(self._weekly, self._weekly_checks)
+        energy = self.PENALTY_WEIGHT * (sum(day_penalties) + weekly_penalty) + self._objective
+        best_energy = energy
+        best_meals = [[dict(foods) for foods in day] for day in self._meals]
+
+        log_ratio = math.log(self.final_temperature / self.initial_temperature)
+        iteration = 0
+        progress = 0.0
+        while iteration < self.max_iterations:
+            if iteration % 128 == 0:
+                elapsed = time.perf_counter() - start
+                if elapsed >= self.time_limit:
+                    break
+                progress = max(iteration / self.max_iterations, elapsed / self.time_limit if self.time_limit else 0)
+            iteration += 1
+
+            changes = self._propose(rng)
+            if changes is None:
+                continue
+
+            day = changes[0][0]
+            objective_before = self._objective
+            undo = [(d, m, f, self._set_servings(d, m, f, s)) for d, m, f, s in changes]
+            new_day_penalty = self._day_penalty(day)
+            new_weekly_penalty = self._violation(self._weekly, self._weekly_checks)
+            delta = (self.PENALTY_WEIGHT * (new_day_penalty - day_penalties[day] + new_weekly_penalty - weekly_penalty)
+                     + self._objective - objective_before)
+
+            temperature = self.initial_temperature * math.exp(log_ratio * progress)
+            if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+                day_penalties[day] = new_day_penalty
+                weekly_penalty = new_weekly_penalty
+                energy += delta
+                if energy < best_energy - 1e-9:
+                    best_energy = energy
+                    best_meals = [[dict(foods) for foods in day_foods] for day_foods in self._meals]
+            else:
+                for d, m, f, s in reversed(undo):
+                    self._set_servings(d, m, f, s)
+                self._objective = objective_before
+
+        solution = self._to_solution(best_meals)
+        violations = int(self._validator.validate(self._solution_plan_arrays(best_meals)).violations.sum())
+        self.stats = {
+            'iterations': iteration,
+            'elapsed': time.perf_counter() - start,
+            'energy': float(best_energy),
+            'violations': violations
+        }
+        if violations:
+            print(f"Warning: local search ended with {violations} violated constraint checks")
+
+        self.solution = solution
+        return solution
+
+    def _to_solution(self, meals):
+        """Convert the search state into DietOptimizer.solve()'s solution format"""
+        solution = {}
+        for day in range(self.num_days):
+            solution[day + 1] = {}
+            for meal, meal_type in enumerate(self._meal_types):
+                solution[day + 1][meal_type] = []
+                for food_id in sorted(meals[day][meal], key=self._position.__getitem__):
+                    food = self.foods.get_by_id(food_id)
+                    solution[day + 1][meal_type].append({
+                        'food_id': food_id,
+                        'food_name': food.name,
+                        'quantity': float(meals[day][meal][food_id]),
+                        'calories': food.calories,
+                        'proteins': food.proteins,
+                        'diet_guide_group': food.diet_guide_group
+                    })
+        return solution
+
+    def _solution_plan_arrays(self, meals):
+        """The arrays PlanValidator.validate takes, for a search state"""
+        rows = [(day, meal, food_id, servings)
+                for day in range(self.num_days)
+                for meal in range(len(self._meal_types))
+                for food_id, servings in meals[day][meal].items()]
+        return {
+            'plan': np.zeros(len(rows), dtype=np.int64),
+            'day': np.array([row[0] for row in rows], dtype=np.int64),
+            'meal': np.array([row[1] for row in rows], dtype=np.int64),
+            'food_id': np.array([row[2] for row in rows], dtype=np.int64),
+            'quantity': np.array([row[3] for row in rows], dtype=float),
+            'flags': np.zeros(len(rows), dtype=np.int64),
+            'num_days': np.array([self.num_days], dtype=np.int64),
+            'has_themes': np.zeros(1, dtype=bool),
+        }
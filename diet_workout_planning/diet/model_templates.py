@@ -0,0 +1,126 @@
+import dataclasses
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from diet_workout_planning.diet.food_model import DietaryRequirements, FoodDatabase
+from diet_workout_planning.diet.optimizer import DietOptimizer
+from diet_workout_planning.diet.restrictions import get_food_restrictions
+
+
+def requirements_key(requirements: DietaryRequirements):
+    """Hashable signature of the constraints and objectives; user restrictions are left out"""
+    constraints = tuple(
+        (repr(c.name), c.type, c.attribute, c.operation, repr(c.value)) for c in requirements.constraints
+    )
+    objectives = tuple(
+        (o.name, o.attribute, o.maximize, o.weight) for o in requirements.objectives
+    )
+    return constraints, objectives
+
+
+class ModelTemplate:
+    """
+    Ready-to-solve MIP models for one set of requirements
+
+    Users with the same calorie level get the same default constraints and
+    objectives, so their models are identical. A template keeps built
+    DietOptimizers for those requirements and lends one out per request;
+    only user-specific deltas are applied to it. Restrictions are applied
+    by fixing the excluded foods' variables to 0, which leaves the same
+    feasible plans and objective as a model built without those foods,
+    and undone when the model is returned.
+
+    A model is used by one request at a time: concurrent requests for the
+    same template each get their own, and a new one is only built when all
+    are in use. Built models are kept for the life of the template.
+    """
+
+    def __init__(self, food_db: FoodDatabase, requirements: DietaryRequirements):
+        self.food_db = food_db
+        self.requirements = dataclasses.replace(
+            requirements,
+            constraints=list(requirements.constraints),
+            objectives=list(requirements.objectives),
+            restrictions=[]
+        )
+        self.built = 0
+        self._free = []
+        self._lock = threading.Lock()
+
+    def _build(self) -> DietOptimizer:
+        optimizer = DietOptimizer(self.food_db, self.requirements)
+        optimizer.create_optimization_problem()
+        with self._lock:
+            self.built += 1
+        return optimizer
+
+    def warm(self, count: int = 1):
+        """Build models ahead of requests until at least count are idle"""
+        while True:
+            with self._lock:
+                if len(self._free) >= count:
+                    return
+            optimizer = self._build()
+            with self._lock:
+                self._free.append(optimizer)
+
+    @contextmanager
+    def checkout(self, requirements: Optional[DietaryRequirements] = None):
+        """
+        Lend a built optimizer, with the restrictions of requirements applied
+
+        The optimizer sees requirements (e.g. the planner's own, for the
+        creativity step) while checked out.
+        """
+        with self._lock:
+            optimizer = self._free.pop() if self._free else None
+        if optimizer is None:
+            optimizer = self._build()
+
+        restrictions = requirements.restrictions if requirements is not None else []
+        excluded = get_food_restrictions(self.food_db).excluded_food_ids(restrictions)
+        # Every per-food variable (quantities and the used flags) of an excluded food
+        fixed = [
+            (variable, variable.upBound)
+            for variables in (optimizer.variables.values() if excluded else ())
+            for key, variable in variables.items()
+            if key[0] in excluded
+        ]
+        for variable, _ in fixed:
+            variable.upBound = 0
+        if requirements is not None:
+            optimizer.requirements = requirements
+        optimizer.solution = None
+        try:
+            yield optimizer
+        finally:
+            for variable, up_bound in fixed:
+                variable.upBound = up_bound
+            optimizer.requirements = self.requirements
+            optimizer.solution = None
+            with self._lock:
+                self._free.append(optimizer)
+
+
+_templates = weakref.WeakKeyDictionary()  # food_db -> {(version, requirements key): ModelTemplate}
+_templates_lock = threading.Lock()
+
+
+def get_model_template(food_db: FoodDatabase, requirements: DietaryRequirements) -> ModelTemplate:
+    """Return the template for these requirements, creating it (without building a model yet) on first use"""
+    key = (food_db.version, requirements_key(requirements))
+    with _templates_lock:
+        templates = _templates.setdefault(food_db, {})
+        template = templates.get(key)
+        if template is None:
+            template = ModelTemplate(food_db, requirements)
+            templates[key] = template
+    return template
+
+
+def model_templates(food_db: FoodDatabase) -> Dict:
+    """The templates created so far for a food database"""
+    with _templates_lock:
+        return dict(_templates.get(food_db, {}))
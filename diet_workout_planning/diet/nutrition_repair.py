@@ -0,0 +1,306 @@
+import dataclasses
+from dataclasses import dataclass, field
+from typing import FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from diet_workout_planning.diet.food_model import (
+    DietaryRequirements, FoodDatabase, WeeklyPlan, MealType,
+    ConstraintOperation, FOOD_GROUP_CATEGORIES, constraint_tolerance
+)
+
+# How far inside each band the repair aims (in units of the day's calories),
+# so the solver's residual cannot leave a repaired day on the wrong side of an edge
+REPAIR_MARGIN = 1e-6
+
+
+@dataclass
+class RepairTargets:
+    """Per-day targets that the repair stage restores"""
+    calorie_ranges: List[Tuple[float, float]]  # (min, max) daily calories, one entry per day
+    meal_balance: Optional[Tuple[float, float]] = None  # (min, max) share of the day's calories per meal
+    group_minimums: List[Tuple[FrozenSet[str], float]] = field(default_factory=list)  # (groups, daily servings)
+
+    @classmethod
+    def from_requirements(cls, requirements: Optional[DietaryRequirements], num_days: int = 7,
+                          fallback_calories: Optional[List[Tuple[float, float]]] = None):
+        """
+        Collect the daily calorie, meal balance and food group constraints
+
+        fallback_calories is used when the requirements have no daily
+        calorie constraint (or there are no requirements at all).
+        """
+        calorie_range = None
+        meal_balance = None
+        group_minimums = []
+
+        for constraint in (requirements.get_daily_constraints() if requirements else []):
+            value = constraint.value
+            operation = constraint.operation
+
+            if constraint.attribute == 'calories':
+                if operation == ConstraintOperation.RANGE:
+                    calorie_range = (value[0], value[1])
+                elif operation == ConstraintOperation.GREATER_EQUAL:
+                    calorie_range = (value, np.inf)
+                elif operation == ConstraintOperation.LESS_EQUAL:
+                    calorie_range = (0, value)
+                elif operation == ConstraintOperation.EQUAL:
+                    calorie_range = (value, value)
+            elif constraint.attribute == 'meal_balance':
+                meal_balance = (value[0], value[1])
+            elif constraint.attribute == 'diet_guide_group' and operation == ConstraintOperation.GREATER_EQUAL:
+                group = getattr(constraint.name, 'value', constraint.name)
+                group_minimums.append((frozenset([group]), value))
+            elif constraint.attribute == 'food_group_category' and operation == ConstraintOperation.GREATER_EQUAL:
+                groups = FOOD_GROUP_CATEGORIES.get(value["category"], [])
+                group_minimums.append((frozenset(group.value for group in groups), value["amount"]))
+
+        if calorie_range is not None:
+            calorie_ranges = [calorie_range] * num_days
+        elif fallback_calories is not None:
+            calorie_ranges = list(fallback_calories)
+        else:
+            calorie_ranges = [(0, np.inf)] * num_days
+
+        return cls(calorie_ranges=calorie_ranges, meal_balance=meal_balance, group_minimums=group_minimums)
+
+
+class _PlanArrays:
+    """Flat arrays over every food assignment in a plan"""
+
+    def __init__(self, plan: WeeklyPlan, food_db: FoodDatabase):
+        self.meal_types = list(MealType)
+        meal_positions = {meal_type: i for i, meal_type in enumerate(self.meal_types)}
+
+        self.slots = []  # (day_idx, meal_type, item_idx)
+        days, meals, quantities, calories, groups = [], [], [], [], []
+
+        for day_idx, day in enumerate(plan.days):
+            for meal_type, meal in day.meals.items():
+                for item_idx, food in enumerate(meal.food_items):
+                    self.slots.append((day_idx, meal_type, item_idx))
+                    days.append(day_idx)
+                    meals.append(meal_positions[meal_type])
+                    quantities.append(food.quantity)
+                    # Per-serving calories straight from the catalog
+                    calories.append(food_db.get_by_id(food.food_id).calories)
+                    groups.append(str(food.diet_guide_group))
+
+        self.num_days = len(plan.days)
+        self.day = np.array(days, dtype=np.int64)
+        self.meal = np.array(meals, dtype=np.int64)
+        self.quantity = np.array(quantities, dtype=float)
+        self.calories = np.nan_to_num(np.array(calories, dtype=float))
+        self.group = np.array(groups, dtype=object)
+        # Meal balance only applies to the meals a day has foods in, as in PlanValidator
+        self.has_meal = self.meal_totals(np.ones(len(self.day))) > 0
+
+    def day_totals(self, values):
+        return np.bincount(self.day, weights=values, minlength=self.num_days)
+
+    def meal_totals(self, values):
+        totals = np.bincount(self.day * len(self.meal_types) + self.meal, weights=values,
+                             minlength=self.num_days * len(self.meal_types))
+        return totals.reshape(self.num_days, len(self.meal_types))
+
+
+def _group_masks(arrays: _PlanArrays, targets: RepairTargets):
+    return [np.isin(arrays.group, list(groups)) for groups, _ in targets.group_minimums]
+
+
+def daily_violations(arrays: _PlanArrays, targets: RepairTargets, quantity=None):
+    """Boolean array marking the days that break one of the targets, within the validator's tolerance"""
+    quantity = arrays.quantity if quantity is None else quantity
+    energy = quantity * arrays.calories
+    daily = arrays.day_totals(energy)
+    low, high = np.array(targets.calorie_ranges, dtype=float).T
+
+    bad = (daily < low - constraint_tolerance(low)) | (daily > high + constraint_tolerance(high))
+
+    if targets.meal_balance is not None:
+        low_share, high_share = targets.meal_balance
+        meals = arrays.meal_totals(energy)
+        tolerance = constraint_tolerance(daily)[:, None]
+        share_bad = (meals < low_share * daily[:, None] - tolerance) | (meals > high_share * daily[:, None] + tolerance)
+        bad |= (share_bad & arrays.has_meal).any(axis=1)
+
+    for mask, (_, amount) in zip(_group_masks(arrays, targets), targets.group_minimums):
+        servings = arrays.day_totals(np.where(mask, quantity, 0.0))
+        has_group = arrays.day_totals(mask.astype(float)) > 0
+        bad |= has_group & (servings < amount - constraint_tolerance(amount))
+
+    return bad
+
+
+def violated_days(plan: WeeklyPlan, food_db: FoodDatabase, targets: RepairTargets) -> np.ndarray:
+    """Boolean array marking the days of a plan that break one of the targets"""
+    return daily_violations(_PlanArrays(plan, food_db), targets)
+
+
+def _solve_qp_batch(A, lower, upper, max_iter=1000, tol=1e-7):
+    """
+    Solve min 1/2 ||x - 1||^2 subject to lower <= A x <= upper for a batch of small problems
+
+    ADMM as in OSQP, with every problem in the batch stepped together and
+    dropped from the batch once it has converged. A has shape
+    (batch, rows, columns). Problems with no feasible point end up at a
+    compromise between the violated rows after max_iter steps.
+    """
+    batch, rows, columns = A.shape
+    rho, sigma, alpha = 10.0, 1e-6, 1.6
+
+    At = A.transpose(0, 2, 1)
+    K = np.linalg.inv((1 + sigma) * np.eye(columns) + rho * At @ A)
+
+    x = np.ones((batch, columns))
+    z = np.clip(np.einsum('brc,bc->br', A, x), lower, upper)
+    y = np.zeros((batch, rows))
+    result = np.ones((batch, columns))
+    active = np.arange(batch)
+
+    for iteration in range(max_iter):
+        rhs = sigma * x + 1 + np.einsum('bcr,br->bc', At, rho * z - y)
+        x_tilde = np.einsum('bij,bj->bi', K, rhs)
+        Ax_relaxed = alpha * np.einsum('brc,bc->br', A, x_tilde) + (1 - alpha) * z
+        x = alpha * x_tilde + (1 - alpha) * x
+        z_next = np.clip(Ax_relaxed + y / rho, lower, upper)
+        y = y + rho * (Ax_relaxed - z_next)
+        dual_change = np.abs(z_next - z).max(axis=1)
+        z = z_next
+
+        if iteration % 10 == 0:
+            primal = np.abs(np.einsum('brc,bc->br', A, x) - z).max(axis=1)
+            done = (primal < tol) & (rho * dual_change < tol)
+            if done.any():
+                result[active[done]] = x[done]
+                keep = ~done
+                active = active[keep]
+                if not len(active):
+                    return result
+                A, At, K, lower, upper = A[keep], At[keep], K[keep], lower[keep], upper[keep]
+                x, y, z = x[keep], y[keep], z[keep]
+
+    result[active] = x
+    return result
+
+
+def _rescaled(arrays: _PlanArrays, item_indices, factors):
+    """Plan quantities after scaling each day's items by its row of factors"""
+    quantity = arrays.quantity.copy()
+    for b, items in enumerate(item_indices):
+        quantity[items] *= factors[b, :len(items)]
+    return quantity
+
+
+def repair_daily_nutrition(plan: WeeklyPlan, food_db: FoodDatabase, targets: RepairTargets) -> int:
+    """
+    Rescale food quantities, as little as possible, so each day meets its targets
+
+    Every day that breaks its calorie range, meal balance band or a food
+    group minimum gets a small quadratic program over the quantities it
+    already has: minimize the squared relative change of each quantity
+    subject to the targets, aimed REPAIR_MARGIN inside every band so a
+    repaired day passes PlanValidator. All broken days are solved together.
+    Foods are never added or swapped, so a target that no rescaling can meet
+    (for example a group with no foods that day) is left as close as it gets.
+    When a day's targets cannot all hold at once, the solver's compromise
+    can leave even its calories out of range; such days are solved again
+    without their food group minimums, so they at least keep their calorie
+    range and meal balance.
+
+    Returns the number of days that were repaired.
+    """
+    arrays = _PlanArrays(plan, food_db)
+    if not len(arrays.quantity):
+        return 0
+
+    bad_days = np.flatnonzero(daily_violations(arrays, targets))
+    if not len(bad_days):
+        return 0
+
+    group_masks = _group_masks(arrays, targets)
+    num_meals = len(arrays.meal_types)
+    columns = int(np.bincount(arrays.day, minlength=arrays.num_days)[bad_days].max())
+    rows = 1 + 2 * num_meals + len(group_masks) + columns
+
+    A = np.zeros((len(bad_days), rows, columns))
+    lower = np.full((len(bad_days), rows), -np.inf)
+    upper = np.full((len(bad_days), rows), np.inf)
+    item_indices = []
+
+    for b, day_idx in enumerate(bad_days):
+        items = np.flatnonzero(arrays.day == day_idx)
+        item_indices.append(items)
+        n = len(items)
+        energy = arrays.quantity[items] * arrays.calories[items]
+        scale = max(energy.sum(), 1.0)  # keep every row around unit size
+
+        # Daily calorie range
+        low, high = targets.calorie_ranges[day_idx]
+        A[b, 0, :n] = energy / scale
+        lower[b, 0], upper[b, 0] = low / scale, high / scale
+
+        # Each meal the day has within [low, high] of the day's calories, written as two rows >= 0
+        if targets.meal_balance is not None:
+            low_share, high_share = targets.meal_balance
+            for m in np.flatnonzero(arrays.has_meal[day_idx]):
+                in_meal = (arrays.meal[items] == m).astype(float)
+                A[b, 1 + 2 * m, :n] = (in_meal - low_share) * energy / scale
+                A[b, 2 + 2 * m, :n] = (high_share - in_meal) * energy / scale
+                lower[b, 1 + 2 * m] = lower[b, 2 + 2 * m] = 0
+
+        # Food group minimums, only for groups the day actually has
+        for g, (mask, (_, amount)) in enumerate(zip(group_masks, targets.group_minimums)):
+            servings = np.where(mask[items], arrays.quantity[items], 0.0)
+            if servings.any() and amount > 0:
+                A[b, 1 + 2 * num_meals + g, :n] = servings / amount
+                lower[b, 1 + 2 * num_meals + g] = 1
+
+        # Quantities stay non-negative
+        bound_rows = 1 + 2 * num_meals + len(group_masks)
+        A[b, bound_rows + np.arange(columns), np.arange(columns)] = 1
+        lower[b, bound_rows:] = 0
+
+    # Rows are scaled by the day's calories, so the margin is relative; bands narrower than two margins keep their middle
+    target_rows = slice(0, 1 + 2 * num_meals + len(group_masks))
+    margin = np.minimum(REPAIR_MARGIN, (upper[:, target_rows] - lower[:, target_rows]) / 2)
+    lower[:, target_rows] += margin
+    upper[:, target_rows] -= margin
+
+    factors = np.maximum(_solve_qp_batch(A, lower, upper), 0)
+
+    # Days still broken have conflicting targets (or converge too slowly): solve them
+    # again without the group minimums so they keep their calories and meal balance
+    unsolved = daily_violations(arrays, targets, _rescaled(arrays, item_indices, factors))[bad_days]
+    if unsolved.any():
+        group_rows = slice(1 + 2 * num_meals, 1 + 2 * num_meals + len(group_masks))
+        lower[:, group_rows] = -np.inf
+        factors[unsolved] = np.maximum(
+            _solve_qp_batch(A[unsolved], lower[unsolved], upper[unsolved], max_iter=5000), 0
+        )
+
+    # Only foods the solver scaled to nothing are dropped: a tiny serving of a dense food still counts
+    factors[factors < 1e-6] = 0
+
+    for b, items in enumerate(item_indices):
+        for column, item in enumerate(items):
+            factor = float(factors[b, column])
+            if abs(factor - 1) < 1e-9:
+                continue
+            day_idx, meal_type, item_idx = arrays.slots[item]
+            meal = plan.mutable_meal(day_idx, meal_type)
+            food = meal.food_items[item_idx]
+            meal.replace_food(item_idx, dataclasses.replace(food, quantity=float(food.quantity) * factor))
+
+    # Drop foods that were scaled away entirely
+    for day_idx in set(bad_days.tolist()):
+        for meal_type in list(plan.days[day_idx].meals):
+            meal = plan.days[day_idx].meals[meal_type]
+            if any(food.quantity <= 0 for food in meal.food_items):
+                meal = plan.mutable_meal(day_idx, meal_type)
+                for item_idx in reversed(range(len(meal.food_items))):
+                    if meal.food_items[item_idx].quantity <= 0:
+                        meal.remove_food(item_idx)
+
+    return len(bad_days)
@@ -8,8 +8,10 @@ from collections import defaultdict
 from diet_workout_planning.diet.food_model import (
     FoodItem, Constraint, OptimizationObjective, DietaryRequirements,
     MealAssignment, Meal, DailyPlan, WeeklyPlan, FoodDatabase,
-    ConstraintType, ConstraintOperation, MealType, DietGuideGroup
+    ConstraintType, ConstraintOperation, MealType, DietGuideGroup, FOOD_GROUP_CATEGORIES
 )
+from diet_workout_planning.diet.substitution_index import get_substitution_index
+from diet_workout_planning.diet.restrictions import get_food_restrictions
 
 
 class DietOptimizer:
@@ -21,6 +23,7 @@ class DietOptimizer:
         self.problem = None
         self.variables = None
         self.solution = None
+        self.food_ids = None  # Foods the model has variables for (those no dietary restriction excludes)
         
         # Register constraint handlers
         self.constraint_handlers = {
@@ -48,7 +51,8 @@ class DietOptimizer:
         # Define decision variables
         days = range(1, 8)  # 7 days
         meal_types = list(MealType)
-        food_ids = list(self.foods.foods.keys())
+        # Restricted foods never become variables
+        food_ids = self.food_ids = get_food_restrictions(self.foods).allowed_food_ids(self.requirements.restrictions)
         
         # Create variables for food quantities (continuous variables representing servings)
         self.variables = {}
@@ -132,7 +136,7 @@ class DietOptimizer:
     def _handle_calorie_constraint(self, constraint: Constraint):
         """Handle calorie constraints"""
         days = range(1, 8)
-        food_ids = list(self.foods.foods.keys())
+        food_ids = self.food_ids
         meal_types = list(MealType)
         
         if constraint.type == ConstraintType.DAILY:
@@ -177,13 +181,13 @@ class DietOptimizer:
     def _handle_food_group_constraint(self, constraint: Constraint):
         """Handle food group constraints"""
         days = range(1, 8)
-        food_ids = list(self.foods.foods.keys())
+        food_ids = self.food_ids
         meal_types = list(MealType)
         
         # Get foods in the specific group
         group_foods = {
-            food.id for food in self.foods.foods.values() 
-            if str(food.diet_guide_group) == constraint.name.value
+            i for i in food_ids
+            if str(self.foods.get_by_id(i).diet_guide_group) == constraint.name.value
         }
 
         # print(group_foods)
@@ -231,34 +235,18 @@ class DietOptimizer:
         """
         
         days = range(1, 8)
-        food_ids = list(self.foods.foods.keys())
+        food_ids = self.food_ids
         meal_types = list(MealType)
         
         category = constraint.value["category"]
         min_amount = constraint.value["amount"]
         
-        # Define which food groups belong to each category
-        category_groups = {
-            "protein": [
-                DietGuideGroup.MEATS_POULTRY_EGGS,
-                DietGuideGroup.SEAFOOD,
-                DietGuideGroup.BEANS_PEAS_LENTILS,
-                DietGuideGroup.NUTS_SEEDS_SOY
-            ],
-            "vegetable": [
-                DietGuideGroup.DARK_GREEN_VEGETABLES,
-                DietGuideGroup.RED_ORANGE_VEGETABLES,
-                DietGuideGroup.STARCHY_VEGETABLES,
-                DietGuideGroup.OTHER_VEGETABLES
-            ]
-        }
-        
         # Get the relevant food groups for this category
-        if category not in category_groups:
+        if category not in FOOD_GROUP_CATEGORIES:
             print(f"Warning: Unknown food group category '{category}'")
             return
             
-        relevant_groups = {_.value for _ in category_groups[category]}
+        relevant_groups = {_.value for _ in FOOD_GROUP_CATEGORIES[category]}
         
         # For daily constraints, apply to each day
         if constraint.type == ConstraintType.DAILY:
@@ -282,7 +270,7 @@ class DietOptimizer:
     def _handle_nutrient_constraint(self, constraint: Constraint):
         """Handle general nutrient constraints (proteins, etc.)"""
         days = range(1, 8)
-        food_ids = list(self.foods.foods.keys())
+        food_ids = self.food_ids
         meal_types = list(MealType)
         
         attribute = constraint.attribute  # e.g., 'proteins'
@@ -326,7 +314,7 @@ class DietOptimizer:
         """
         
         days = range(1, 8)
-        food_ids = list(self.foods.foods.keys())
+        food_ids = self.food_ids
         meal_types = list(MealType)
         
         min_percent, max_percent = constraint.value
@@ -355,7 +343,7 @@ class DietOptimizer:
     def _handle_protein_objective(self, objective: OptimizationObjective):
         """Handle protein maximization objective"""
         days = range(1, 8)
-        food_ids = list(self.foods.foods.keys())
+        food_ids = self.food_ids
         meal_types = list(MealType)
         
         # Calculate total protein
@@ -373,7 +361,7 @@ class DietOptimizer:
     def _handle_diversity_objective(self, objective: OptimizationObjective):
         """Handle diversity maximization objective"""
         days = range(1, 8)
-        food_ids = list(self.foods.foods.keys())
+        food_ids = self.food_ids
         meal_types = list(MealType)
         
         # For diversity, we'll count unique foods used each day
@@ -399,7 +387,7 @@ class DietOptimizer:
         We'll use a proxy approach: encourage variety across days
         """
         days = range(1, 8)
-        food_ids = list(self.foods.foods.keys())
+        food_ids = self.food_ids
         meal_types = list(MealType)
         
         # We need additional variables to track day-to-day differences
@@ -449,7 +437,7 @@ class DietOptimizer:
     def _create_calorie_objective(self):
         """Create a default objective to minimize total calories"""
         days = range(1, 8)
-        food_ids = list(self.foods.foods.keys())
+        food_ids = self.food_ids
         meal_types = list(MealType)
         
         # Calculate total calories
@@ -486,7 +474,7 @@ class DietOptimizer:
             solution[k] = {}
             for j in MealType:  # meals
                 solution[k][j] = []
-                for i in self.foods.foods.keys():  # foods
+                for i in self.food_ids:  # foods
                     qty = self.variables['food_qty'][(i, j.value, k)].value()
                     if qty is not None and qty > 0.001:  # Some small epsilon to handle floating-point issues
                         food = self.foods.get_by_id(i)
@@ -520,8 +508,11 @@ class DietOptimizer:
         --------
         dict : Enhanced solution with added creativity
         """
-        # Clone the solution to avoid modifying the original
-        enhanced_solution = self._deep_copy_solution(base_solution)
+        # Copy the solution structure to avoid modifying the original; meal lists are cloned on write
+        enhanced_solution = self._copy_solution(base_solution)
+        
+        # Substitutes must respect the dietary restrictions too
+        restricted = get_food_restrictions(self.foods).excluded_food_ids(self.requirements.restrictions)
         
         # Randomly select days to modify
         days = list(enhanced_solution.keys())
@@ -535,39 +526,34 @@ class DietOptimizer:
                 
             meal_type = random.choice(meal_types)
             
-            # Get suitable alternative foods for this meal type
-            suitable_foods = self.foods.get_by_meal_type(meal_type)
-            
             # Get current foods in this meal
             current_meal = enhanced_solution[day][meal_type]
-            current_food_ids = {item['food_id'] for item in current_meal}
-            
-            # Find alternative foods
-            alternative_foods = [food for food in suitable_foods if food.id not in current_food_ids]
+            current_food_ids = {item['food_id'] for item in current_meal} | restricted
             
-            if not alternative_foods or not current_meal:
+            # Check there is at least one suitable food not already in the meal
+            index = get_substitution_index(self.foods)
+            if not index.count(meal_type=meal_type, exclude=current_food_ids) or not current_meal:
                 continue
             
             # Select a food to replace
             food_to_replace = random.choice(current_meal)
             
-            # Select a replacement food with similar calories
-            target_calories = food_to_replace['calories']
+            # Select a replacement food with similar calories; entries hold per-serving calories
+            target_calories = food_to_replace['calories'] * food_to_replace['quantity']
             
-            # Sort alternatives by calorie similarity
-            alternatives_by_calories = sorted(
-                alternative_foods,
-                key=lambda f: abs(f.calories - target_calories/food_to_replace['quantity'])
+            # Choose from the top 3 closest matches by calories per serving (or fewer if not enough options)
+            closest = index.nearest_by_calories(
+                food_to_replace['calories'],
+                k=3,
+                meal_type=meal_type,
+                exclude=current_food_ids
             )
-            
-            # Choose from the top 3 closest matches (or fewer if not enough options)
-            top_n = min(3, len(alternatives_by_calories))
-            if top_n == 0:
+            if not closest:
                 continue
                 
-            replacement = random.choice(alternatives_by_calories[:top_n])
+            replacement = random.choice(closest)
             
-            # Calculate quantity to maintain similar calories
+            # Calculate quantity to maintain the replaced food's total calories
             replacement_qty = target_calories / replacement.calories
             
             # Replace the food
@@ -575,23 +561,28 @@ class DietOptimizer:
                 'food_id': replacement.id,
                 'food_name': replacement.name,
                 'quantity': replacement_qty,
-                'calories': replacement.calories * replacement_qty,
-                'proteins': replacement.proteins * replacement_qty,
+                'calories': replacement.calories,
+                'proteins': replacement.proteins,
                 'diet_guide_group': replacement.diet_guide_group
             }
             
             # Find the index of the food to replace
             for i, item in enumerate(current_meal):
                 if item['food_id'] == food_to_replace['food_id']:
-                    enhanced_solution[day][meal_type][i] = new_food
+                    enhanced_solution[day][meal_type] = current_meal[:i] + [new_food] + current_meal[i + 1:]
                     break
         
         return enhanced_solution
     
-    def _deep_copy_solution(self, solution):
-        """Make a deep copy of the solution dictionary"""
-        import copy
-        return copy.deepcopy(solution)
+    def _copy_solution(self, solution):
+        """
+        Copy-on-write copy of the solution dictionary
+
+        Only the day and meal dictionaries are copied. Meal lists and food
+        item dicts are shared with the original, so callers must replace a
+        meal list rather than modify it in place.
+        """
+        return {day: dict(meals) for day, meals in solution.items()}
     
     def generate_meal_plan(self):
         """Generate a structured meal plan from the optimization solution"""
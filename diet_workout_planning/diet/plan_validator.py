@@ -0,0 +1,200 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from diet_workout_planning.diet.food_model import (
+    Constraint, DietaryRequirements, FoodDatabase, WeeklyPlan, MealType,
+    ConstraintType, ConstraintOperation, FOOD_GROUP_CATEGORIES, constraint_tolerance
+)
+from diet_workout_planning.diet.creativity_engine import encode_plan_batch
+from diet_workout_planning.diet.compact_plan import CompactPlan, compact_batch
+
+
+def _food_value(food, attribute):
+    value = getattr(food, attribute, None)
+    if value is None:
+        value = food.attributes.get(attribute, 0)
+    return value
+
+
+@dataclass
+class ValidationResult:
+    """
+    Slack of every check for every plan in a batch
+
+    A check is one constraint on one day (daily constraints), on one meal of
+    one day (meal balance) or on the whole plan (weekly constraints).
+    slack[p, c] is how far plan p is inside check c, in the constraint's own
+    units; a check is violated when its slack is below minus the shared
+    constraint_tolerance of its bound. Checks that do not apply (days a
+    plan does not have, meals without foods) get +inf. A meal counts for
+    meal balance only once it has foods, as in nutrition_repair.
+    """
+    labels: List[Tuple[str, Optional[int], Optional[MealType]]]  # (constraint name, day number, meal)
+    slack: np.ndarray
+    violations: np.ndarray
+
+    @property
+    def valid(self) -> np.ndarray:
+        """One flag per plan: True when nothing is violated"""
+        return ~self.violations.any(axis=1)
+
+    def violated(self, plan_idx: int = 0) -> List[Tuple[str, Optional[int], Optional[MealType]]]:
+        """Labels of the checks a plan breaks"""
+        return [self.labels[c] for c in np.flatnonzero(self.violations[plan_idx])]
+
+
+class PlanValidator:
+    """
+    Checks plans against DietaryRequirements
+
+    The requirements are compiled once into a matrix of per-food
+    coefficients (calories, proteins, group membership, ...) and a list of
+    bounds. Validating a batch of plans is then a single bincount over all
+    their food assignments plus a few array comparisons. Nutrients are taken
+    from the catalog, as in the optimizer.
+    """
+
+    def __init__(self, requirements: DietaryRequirements, food_db: FoodDatabase,
+                 num_days: int = 7):
+        self.food_db = food_db
+        self.num_days = num_days
+
+        foods = list(food_db.foods.values())
+        self._size = max((food.id for food in foods), default=0) + 1
+        self._foods = foods
+        self._measures = {}  # measure key -> row of self.coefficients
+        rows = []
+
+        def measure(key, values):
+            if key not in self._measures:
+                self._measures[key] = len(rows)
+                row = np.zeros(self._size)
+                row[[food.id for food in foods]] = values
+                rows.append(np.nan_to_num(row))
+            return self._measures[key]
+
+        self.calorie_measure = measure('calories', [food.calories for food in foods])
+        self.checks = []  # (constraint name, 'daily' | 'weekly' | 'meal_share', row of coefficients, lower, upper)
+
+        for constraint in requirements.constraints:
+            compiled = self._compile(constraint, measure)
+            if compiled is not None:
+                self.checks.append(compiled)
+
+        self.coefficients = np.vstack(rows)
+        self.labels = self._labels()
+
+    def _compile(self, constraint: Constraint, measure):
+        """Turn one constraint into (name, scope, measure row, lower, upper), or None if unsupported"""
+        name = str(getattr(constraint.name, 'value', constraint.name))
+        scope = 'daily' if constraint.type == ConstraintType.DAILY else 'weekly'
+        value = constraint.value
+
+        if constraint.attribute == 'meal_balance':
+            return (name, 'meal_share', self.calorie_measure, value[0], value[1])
+
+        if constraint.attribute == 'diet_guide_group':
+            groups = frozenset([name])
+            row = measure(('groups', groups), [float(str(food.diet_guide_group) in groups) for food in self._foods])
+        elif constraint.attribute == 'food_group_category':
+            groups = frozenset(group.value for group in FOOD_GROUP_CATEGORIES.get(value["category"], []))
+            row = measure(('groups', groups), [float(str(food.diet_guide_group) in groups) for food in self._foods])
+            value = value["amount"]
+        else:
+            # calories, proteins or any other numeric food attribute (e.g. price)
+            attribute = constraint.attribute
+            row = measure(attribute, [_food_value(food, attribute) for food in self._foods])
+
+        operation = constraint.operation
+        if operation == ConstraintOperation.RANGE:
+            lower, upper = value[0], value[1]
+        elif operation == ConstraintOperation.GREATER_EQUAL:
+            lower, upper = value, np.inf
+        elif operation == ConstraintOperation.LESS_EQUAL:
+            lower, upper = -np.inf, value
+        elif operation == ConstraintOperation.EQUAL:
+            lower, upper = value, value
+        else:
+            return None
+        return (name, scope, row, lower, upper)
+
+    def _labels(self):
+        labels = []
+        for name, scope, _, _, _ in self.checks:
+            if scope == 'weekly':
+                labels.append((name, None, None))
+            elif scope == 'daily':
+                labels.extend((name, day + 1, None) for day in range(self.num_days))
+            else:
+                labels.extend((name, day + 1, meal_type) for day in range(self.num_days) for meal_type in MealType)
+        return labels
+
+    def validate(self, plans) -> ValidationResult:
+        """
+        Validate one plan or a batch
+
+        plans can be a WeeklyPlan, a CompactPlan, a list of either, or the
+        arrays from encode_plan_batch/compact_batch.
+        """
+        if isinstance(plans, (WeeklyPlan, CompactPlan)):
+            plans = [plans]
+        if isinstance(plans, list):
+            if plans and isinstance(plans[0], CompactPlan):
+                batch = compact_batch(plans)
+            else:
+                batch = encode_plan_batch(plans)
+        else:
+            batch = plans
+
+        num_plans, num_days = len(batch['num_days']), self.num_days
+        num_measures, num_meals = len(self.coefficients), len(MealType)
+        keep = batch['day'] < num_days
+        plan_idx, day_idx = batch['plan'][keep], batch['day'][keep]
+        food_ids, quantity = batch['food_id'][keep], batch['quantity'][keep]
+
+        # Every measure for every (plan, day) in a single bincount
+        contributions = self.coefficients[:, food_ids] * quantity
+        day_key = plan_idx * num_days + day_idx
+        keys = (np.arange(num_measures)[:, None] * (num_plans * num_days) + day_key).ravel()
+        daily = np.bincount(keys, weights=contributions.ravel(), minlength=num_measures * num_plans * num_days)
+        daily = daily.reshape(num_measures, num_plans, num_days)
+        weekly = daily.sum(axis=2)
+
+        meal_key = day_key * num_meals + batch['meal'][keep]
+        meal_calories = np.bincount(
+            meal_key, weights=contributions[self.calorie_measure], minlength=num_plans * num_days * num_meals
+        ).reshape(num_plans, num_days, num_meals)
+        no_meal = np.bincount(meal_key, minlength=num_plans * num_days * num_meals).reshape(meal_calories.shape) == 0
+
+        missing_day = np.arange(num_days)[None, :] >= batch['num_days'][:, None]  # (plans, days)
+
+        columns, tolerances = [], []
+        for _, scope, row, lower, upper in self.checks:
+            if scope == 'meal_share':
+                # Both bounds are shares of the day's calories
+                day_total = daily[row][:, :, None]
+                slack = np.minimum(meal_calories - lower * day_total, upper * day_total - meal_calories)
+                slack = np.where(no_meal, np.inf, slack)
+                columns.append(slack.reshape(num_plans, num_days * num_meals))
+                tolerances.append(np.broadcast_to(constraint_tolerance(day_total), slack.shape)
+                                  .reshape(num_plans, num_days * num_meals))
+                continue
+
+            value = weekly[row][:, None] if scope == 'weekly' else daily[row]
+            # Measured against the nearer bound, so the tolerance follows that bound
+            below = value - lower
+            above = upper - value
+            slack = np.minimum(below, above)
+            tolerance = np.where(below <= above, constraint_tolerance(lower), constraint_tolerance(upper))
+            if scope == 'daily':
+                slack = np.where(missing_day, np.inf, slack)
+            columns.append(slack)
+            tolerances.append(np.broadcast_to(tolerance, slack.shape))
+
+        if columns:
+            slack, tolerance = np.hstack(columns), np.hstack(tolerances)
+        else:
+            slack = tolerance = np.zeros((num_plans, 0))
+        return ValidationResult(labels=self.labels, slack=slack, violations=slack < -tolerance)
@@ -8,30 +8,86 @@ from diet_workout_planning.diet.food_model import (
     FoodDatabase, ConstraintType, ConstraintOperation, MealType, DietGuideGroup, WeeklyPlan
 )
 from diet_workout_planning.diet.optimizer import DietOptimizer
+from diet_workout_planning.diet.local_search import LocalSearchOptimizer
 from diet_workout_planning.diet.creativity_engine import MealCreativityEngine, measure_creativity
-from diet_workout_planning.diet.data_loader import get_food_data
+from diet_workout_planning.diet.catalog import get_shared_food_database, warmup
+from diet_workout_planning.diet.diet_profiles import dietary_profiles
+from diet_workout_planning.diet.model_templates import get_model_template
 
 class DietPlanner:
     """Main application for diet planning"""
     
-    def __init__(self):
-        self.food_db = FoodDatabase()
+    def __init__(self, food_db: FoodDatabase = None, use_model_templates: bool = True):
+        """
+        Create a planner
+
+        By default the planner uses the process-wide shared food catalog,
+        which is only loaded when first needed (or by DietPlanner.warmup()).
+        Pass food_db to plan against a private database instead.
+
+        With use_model_templates the MIP engine solves a model kept from an
+        earlier request with the same constraints and objectives (see
+        precompile_model_templates) instead of building one per request.
+        """
+        self._food_db = food_db
+        self.use_model_templates = use_model_templates
         self.dietary_requirements = DietaryRequirements()
-        self.food_db.load_from_dataframe(get_food_data())
-        self.optimizer = DietOptimizer(self.food_db, self.dietary_requirements)
-        self.creativity_engine = MealCreativityEngine(self.food_db)
+        self._optimizer = None
+        self._local_search = None
+        self._creativity_engine = None
+
+    @staticmethod
+    def warmup():
+        """Load the shared food catalog ahead of the first request"""
+        warmup()
+
+    @classmethod
+    def precompile_model_templates(cls, levels=None):
+        """Build the default model of each dietary profile calorie level (all by default) ahead of requests"""
+        for level in (levels if levels is not None else sorted(dietary_profiles)):
+            planner = cls()
+            planner.set_default_constraints(dietary_profiles[level])
+            planner.set_default_objectives()
+            get_model_template(planner.food_db, planner.dietary_requirements).warm()
+
+    @property
+    def food_db(self) -> FoodDatabase:
+        if self._food_db is None:
+            self._food_db = get_shared_food_database()
+        return self._food_db
+
+    @property
+    def optimizer(self) -> DietOptimizer:
+        if self._optimizer is None:
+            self._optimizer = DietOptimizer(self.food_db, self.dietary_requirements)
+        return self._optimizer
+
+    @property
+    def local_search(self) -> LocalSearchOptimizer:
+        """Simulated annealing backend; set max_iterations/time_limit/seed on it to tune the budget"""
+        if self._local_search is None:
+            self._local_search = LocalSearchOptimizer(self.food_db, self.dietary_requirements)
+        return self._local_search
+
+    @property
+    def creativity_engine(self) -> MealCreativityEngine:
+        if self._creativity_engine is None:
+            self._creativity_engine = MealCreativityEngine(self.food_db)
+        return self._creativity_engine
         
     def load_food_database(self, food_data_path):
-        """Load food database from CSV file"""
+        """Load a private food database from CSV file, replacing the shared catalog for this planner"""
         df = pd.read_csv(food_data_path)
         
         # Process diet_guide_group into proper enum values
         df['diet_guide_group'] = df['diet_guide_group'].astype(str)
         
-        # Initialize optimizer and creativity engine after loading the data
-        self.food_db.load_from_dataframe(df)
-        self.optimizer = DietOptimizer(self.food_db, self.dietary_requirements)
-        self.creativity_engine = MealCreativityEngine(self.food_db)
+        # Reset optimizer and creativity engine so they pick up the new data
+        self._food_db = FoodDatabase()
+        self._food_db.load_from_dataframe(df)
+        self._optimizer = None
+        self._local_search = None
+        self._creativity_engine = None
         
         print(f"Loaded {len(self.food_db.foods)} food items from {food_data_path}")
     
@@ -173,24 +229,36 @@ class DietPlanner:
     def add_objective(self, objective: OptimizationObjective):
         """Add a new optimization objective"""
         self.dietary_requirements.add_objective(objective)
+        
+    def set_dietary_restrictions(self, restrictions):
+        """Exclude every food whose name contains one of these words (e.g. UserProfile.dietary_restrictions)"""
+        self.dietary_requirements.restrictions = list(restrictions)
     
-    def generate_meal_plan(self, creativity_level=0.5):
-        """Generate a complete meal plan"""
-        if not self.optimizer:
-            raise ValueError("Optimizer not initialized. Load food database first.")
-            
-        # Create and solve the optimization problem
-        print("Generating base meal plan through optimization...")
-        self.optimizer.create_optimization_problem()
-        solution = self.optimizer.solve()
+    def generate_meal_plan(self, creativity_level=0.5, engine="mip"):
+        """
+        Generate a complete meal plan
+
+        engine picks the base plan backend: "mip" solves the full CBC model,
+        "local_search" runs simulated annealing within self.local_search's
+        iteration and time budget.
+        """
+        if engine == "mip" and self.use_model_templates:
+            # Solve a kept model for these requirements; only the restrictions are applied per request
+            template = get_model_template(self.food_db, self.dietary_requirements)
+            with template.checkout(self.dietary_requirements) as optimizer:
+                base_plan = self._solve_base_plan(optimizer)
+        elif engine == "mip":
+            self.optimizer.create_optimization_problem()
+            base_plan = self._solve_base_plan(self.optimizer)
+        elif engine == "local_search":
+            self.local_search.create_optimization_problem()
+            base_plan = self._solve_base_plan(self.local_search)
+        else:
+            raise ValueError("Engine must be 'mip' or 'local_search'")
         
-        if not solution:
-            print("Failed to find a feasible meal plan.")
+        if base_plan is None:
             return None
         
-        # Convert solution to structured meal plan
-        base_plan = self.optimizer.generate_meal_plan()
-        
         # Calculate base metrics
         base_metrics = measure_creativity(base_plan)
         print(f"Base plan metrics: {base_metrics}")
@@ -203,7 +271,8 @@ class DietPlanner:
                 creativity_level=creativity_level,
                 flavor_exploration=creativity_level * 0.8,
                 maintain_nutrition=True,
-                theme_consistency=0.5
+                theme_consistency=0.5,
+                requirements=self.dietary_requirements
             )
             
             # Calculate enhanced metrics
@@ -214,6 +283,18 @@ class DietPlanner:
         else:
             return base_plan
     
+    def _solve_base_plan(self, optimizer):
+        """Solve a prepared optimization problem and turn the solution into a plan"""
+        print("Generating base meal plan through optimization...")
+        solution = optimizer.solve()
+        
+        if not solution:
+            print("Failed to find a feasible meal plan.")
+            return None
+        
+        # Convert solution to structured meal plan
+        return optimizer.generate_meal_plan()
+    
     def display_meal_plan(self, plan: WeeklyPlan, detailed=False):
         """Display a meal plan in a readable format"""
         if not plan:
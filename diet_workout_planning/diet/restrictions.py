@@ -0,0 +1,51 @@
+import weakref
+from typing import Iterable, List, Set
+
+from diet_workout_planning.diet.food_model import FoodDatabase
+from diet_workout_planning.utils.restriction_index import RestrictionIndex
+
+
+class FoodRestrictions:
+    """RestrictionIndex over a FoodDatabase's food names, answering in food ids"""
+
+    def __init__(self, food_db: FoodDatabase):
+        self.food_db = food_db
+        self._build()
+
+    def _build(self):
+        self._food_ids = list(self.food_db.foods)
+        self.index = RestrictionIndex([food.name for food in self.food_db.foods.values()])
+        self._version = self.food_db.version
+
+    def _current(self) -> RestrictionIndex:
+        if self._version != self.food_db.version or len(self._food_ids) != len(self.food_db.foods):
+            self._build()
+        return self.index
+
+    def allowed_food_ids(self, restrictions: Iterable[str]) -> List[int]:
+        """Ids of the foods no restriction excludes, in catalog order"""
+        restrictions = list(restrictions)
+        if not restrictions:
+            return list(self.food_db.foods)
+        index = self._current()
+        return [self._food_ids[i] for i in index.allowed_mask(restrictions).nonzero()[0].tolist()]
+
+    def excluded_food_ids(self, restrictions: Iterable[str]) -> Set[int]:
+        """Ids of the foods any restriction excludes"""
+        restrictions = list(restrictions)
+        if not restrictions:
+            return set()
+        index = self._current()
+        return {self._food_ids[i] for i in index.mask(index.excluded(restrictions)).nonzero()[0].tolist()}
+
+
+_restrictions = weakref.WeakKeyDictionary()
+
+
+def get_food_restrictions(food_db: FoodDatabase) -> FoodRestrictions:
+    """Return the restriction index of a food database, building it once per database"""
+    restrictions = _restrictions.get(food_db)
+    if restrictions is None:
+        restrictions = FoodRestrictions(food_db)
+        _restrictions[food_db] = restrictions
+    return restrictions
@@ -0,0 +1,188 @@
+import heapq
+import weakref
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from diet_workout_planning.diet.food_model import FoodDatabase, FoodItem, MealType
+
+
+class KDTree:
+    """Small k-d tree for k-nearest-neighbour queries over a few nutrient dimensions"""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 8):
+        self.points = points
+        self.leaf_size = leaf_size
+        # Each node: (split_dim, split_value, left, right) or (None, indices) for leaves
+        self.root = self._build(np.arange(len(points)), 0) if len(points) else None
+
+    def _build(self, indices, depth):
+        if len(indices) <= self.leaf_size:
+            return (None, indices)
+        dim = depth % self.points.shape[1]
+        values = self.points[indices, dim]
+        order = np.argsort(values, kind="stable")
+        middle = len(indices) // 2
+        left, right = indices[order[:middle]], indices[order[middle:]]
+        return (dim, values[order[middle]], self._build(left, depth + 1), self._build(right, depth + 1))
+
+    def query(self, point: np.ndarray, k: int, skip=None):
+        """Return up to k (distance, index) pairs, nearest first; indices for which skip(index) is true are ignored"""
+        best = []  # max-heap of (-distance, -index)
+
+        def visit(node):
+            if node[0] is None:
+                for index in node[1]:
+                    if skip is not None and skip(index):
+                        continue
+                    distance = float(np.sqrt(((self.points[index] - point) ** 2).sum()))
+                    item = (-distance, -int(index))
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+                return
+            dim, split, left, right = node
+            near, far = (left, right) if point[dim] < split else (right, left)
+            visit(near)
+            if len(best) < k or abs(point[dim] - split) <= -best[0][0]:
+                visit(far)
+
+        if self.root is not None and k > 0:
+            visit(self.root)
+        return sorted((-distance, -index) for distance, index in best)
+
+
+class SubstitutionIndex:
+    """
+    Lookup structure for finding replacement foods
+
+    Foods are bucketed by (diet guide group, meal type); either key can be
+    None to mean "any". Each bucket keeps its calories sorted for bisect
+    lookups and, on demand, a k-d tree over standardized nutrient vectors.
+    Ties are broken by catalog order, matching a stable sort of the catalog.
+    The index rebuilds itself when the food database is reloaded.
+    """
+
+    def __init__(self, food_db: FoodDatabase, features: Sequence[str] = ("calories", "proteins")):
+        self.food_db = food_db
+        self.features = tuple(features)
+        self._build()
+
+    def _build(self):
+        self._foods = list(self.food_db.foods.values())
+        self._position = {food.id: i for i, food in enumerate(self._foods)}
+
+        vectors = np.array(
+            [[getattr(food, name, None) or food.attributes.get(name, 0) or 0 for name in self.features]
+             for food in self._foods],
+            dtype=float
+        ).reshape(len(self._foods), len(self.features))
+        vectors = np.nan_to_num(vectors)
+        scale = vectors.std(axis=0) if len(vectors) else np.ones(len(self.features))
+        scale[scale == 0] = 1
+        self._mean = vectors.mean(axis=0) if len(vectors) else np.zeros(len(self.features))
+        self._scale = scale
+        self._vectors = (vectors - self._mean) / scale
+
+        self._buckets = {}
+        self._version = self.food_db.version
+
+    def _bucket(self, group, meal_type):
+        if self._version != self.food_db.version:
+            self._build()
+
+        key = (group, meal_type)
+        if key not in self._buckets:
+            positions = [
+                i for i, food in enumerate(self._foods)
+                if (group is None or food.diet_guide_group == group)
+                and (meal_type is None or food.meal_suitability.get(meal_type, False))
+            ]
+            calories = np.array([self._foods[i].calories for i in positions], dtype=float)
+            order = np.lexsort((positions, calories))
+            self._buckets[key] = {
+                'positions': positions,
+                'position_set': set(positions),
+                'foods': [self._foods[i] for i in positions],
+                'sorted_calories': calories[order].tolist(),
+                'sorted_positions': [positions[i] for i in order],
+                'tree': None,
+            }
+        return self._buckets[key]
+
+    def foods(self, group=None, meal_type: Optional[MealType] = None) -> List[FoodItem]:
+        """All foods in a bucket, in catalog order (a shared list, do not modify it)"""
+        return self._bucket(group, meal_type)['foods']
+
+    def index_in_bucket(self, food_id: int, group=None, meal_type: Optional[MealType] = None) -> Optional[int]:
+        """Index of a food within foods(group, meal_type), or None if it is not in the bucket"""
+        bucket = self._bucket(group, meal_type)
+        position = self._position.get(food_id)
+        if position not in bucket['position_set']:
+            return None
+        return bisect_left(bucket['positions'], position)
+
+    def count(self, group=None, meal_type: Optional[MealType] = None, exclude: Iterable[int] = ()) -> int:
+        """Number of foods in a bucket that are not excluded"""
+        bucket = self._bucket(group, meal_type)
+        excluded = sum(1 for food_id in set(exclude)
+                       if self._position.get(food_id) in bucket['position_set'])
+        return len(bucket['positions']) - excluded
+
+    def nearest_by_calories(self, target: float, k: int = 1, group=None,
+                            meal_type: Optional[MealType] = None,
+                            exclude: Iterable[int] = ()) -> List[FoodItem]:
+        """The k foods whose calories are closest to target"""
+        bucket = self._bucket(group, meal_type)
+        calories, positions = bucket['sorted_calories'], bucket['sorted_positions']
+        exclude = set(exclude)
+
+        # Walk outwards from the bisect point in order of calorie distance,
+        # keeping every candidate tied with the k-th so ties resolve by catalog order
+        lo = hi = bisect_left(calories, target)
+        picked = []
+        while True:
+            left_diff = target - calories[lo - 1] if lo > 0 else float("inf")
+            right_diff = calories[hi] - target if hi < len(calories) else float("inf")
+            diff = min(left_diff, right_diff)
+            if diff == float("inf") or (len(picked) >= k and diff > picked[k - 1][0]):
+                break
+            if left_diff <= right_diff:
+                lo -= 1
+                position = positions[lo]
+            else:
+                position = positions[hi]
+                hi += 1
+            if self._foods[position].id not in exclude:
+                picked.append((diff, position))
+
+        picked.sort()
+        return [self._foods[position] for _, position in picked[:k]]
+
+    def nearest_by_nutrients(self, food_id: int, k: int = 5, group=None,
+                             meal_type: Optional[MealType] = None,
+                             exclude: Iterable[int] = ()) -> List[FoodItem]:
+        """The k foods closest to food_id in standardized nutrient space (the food itself is excluded)"""
+        bucket = self._bucket(group, meal_type)
+        if bucket['tree'] is None:
+            bucket['tree'] = KDTree(self._vectors[bucket['positions']])
+
+        excluded = set(exclude) | {food_id}
+        positions = bucket['positions']
+        point = self._vectors[self._position[food_id]]
+        neighbours = bucket['tree'].query(point, k, skip=lambda i: self._foods[positions[i]].id in excluded)
+        return [self._foods[positions[i]] for _, i in neighbours]
+
+
+_indexes = weakref.WeakKeyDictionary()
+
+
+def get_substitution_index(food_db: FoodDatabase) -> SubstitutionIndex:
+    """Return the substitution index of a food database, building it once per database"""
+    index = _indexes.get(food_db)
+    if index is None:
+        index = SubstitutionIndex(food_db)
+        _indexes[food_db] = index
+    return index
@@ -0,0 +1,105 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from diet_workout_planning.diet.food_model import DietaryRequirements, FoodDatabase, WeeklyPlan
+from diet_workout_planning.diet.creativity_engine import MealCreativityEngine, measure_creativity
+from diet_workout_planning.diet.nutrition_repair import RepairTargets, violated_days
+
+
+@dataclass
+class PlanVariant:
+    """One creative variant of a base plan and how it scored"""
+    seed: int
+    plan: WeeklyPlan
+    score: float
+    violations: int  # number of days breaking the daily targets
+    metrics: Dict = field(default_factory=dict)
+
+
+def variant_seeds(seed: int, k: int) -> List[int]:
+    """The per-variant seeds derived from one run seed"""
+    rng = random.Random(seed)
+    return [rng.getrandbits(32) for _ in range(k)]
+
+
+class _VariantRunner:
+    """Builds and scores variants of one base plan; one instance per worker process"""
+
+    def __init__(self, food_db, base_plan, requirements, violation_penalty, enhance_kwargs):
+        self.food_db = food_db
+        self.base_plan = base_plan
+        self.violation_penalty = violation_penalty
+        self.enhance_kwargs = enhance_kwargs
+        self.engine = MealCreativityEngine(food_db)
+        fallback_calories = [(day.total_calories * 0.95, day.total_calories * 1.05) for day in base_plan.days]
+        self.targets = RepairTargets.from_requirements(
+            requirements, num_days=len(base_plan.days), fallback_calories=fallback_calories
+        )
+
+    def run(self, seed: int) -> PlanVariant:
+        # The engine draws from the global random module, so seed it per variant
+        random.seed(seed)
+        plan = self.engine.enhance_meal_plan(self.base_plan, **self.enhance_kwargs)
+        metrics = measure_creativity(plan)
+        violations = int(violated_days(plan, self.food_db, self.targets).sum())
+        score = metrics['creativity_score'] - self.violation_penalty * violations
+        return PlanVariant(seed=seed, plan=plan, score=score, violations=violations, metrics=metrics)
+
+
+_worker_runner = None
+
+
+def _init_worker(*args):
+    global _worker_runner
+    _worker_runner = _VariantRunner(*args)
+
+
+def _run_in_worker(seed):
+    variant = _worker_runner.run(seed)
+    # The plan no longer shares meals with anything once it leaves this process
+    variant.plan._owned_meals = None
+    return variant
+
+
+def generate_variants(food_db: FoodDatabase, base_plan: WeeklyPlan, k: int = 16, seed: int = 0,
+                      top_n: int = 1, workers: Optional[int] = None,
+                      requirements: Optional[DietaryRequirements] = None,
+                      violation_penalty: float = 0.1, **enhance_kwargs) -> List[PlanVariant]:
+    """
+    Generate k creative variants of a base plan and return the top_n best
+
+    Each variant is built by MealCreativityEngine.enhance_meal_plan with
+    its own seed derived from seed, so a run is reproducible whatever the
+    number of workers. Variants are scored by measure_creativity's
+    creativity_score minus violation_penalty for every day that breaks the
+    requirements' daily targets, and returned best first (ties go to the
+    earlier variant).
+
+    workers defaults to the CPU count; with one worker everything runs in
+    this process. Extra keyword arguments go to enhance_meal_plan.
+    """
+    if requirements is not None:
+        enhance_kwargs['requirements'] = requirements
+    seeds = variant_seeds(seed, k)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    init_args = (food_db, base_plan, requirements, violation_penalty, enhance_kwargs)
+
+    if workers <= 1 or k <= 1:
+        runner = _VariantRunner(*init_args)
+        state = random.getstate()
+        try:
+            variants = [runner.run(variant_seed) for variant_seed in seeds]
+        finally:
+            random.setstate(state)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, k), initializer=_init_worker,
+                                 initargs=init_args) as executor:
+            chunksize = max(1, k // (4 * min(workers, k)))
+            variants = list(executor.map(_run_in_worker, seeds, chunksize=chunksize))
+
+    order = sorted(range(len(variants)), key=lambda i: (-variants[i].score, i))
+    return [variants[i] for i in order[:top_n]]
@@ -1,37 +1,31 @@
 import json
 import random
 from user_profile import UserProfile
+from food_ranking import get_ranked_foods
 
-def generate_daily_meal_plan(user: UserProfile, food_file="data/foods_cleaned_with_portion.json"):
-    with open(food_file, "r", encoding="utf-8") as f:
-        foods = json.load(f)
+def generate_daily_meal_plan(user: UserProfile, food_file="data/foods_cleaned_with_portion.json", engine="greedy"):
+    # JSON, NDJSON (.ndjson) or a columnar dataset directory, loaded and sorted by protein density once per file
+    ranked = get_ranked_foods(food_file)
 
     calorie_target = user.daily_calories()
-    total_cal = 0
-    total_protein = 0
-    total_fiber = 0
-    meals = []
+    if engine == "greedy":
+        picked = ranked.greedy_fill(calorie_target, user.dietary_restrictions)
+    elif engine == "knapsack":
+        # Best protein + fiber score within the calorie target; bounded runtime, see RankedFoods.knapsack_fill
+        picked = ranked.knapsack_fill(calorie_target, user.dietary_restrictions)
+    else:
+        raise ValueError("Engine must be 'greedy' or 'knapsack'")
+    return ranked.summarize(calorie_target, picked)
 
-    # Sort by protein density
-    sorted_foods = sorted(foods, key=lambda x: x["protein"] / (x["calories"] + 1), reverse=True)
+def generate_daily_meal_plans(users, food_file="data/foods_cleaned_with_portion.json", engine="greedy"):
+    # Same plans as generate_daily_meal_plan for each user, with the greedy fill run for all users together
+    if engine != "greedy":
+        return [generate_daily_meal_plan(user, food_file, engine) for user in users]
+    ranked = get_ranked_foods(food_file)
 
-    for food in sorted_foods:
-        if any(restriction.lower() in food['name'].lower() for restriction in user.dietary_restrictions):
-            continue  # skip restricted
-
-        if total_cal + food["calories"] <= calorie_target:
-            meals.append(food)
-            total_cal += food["calories"]
-            total_protein += food["protein"]
-            total_fiber += food.get("fiber", 0) or 0
-
-        if total_cal >= calorie_target * 0.95:
-            break
-
-    return {
-        "calorie_target": round(calorie_target, 2),
-        "total_calories": round(total_cal, 2),
-        "total_protein": round(total_protein, 2),
-        "total_fiber": round(total_fiber, 2),
-        "meals": meals
-    }
+    calorie_targets = [user.daily_calories() for user in users]
+    picked, totals = ranked.greedy_fill_batch(calorie_targets, [user.dietary_restrictions for user in users])
+    return [
+        ranked.summarize(calorie_target, row.nonzero()[0].tolist(), user_totals)
+        for calorie_target, row, user_totals in zip(calorie_targets, picked, zip(*(total.tolist() for total in totals)))
+    ]
@@ -1,17 +1,28 @@
-import pandas as pd
 from user_profile import UserProfile
+from workout_catalog import get_workout_catalog
+from workout_scheduler import WeeklyWorkoutScheduler
+from workout_search import get_workout_search_index
 
-def select_daily_workout(user: UserProfile, workout_file="data/workouts_cleaned.json"):
-    df = pd.read_json(workout_file)
+def select_daily_workout(user: UserProfile, workout_file="data/workouts_cleaned.json", query=None):
+    # JSON, NDJSON (.ndjson) or a columnar dataset directory, loaded and indexed once per file
+    catalog = get_workout_catalog(workout_file)
+    n = 2 if user.goal == "muscle_gain" else 1
 
-    df_filtered = df[
-        (df["level"].str.lower() == user.fitness_level.lower()) &
-        (df["equipment"].isin(user.available_equipment))
-    ]
+    rows = catalog.rows(level=user.fitness_level, equipment=user.available_equipment)
 
-    if df_filtered.empty:
-        df_filtered = df  # fallback to all workouts
+    if not len(rows):
+        rows = catalog.rows()  # fallback to all workouts
 
-    selected = df_filtered.sample(n=2 if user.goal == "muscle_gain" else 1)
+    if query:
+        # Best BM25 matches for a free-text query, e.g. "lower back friendly", within the filters
+        index = get_workout_search_index(workout_file)
+        hits = index.search(query, k=n, rows=rows) or index.search(query, k=n)
+        if hits:
+            return [dict(catalog.records[row_id]) for row_id, _ in hits]
 
-    return selected.to_dict(orient="records")
+    return catalog.sample(rows, n=min(n, len(rows)))
+
+def generate_weekly_workout(user: UserProfile, workout_file="data/workouts_cleaned.json", rng=None, **scheduler_options):
+    # Rotates body parts across the week; see WeeklyWorkoutScheduler for the options
+    scheduler = WeeklyWorkoutScheduler(get_workout_catalog(workout_file), **scheduler_options)
+    return scheduler.schedule(user, rng=rng)
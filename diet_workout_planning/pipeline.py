@@ -0,0 +1,139 @@
+import argparse
+import json
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from user_profile import UserProfile
+from generate_meals import generate_daily_meal_plan
+from generate_workout import select_daily_workout
+
+
+def iter_profiles(path):
+    """
+    Lazily yield (position, record) from an NDJSON file (one profile per line) or a JSON list
+
+    Records are not parsed or checked here, so one malformed record cannot
+    stop the iteration: NDJSON lines are yielded as text, list entries as
+    they are. run_pipeline turns each into a UserProfile (see load_profile).
+    """
+    if path.endswith((".ndjson", ".jsonl")):
+        with open(path, "r", encoding="utf-8") as f:
+            position = 0
+            for line in f:
+                if line.strip():
+                    yield position, line
+                    position += 1
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from enumerate(json.load(f))
+
+
+def load_profile(user_id, profile):
+    """
+    (user id, UserProfile) for a UserProfile, a dict of its arguments or an NDJSON line
+
+    Records hold the UserProfile arguments plus an optional "id", which
+    replaces user_id. Raises if the record is not a valid profile.
+    """
+    if isinstance(profile, UserProfile):
+        return user_id, profile
+    if isinstance(profile, str):
+        profile = json.loads(profile)
+    if not isinstance(profile, dict):
+        raise TypeError(f"Profile must be a JSON object, got {type(profile).__name__}")
+    record = dict(profile)
+    user_id = record.pop("id", user_id)
+    return user_id, UserProfile(**record)
+
+
+def run_pipeline(profiles, output, max_in_flight=8, workers=4, meal_engine="greedy",
+                 food_file="data/foods_cleaned_with_portion.json", workout_file="data/workouts_cleaned.json"):
+    """
+    Build daily plans for many users and write each as one NDJSON line as soon as it is ready
+
+    profiles is an iterable of (user id, profile), e.g. iter_profiles, where
+    a profile is anything load_profile takes. It is consumed lazily: at most
+    max_in_flight users are being planned at any time, so memory stays flat
+    however many profiles there are. Each user's meals and workout run as
+    separate tasks on a pool of workers threads. Lines come out in
+    completion order and carry the user id; a record that is not a valid
+    profile, or a user whose plan fails, gets an "error" line instead of
+    stopping the run.
+
+    Returns the number of lines written.
+    """
+    written = 0
+    pending = {}  # future -> sequence number of its user
+    parts = {}  # sequence number -> {"id": ..., "user": ..., "meals": future, "workout": future}
+    profiles = enumerate(profiles)
+    exhausted = False
+
+    def write_line(line):
+        output.write(json.dumps(line, ensure_ascii=False) + "\n")
+        output.flush()
+
+    def write(state):
+        try:
+            line = {
+                "user": state["id"],
+                "user_summary": state["user"].summary(),
+                "meals": state["meals"].result(),
+                "workout": state["workout"].result()
+            }
+        except Exception as e:
+            line = {"user": state["id"], "error": f"{type(e).__name__}: {e}"}
+        write_line(line)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while not exhausted and len(parts) < max_in_flight:
+                try:
+                    sequence, (user_id, profile) = next(profiles)
+                except StopIteration:
+                    exhausted = True
+                    break
+                try:
+                    user_id, user = load_profile(user_id, profile)
+                except Exception as e:
+                    write_line({"user": user_id, "error": f"{type(e).__name__}: {e}"})
+                    written += 1
+                    continue
+                meals = executor.submit(generate_daily_meal_plan, user, food_file, meal_engine)
+                workout = executor.submit(select_daily_workout, user, workout_file)
+                parts[sequence] = {"id": user_id, "user": user, "meals": meals, "workout": workout}
+                pending[meals] = sequence
+                pending[workout] = sequence
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                sequence = pending.pop(future)
+                state = parts.get(sequence)
+                if state is not None and state["meals"].done() and state["workout"].done():
+                    del parts[sequence]
+                    write(state)
+                    written += 1
+
+    return written
+
+
+# ========== Run Script ========== #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream daily meal and workout plans for many users as NDJSON")
+    parser.add_argument("profiles", help="NDJSON (one profile per line) or JSON list of UserProfile arguments")
+    parser.add_argument("-o", "--output", default="-", help="output NDJSON file ('-' for stdout)")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="users being planned at once")
+    parser.add_argument("--workers", type=int, default=4, help="worker threads")
+    parser.add_argument("--meal-engine", default="greedy", choices=["greedy", "knapsack"])
+    args = parser.parse_args()
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        count = run_pipeline(iter_profiles(args.profiles), output, max_in_flight=args.max_in_flight,
+                             workers=args.workers, meal_engine=args.meal_engine)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"✅ Wrote {count} plans", file=sys.stderr)
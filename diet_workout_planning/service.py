@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import json
+import math
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+
+from user_profile import UserProfile
+from food_ranking import get_ranked_foods
+from generate_meals import generate_daily_meal_plan
+from generate_workout import generate_weekly_workout, select_daily_workout
+from workout_catalog import get_workout_catalog
+
+FOOD_FILE = "data/foods_cleaned_with_portion.json"
+WORKOUT_FILE = "data/workouts_cleaned.json"
+MEAL_ENGINES = ("greedy", "knapsack")
+NUMBER_FIELDS = ("age", "weight_kg", "height_cm")
+TEXT_FIELDS = ("gender", "goal", "activity_level", "fitness_level")
+LIST_FIELDS = ("dietary_restrictions", "available_equipment")
+PROFILE_FIELDS = NUMBER_FIELDS + TEXT_FIELDS + LIST_FIELDS
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADERS = 100
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+# ========== Worker Tasks ========== #
+# Run in the worker processes: module-level so they pickle, and fed plain dicts
+
+def _init_worker(food_file, workout_file):
+    # Forked workers inherit the event loop's SIGTERM handler and signal wakeup fd: reset
+    # them, or terminating a worker (as a broken pool does) would tell the service to stop
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Load and index the datasets once per worker instead of on its first request
+    get_ranked_foods(food_file)
+    get_workout_catalog(workout_file)
+
+
+def _meal_plan_task(profile, engine, food_file):
+    return generate_daily_meal_plan(UserProfile(**profile), food_file, engine)
+
+
+def _workout_task(profile, query, weekly, workout_file):
+    user = UserProfile(**profile)
+    if weekly:
+        return generate_weekly_workout(user, workout_file)
+    return select_daily_workout(user, workout_file, query=query)
+
+
+# ========== Service ========== #
+
+class PlanningService:
+    """
+    Local HTTP/JSON planning service on asyncio
+
+    Endpoints (POST bodies are the UserProfile arguments plus options):
+        POST /meal-plan   daily meal plan; option "engine" (greedy or knapsack)
+        POST /workout     daily workout; options "query" (free text) and "weekly"
+        POST /plan        both, with the user summary, as one line of the pipeline
+        GET  /health      queue, coalescing and worker restart counters
+
+    The event loop only parses requests; plans are computed on a pool of
+    worker processes. At most workers + max_queue distinct jobs are
+    accepted at once: past that a request is answered 503 with Retry-After
+    right away, so overload shows up as fast rejections rather than an
+    ever-growing queue. Requests identical to a job already in flight
+    (same task and arguments) wait for that job instead of starting a new
+    one, and do not count against the limit. If a worker process dies, the
+    requests it was serving get 503 and the pool is replaced on the next
+    submission.
+    """
+
+    def __init__(self, workers=4, max_queue=32, food_file=FOOD_FILE, workout_file=WORKOUT_FILE):
+        self.workers = workers
+        self.capacity = workers + max_queue
+        self.food_file = food_file
+        self.workout_file = workout_file
+        self.pending = 0
+        self.stats = {"requests": 0, "jobs": 0, "coalesced": 0, "rejected": 0, "errors": 0, "pool_restarts": 0}
+        self._in_flight = {}  # job key -> asyncio future shared by identical requests
+        self._connections = set()  # connection handler tasks
+        self._pool = None
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self._pool = self._new_pool()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(self.food_file, self.workout_file))
+
+    async def close(self):
+        """Stop accepting connections, end the open ones and shut the workers down"""
+        if self._server is not None:
+            self._server.close()
+        for task in self._connections:
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    # ----- jobs ----- #
+
+    def _submit(self, jobs):
+        """
+        Futures for (key, function, args) jobs, joining identical ones already in flight
+
+        All new jobs of one request are admitted together or not at all.
+        """
+        new = [job for job in jobs if job[0] not in self._in_flight]
+        if self.pending + len(new) > self.capacity:
+            self.stats["rejected"] += 1
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Planning queue is full, retry later")
+        self.stats["coalesced"] += len(jobs) - len(new)
+
+        loop = asyncio.get_running_loop()
+        for key, function, args in new:
+            try:
+                future = loop.run_in_executor(self._pool, function, *args)
+            except BrokenProcessPool:
+                # A worker died and took the pool down (its jobs have failed already): start a new one
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._new_pool()
+                self.stats["pool_restarts"] += 1
+                future = loop.run_in_executor(self._pool, function, *args)
+            self._in_flight[key] = future
+            self.pending += 1
+            self.stats["jobs"] += 1
+            future.add_done_callback(lambda _, key=key: self._finish(key))
+        # Shielded so a client going away cancels only its own wait, not a job others share
+        return [asyncio.shield(self._in_flight[key]) for key, _, _ in jobs]
+
+    def _finish(self, key):
+        del self._in_flight[key]
+        self.pending -= 1
+
+    def _meal_job(self, profile, options):
+        engine = options.get("engine", "greedy")
+        if engine not in MEAL_ENGINES:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"engine must be one of {list(MEAL_ENGINES)}")
+        return _job_key("meal", profile, engine), _meal_plan_task, (profile, engine, self.food_file)
+
+    def _workout_job(self, profile, options):
+        query = options.get("query")
+        weekly = bool(options.get("weekly", False))
+        return (_job_key("workout", profile, query, weekly), _workout_task,
+                (profile, query, weekly, self.workout_file))
+
+    async def handle(self, method, path, body):
+        """Status and JSON payload for one request"""
+        if path == "/health":
+            if method != "GET":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+            return HTTPStatus.OK, {"status": "ok", "pending": self.pending, "capacity": self.capacity, **self.stats}
+        if path not in ("/meal-plan", "/workout", "/plan"):
+            raise HTTPError(HTTPStatus.NOT_FOUND)
+        if method != "POST":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+
+        profile, options, user = _parse_profile(body)
+        if path == "/meal-plan":
+            (meals,) = self._submit([self._meal_job(profile, options)])
+            return HTTPStatus.OK, await meals
+        if path == "/workout":
+            (workout,) = self._submit([self._workout_job(profile, options)])
+            return HTTPStatus.OK, await workout
+        jobs = self._submit([self._meal_job(profile, options), self._workout_job(profile, options)])
+        # gather, so a failed meal job does not leave the workout job's exception unretrieved
+        meals, workout = await asyncio.gather(*jobs)
+        return HTTPStatus.OK, {
+            "user_summary": user.summary(),
+            "meals": meals,
+            "workout": workout
+        }
+
+    # ----- HTTP ----- #
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await _respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    if len(headers) >= MAX_HEADERS:
+                        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                length = headers.get("content-length") or "0"
+                if not (length.isascii() and length.isdigit()):
+                    await _respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"}, False)
+                    break
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    await _respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                self.stats["requests"] += 1
+                try:
+                    status, payload = await self.handle(method, target.split("?", 1)[0], body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except BrokenProcessPool:
+                    self.stats["errors"] += 1
+                    status, payload = HTTPStatus.SERVICE_UNAVAILABLE, {"error": "A planning worker stopped, retry later"}
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+                await _respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            await _respond(writer, e.status, {"error": str(e)}, False)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # client went away or sent something unparseable (e.g. an over-long line)
+        except asyncio.CancelledError:
+            pass  # closed by close(); asyncio's stream callback would report a cancelled handler as an error
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+
+def _job_key(task, profile, *options):
+    return task, json.dumps([profile, *options], sort_keys=True)
+
+
+def _parse_profile(body):
+    """UserProfile arguments, the remaining options and the UserProfile for a request body"""
+    try:
+        record = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+    if not isinstance(record, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+
+    profile = {field: record.pop(field) for field in PROFILE_FIELDS if field in record}
+    for field, value in profile.items():
+        if field in NUMBER_FIELDS:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+            expected = "a number"
+        elif field in TEXT_FIELDS:
+            valid = isinstance(value, str)
+            expected = "a string"
+        else:
+            valid = isinstance(value, list) and all(isinstance(item, str) for item in value)
+            expected = "a list of strings"
+        if not valid:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid profile: {field} must be {expected}")
+    try:
+        user = UserProfile(**profile)
+        user.daily_calories()
+    except (TypeError, ValueError) as e:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid profile: {e}")
+    return profile, record, user
+
+
+async def _respond(writer, status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}"
+    ]
+    if status == HTTPStatus.SERVICE_UNAVAILABLE:
+        head.append("Retry-After: 1")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+async def serve(host="127.0.0.1", port=8080, **options):
+    """Run the service until interrupted (Ctrl-C) or terminated (SIGTERM), then close it cleanly"""
+    service = PlanningService(**options)
+    await service.start(host, port)
+    print(f"✅ Planning service on http://{host}:{port} ({service.workers} workers, "
+          f"{service.capacity} jobs max)", flush=True)
+    stop = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except NotImplementedError:
+        pass  # no signal handlers on Windows event loops
+    try:
+        await stop.wait()
+    finally:
+        await service.close()
+
+
+# ========== Run Script ========== #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve meal and workout plans over local HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="worker processes")
+    parser.add_argument("--max-queue", type=int, default=32, help="jobs waiting for a worker before requests get 503")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, max_queue=args.max_queue))
+    except KeyboardInterrupt:
+        pass
@@ -1,3 +1,16 @@
+# Shared with the vectorized cohort version in diet/cohort.py
+ACTIVITY_MULTIPLIERS = {
+    "light": 1.375,
+    "moderate": 1.55,
+    "active": 1.725
+}
+DEFAULT_ACTIVITY_MULTIPLIER = 1.55
+GOAL_ADJUSTMENTS = {
+    "weight_loss": -500,
+    "muscle_gain": 300
+}
+
+
 class UserProfile:
     def __init__(self, age, gender, weight_kg, height_cm, goal, activity_level,
                  dietary_restrictions=None, fitness_level="beginner", available_equipment=None):
@@ -19,19 +32,13 @@ class UserProfile:
         return bmr
 
     def daily_calories(self):
-        multiplier = {
-            "light": 1.375,
-            "moderate": 1.55,
-            "active": 1.725
-        }.get(self.activity_level, 1.55)
+        multiplier = ACTIVITY_MULTIPLIERS.get(self.activity_level, DEFAULT_ACTIVITY_MULTIPLIER)
 
         bmr = self.calculate_bmr()
         maintenance = bmr * multiplier
 
-        if self.goal == "weight_loss":
-            return maintenance - 500
-        elif self.goal == "muscle_gain":
-            return maintenance + 300
+        if self.goal in GOAL_ADJUSTMENTS:
+            return maintenance + GOAL_ADJUSTMENTS[self.goal]
         else:
             return maintenance
 
@@ -0,0 +1,180 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# A columnar dataset is a directory holding one .npy file per buffer plus this schema file.
+# Numeric columns are a single int64 or float64 array; text columns are UTF-8 bytes plus int64 offsets,
+# so every buffer can be memory-mapped without parsing.
+SCHEMA_FILE = "schema.json"
+
+
+def write_ndjson(df: pd.DataFrame, output_path):
+    """Write one JSON record per line"""
+    df.to_json(output_path, orient="records", lines=True, force_ascii=False)
+
+
+def iter_ndjson(path):
+    """Lazily yield the records of a newline-delimited JSON file"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_columnar(df: pd.DataFrame, output_dir):
+    """Write a DataFrame as a directory of memory-mappable column buffers"""
+    os.makedirs(output_dir, exist_ok=True)
+    schema = {"length": len(df), "columns": []}
+
+    for i, name in enumerate(df.columns):
+        column = df[name]
+        if pd.api.types.is_integer_dtype(column):
+            np.save(os.path.join(output_dir, f"{i}.values.npy"), column.to_numpy(dtype=np.int64))
+            schema["columns"].append({"name": name, "kind": "integer"})
+        elif pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+            np.save(os.path.join(output_dir, f"{i}.values.npy"), column.to_numpy(dtype=np.float64, na_value=np.nan))
+            schema["columns"].append({"name": name, "kind": "number"})
+        else:
+            encoded = [b"" if pd.isna(value) else str(value).encode("utf-8") for value in column]
+            lengths = np.fromiter((len(value) for value in encoded), dtype=np.int64, count=len(encoded))
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            np.save(os.path.join(output_dir, f"{i}.data.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+            np.save(os.path.join(output_dir, f"{i}.offsets.npy"), offsets)
+            schema["columns"].append({
+                "name": name,
+                "kind": "text",
+                "nullable": bool(column.isna().any())
+            })
+
+    with open(os.path.join(output_dir, SCHEMA_FILE), "w", encoding="utf-8") as f:
+        json.dump(schema, f, ensure_ascii=False)
+
+
+class TextColumn:
+    """Read-only view of a text column that decodes values on access"""
+
+    def __init__(self, data, offsets, nullable):
+        self.data = data
+        self.offsets = offsets
+        self.nullable = nullable
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        if self.nullable and start == end:
+            return None
+        return bytes(self.data[start:end]).decode("utf-8")
+
+    def to_list(self):
+        raw = bytes(self.data)
+        offsets = self.offsets.tolist()
+        values = [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+        if self.nullable:
+            values = [value if value else None for value in values]
+        return values
+
+
+class ColumnarDataset:
+    """Reader for datasets written by write_columnar"""
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(os.path.join(path, SCHEMA_FILE), "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        self.length = schema["length"]
+        self._mmap_mode = "r" if mmap else None
+        self._specs = {spec["name"]: (i, spec) for i, spec in enumerate(schema["columns"])}
+        self._columns = {}
+
+    @property
+    def columns(self):
+        return list(self._specs)
+
+    def __len__(self):
+        return self.length
+
+    def _load(self, i, buffer):
+        return np.load(os.path.join(self.path, f"{i}.{buffer}.npy"), mmap_mode=self._mmap_mode)
+
+    def column(self, name):
+        """Numeric columns come back as (memory-mapped) arrays, text columns as TextColumn"""
+        if name not in self._columns:
+            i, spec = self._specs[name]
+            if spec["kind"] in ("integer", "number"):
+                self._columns[name] = self._load(i, "values")
+            else:
+                self._columns[name] = TextColumn(self._load(i, "data"), self._load(i, "offsets"), spec.get("nullable", False))
+        return self._columns[name]
+
+    def _column_values(self, name):
+        column = self.column(name)
+        if isinstance(column, TextColumn):
+            return column.to_list()
+        if column.dtype.kind == "i":
+            return column.tolist()
+        return [None if np.isnan(value) else value for value in column.tolist()]
+
+    def iter_records(self):
+        """Yield one dict per row, in file order"""
+        names = self.columns
+        values = [self._column_values(name) for name in names]
+        for row in zip(*values):
+            yield dict(zip(names, row))
+
+    def to_records(self):
+        return list(self.iter_records())
+
+    def to_dataframe(self):
+        data = {}
+        for name in self.columns:
+            column = self.column(name)
+            data[name] = column.to_list() if isinstance(column, TextColumn) else np.asarray(column)
+        return pd.DataFrame(data)
+
+
+def write_dataset(df: pd.DataFrame, output_path, output_format="json"):
+    """Write a cleaned dataset as pretty JSON, NDJSON, CSV or columnar binary"""
+    if output_format == "json":
+        df.to_json(output_path, orient="records", indent=2, force_ascii=False)
+    elif output_format == "ndjson":
+        write_ndjson(df, output_path)
+    elif output_format == "csv":
+        df.to_csv(output_path, index=False)
+    elif output_format == "columnar":
+        write_columnar(df, output_path)
+    else:
+        raise ValueError("Output format must be 'json', 'ndjson', 'csv' or 'columnar'")
+
+
+def _detect_format(path):
+    if os.path.isdir(path):
+        return "columnar"
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "json"
+
+
+def load_records(path):
+    """Load a cleaned dataset as a list of dicts, whatever format it was written in"""
+    dataset_format = _detect_format(path)
+    if dataset_format == "columnar":
+        return ColumnarDataset(path).to_records()
+    if dataset_format == "ndjson":
+        return list(iter_ndjson(path))
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_dataframe(path):
+    """Load a cleaned dataset as a DataFrame, whatever format it was written in"""
+    dataset_format = _detect_format(path)
+    if dataset_format == "columnar":
+        return ColumnarDataset(path).to_dataframe()
+    if dataset_format == "ndjson":
+        return pd.read_json(path, orient="records", lines=True)
+    return pd.read_json(path)
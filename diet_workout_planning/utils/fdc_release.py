@@ -0,0 +1,57 @@
+import os
+import zipfile
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+def _is_zip(source):
+    return source is not None and str(source).lower().endswith(".zip")
+
+
+def _find_member(archive, member):
+    """Find a CSV inside a release zip, which nests everything in a release folder"""
+    for name in archive.namelist():
+        if name == member or name.endswith("/" + member):
+            return name
+    raise FileNotFoundError(f"'{member}' not found in {archive.filename}")
+
+
+@contextmanager
+def open_release_file(member, source=None):
+    """
+    Open one file of a FoodData Central release for binary reading
+
+    source can be None (member is a plain path), a release folder, or the
+    release zip. Zip members are decompressed as they are read, so nothing
+    is extracted to disk and other members are never touched.
+    """
+    if _is_zip(source):
+        with zipfile.ZipFile(source) as archive:
+            with archive.open(_find_member(archive, member)) as f:
+                yield f
+    else:
+        path = member if source is None else os.path.join(source, member)
+        with open(path, "rb") as f:
+            yield f
+
+
+def read_release_csv(member, source=None, **kwargs):
+    """pd.read_csv for a release file, see open_release_file"""
+    with open_release_file(member, source) as f:
+        return pd.read_csv(f, **kwargs)
+
+
+def release_has_file(member, source=None):
+    """Check whether a release folder or zip contains the given file"""
+    if _is_zip(source):
+        if not os.path.exists(source):
+            return False
+        with zipfile.ZipFile(source) as archive:
+            try:
+                _find_member(archive, member)
+                return True
+            except FileNotFoundError:
+                return False
+    path = member if source is None else os.path.join(source, member)
+    return os.path.exists(path)
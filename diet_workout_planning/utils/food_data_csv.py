@@ -2,31 +2,28 @@ import pandas as pd
 import json
 import os
 
+from diet_workout_planning.utils.dataset_io import load_dataframe, write_dataset
+from diet_workout_planning.utils.fdc_release import open_release_file, read_release_csv
 
-def parse_usda_csv(
-    food_csv,
-    nutrient_csv,
-    food_nutrient_csv,
-    food_portion_csv,
-    output_path="foods_cleaned.json"
-):
-    # Load data
-    food_df = pd.read_csv(food_csv)
-    nutrient_df = pd.read_csv(nutrient_csv)
-    food_nutrient_df = pd.read_csv(food_nutrient_csv)
-    portion_df = pd.read_csv(food_portion_csv)
-
-    # Target nutrient names
-    target_nutrients = [
-        "Energy",
-        "Protein",
-        "Total lipid (fat)",
-        "Carbohydrate, by difference",
-        "Fiber, total dietary"
-    ]
 
+# FoodData Central nutrient ids of the energy values
+ENERGY_KCAL_ID = 1008
+ENERGY_ATWATER_GENERAL_ID = 2047
+
+# Target nutrient names
+TARGET_NUTRIENTS = [
+    "Energy",
+    "Protein",
+    "Total lipid (fat)",
+    "Carbohydrate, by difference",
+    "Fiber, total dietary"
+]
+
+
+def _build_food_table(food_df, nutrient_df, food_nutrient_df, portion_df):
+    """Turn raw FoodData Central tables into one cleaned row per food"""
     # Get nutrient IDs
-    nutrients = nutrient_df[nutrient_df['name'].isin(target_nutrients)][['id', 'name']]
+    nutrients = nutrient_df[nutrient_df['name'].isin(TARGET_NUTRIENTS)][['id', 'name']]
     nutrient_id_to_name = dict(zip(nutrients['id'], nutrients['name']))
 
     # Filter nutrient values
@@ -67,28 +64,205 @@ def parse_usda_csv(
     else:
         merged['calories'] = merged['Energy_kcal']
 
+    # Make sure every output column exists, even when a subset of foods lacks a nutrient
+    for name in TARGET_NUTRIENTS[1:]:
+        if name not in merged.columns:
+            merged[name] = float('nan')
+
     # Final output
     final_df = merged.rename(columns={
         'Protein': 'protein',
         'Total lipid (fat)': 'fat',
         'Carbohydrate, by difference': 'carbs',
         'Fiber, total dietary': 'fiber'
-    })[['name', 'portion_g', 'calories', 'protein', 'fat', 'carbs', 'fiber']]
+    })[['fdc_id', 'name', 'portion_g', 'calories', 'protein', 'fat', 'carbs', 'fiber']]
 
     # Drop rows with missing values
-    final_df = final_df.dropna(subset=['calories', 'protein'])
+    return final_df.dropna(subset=['calories', 'protein'])
+
+
+def parse_usda_csv(
+    food_csv,
+    nutrient_csv,
+    food_nutrient_csv,
+    food_portion_csv,
+    output_path="foods_cleaned.json",
+    release_zip=None,
+    output_format="json"
+):
+    # Load data (the CSV arguments are member names when reading from the release zip)
+    food_df = read_release_csv(food_csv, release_zip)
+    nutrient_df = read_release_csv(nutrient_csv, release_zip)
+    food_nutrient_df = read_release_csv(food_nutrient_csv, release_zip)
+    portion_df = read_release_csv(food_portion_csv, release_zip)
 
-    # Save to JSON
-    final_df.to_json(output_path, orient="records", indent=2, force_ascii=False)
+    final_df = _build_food_table(food_df, nutrient_df, food_nutrient_df, portion_df)
+
+    # Save as JSON, or as NDJSON / columnar binary for faster loading
+    write_dataset(final_df, output_path, output_format)
     print(f"Saved {len(final_df)} entries to {output_path}")
 
 
+def _state_path(output_path):
+    """Location of the ingestion state kept next to a cleaned output file"""
+    return output_path + ".state.json"
+
+
+def _write_state(state_path, release_log, release_ids):
+    """Record the ingested ``last_updated`` of every food in the release ('' when it has no log entry)"""
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump({str(k): release_log.get(k, '') for k in release_ids}, f)
+
+
+def _load_update_log(update_log_csv, release_zip=None):
+    """Return {fdc_id: last_updated} from a release's food_update_log_entry.csv"""
+    log_df = read_release_csv(update_log_csv, release_zip, usecols=['id', 'last_updated'], dtype={'last_updated': str})
+    log_df = log_df.sort_values('last_updated').drop_duplicates('id', keep='last')
+    return dict(zip(log_df['id'].astype(int), log_df['last_updated'].fillna('')))
+
+
+def _read_food_nutrients(food_nutrient_csv, fdc_ids, release_zip=None, chunksize=500_000):
+    """Read only the food_nutrient rows belonging to the given foods"""
+    with open_release_file(food_nutrient_csv, release_zip) as f:
+        chunks = [
+            chunk[chunk['fdc_id'].isin(fdc_ids)]
+            for chunk in pd.read_csv(
+                f,
+                usecols=['fdc_id', 'nutrient_id', 'amount'],
+                chunksize=chunksize
+            )
+        ]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def refresh_usda_csv(
+    food_csv,
+    nutrient_csv,
+    food_nutrient_csv,
+    food_portion_csv,
+    update_log_csv,
+    output_path="foods_cleaned.json",
+    diet_group_csv=None,
+    release_zip=None,
+    output_format="json"
+):
+    """
+    Incrementally bring a cleaned food file up to date with a new release
+
+    The last ingested ``last_updated`` value of every food is kept in
+    ``<output_path>.state.json``. Foods whose update log entry changed (or
+    that are new) are re-processed and patched into ``output_path``; foods
+    no longer in the release are removed. When there is no usable previous
+    state, this falls back to a full ``parse_usda_csv`` rebuild.
+
+    If ``diet_group_csv`` is given, the nutrient columns of changed foods are
+    also patched in place there. Diet group and meal labels are curated by
+    hand, so new foods are only reported, not added.
+
+    As with ``parse_usda_csv``, passing ``release_zip`` reads the CSVs
+    straight from the release archive, and ``output_format`` picks how
+    ``output_path`` is written (the existing file is read whatever its
+    format).
+    """
+    release_log = _load_update_log(update_log_csv, release_zip)
+    state_path = _state_path(output_path)
+
+    existing = None
+    if os.path.exists(output_path) and os.path.exists(state_path):
+        existing = load_dataframe(output_path)
+        if 'fdc_id' not in existing.columns:
+            existing = None
+
+    if existing is None:
+        print("No previous ingestion state found, running a full rebuild...")
+        parse_usda_csv(food_csv, nutrient_csv, food_nutrient_csv, food_portion_csv, output_path, release_zip,
+                       output_format)
+        release_ids = set(read_release_csv(food_csv, release_zip, usecols=['fdc_id'])['fdc_id'])
+        _write_state(state_path, release_log, release_ids)
+        return
+
+    with open(state_path, "r", encoding="utf-8") as f:
+        previous_log = {int(k): v for k, v in json.load(f).items()}
+
+    # Diff the release against what was ingested last time
+    food_df = read_release_csv(food_csv, release_zip, usecols=['fdc_id', 'description'])
+    release_ids = set(food_df['fdc_id'])
+    changed_ids = {
+        fdc_id for fdc_id in release_ids
+        if previous_log.get(fdc_id) != release_log.get(fdc_id, '')
+    }
+    removed_ids = set(previous_log) - release_ids
+
+    if not changed_ids and not removed_ids:
+        print(f"{output_path} is already up to date")
+        return
+
+    # Re-process only the changed foods
+    nutrient_df = read_release_csv(nutrient_csv, release_zip)
+    food_nutrient_df = _read_food_nutrients(food_nutrient_csv, changed_ids, release_zip)
+    portion_df = read_release_csv(food_portion_csv, release_zip)
+    portion_df = portion_df[portion_df['fdc_id'].isin(changed_ids)]
+    changed_df = _build_food_table(
+        food_df[food_df['fdc_id'].isin(changed_ids)], nutrient_df, food_nutrient_df, portion_df
+    )
+
+    # Patch the processed table
+    stale = existing['fdc_id'].isin(changed_ids | removed_ids)
+    patched = pd.concat([existing[~stale], changed_df], ignore_index=True)
+    write_dataset(patched, output_path, output_format)
+
+    _write_state(state_path, release_log, release_ids)
+
+    print(f"Patched {len(changed_ids)} changed and {len(removed_ids)} removed foods in {output_path}")
+
+    if diet_group_csv is not None:
+        _patch_diet_group_csv(diet_group_csv, nutrient_df, food_nutrient_df, changed_ids)
+
+
+def _patch_diet_group_csv(diet_group_csv, nutrient_df, food_nutrient_df, changed_ids):
+    """Overwrite nutrient columns of changed foods in the diet-group CSV"""
+    diet_df = pd.read_csv(diet_group_csv)
+    columns = list(diet_df.columns)
+    to_patch = set(diet_df['fdc_id']) & changed_ids
+
+    if to_patch:
+        # Pivot by id: names are not unique ("Energy" is both kcal and kJ)
+        rows = food_nutrient_df[food_nutrient_df['fdc_id'].isin(to_patch)]
+        wide = rows.pivot_table(index='fdc_id', columns='nutrient_id', values='amount', aggfunc='first')
+
+        # The CSV's Energy column is kcal, falling back to the Atwater general value
+        energy = pd.Series(float('nan'), index=wide.index)
+        for nutrient_id in (ENERGY_KCAL_ID, ENERGY_ATWATER_GENERAL_ID):
+            if nutrient_id in wide.columns:
+                energy = energy.fillna(wide[nutrient_id])
+
+        # Then one column per nutrient name, matching the layout of the CSV
+        id_to_name = {
+            nutrient_id: name for nutrient_id, name in zip(nutrient_df['id'], nutrient_df['name'])
+            if name != 'Energy'
+        }
+        wide = wide.rename(columns=id_to_name)
+        wide = wide[[col for col in wide.columns if col in diet_df.columns]]
+        if 'Energy' in diet_df.columns:
+            wide['Energy'] = energy
+
+        diet_df = diet_df.set_index('fdc_id')
+        diet_df.update(wide)
+        diet_df = diet_df.copy().reset_index()[columns]
+        diet_df.to_csv(diet_group_csv, index=False)
+
+    new_ids = changed_ids - set(diet_df['fdc_id'])
+    print(f"Patched {len(to_patch)} foods in {diet_group_csv}; "
+          f"{len(new_ids)} changed foods have no diet group label yet")
+
+
 # ========== Run Script ========== #
 if __name__ == "__main__":
     parse_usda_csv(
-        food_csv="data/food.csv",
-        nutrient_csv="data/nutrient.csv",
-        food_nutrient_csv="data/food_nutrient.csv",
-        food_portion_csv="data/food_portion.csv",
-        output_path="data/foods_cleaned_with_portion.json"
+        food_csv="food.csv",
+        nutrient_csv="nutrient.csv",
+        food_nutrient_csv="food_nutrient.csv",
+        food_portion_csv="food_portion.csv",
+        output_path="data/foods_cleaned_with_portion.json",
+        release_zip="data/FoodData_Central_foundation_food_csv_2024-10-31.zip"
     )
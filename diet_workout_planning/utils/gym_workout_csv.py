@@ -1,6 +1,8 @@
 import pandas as pd
 import json
 
+from diet_workout_planning.utils.dataset_io import write_dataset
+
 def parse_workout_data(
     input_csv,
     output_path="workouts_cleaned.json",
@@ -25,13 +27,8 @@ def parse_workout_data(
     # Remove duplicates
     df_cleaned = df_cleaned.drop_duplicates()
 
-    # Output to file
-    if output_format == "json":
-        df_cleaned.to_json(output_path, orient="records", indent=2, force_ascii=False)
-    elif output_format == "csv":
-        df_cleaned.to_csv(output_path, index=False)
-    else:
-        raise ValueError("Output format must be 'json' or 'csv'")
+    # Output to file ("json", "ndjson", "csv" or "columnar")
+    write_dataset(df_cleaned, output_path, output_format)
 
     print(f"✅ Saved {len(df_cleaned)} workouts to {output_path}")
 
@@ -41,5 +38,5 @@ if __name__ == "__main__":
     parse_workout_data(
         input_csv="data/GymDataset.csv",
         output_path="data/workouts_cleaned.json",
-        output_format="json"  # or "csv"
+        output_format="json"  # or "ndjson", "csv", "columnar"
     )
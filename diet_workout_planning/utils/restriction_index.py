@@ -0,0 +1,67 @@
+import re
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+
+class RestrictionIndex:
+    """
+    Precompiled dietary-restriction filter over a list of food names
+
+    A restriction excludes every food whose lowercased name contains it, as
+    the old per-food `restriction.lower() in name.lower()` scans did. Names
+    are tokenized once and each token keeps a bitset (a Python int, bit i =
+    food i) of the foods it appears in. A restriction term that is a single
+    word can only occur inside one token, so its bitset is the OR of the
+    bitsets of the tokens containing it; other terms (e.g. "peanut butter")
+    are matched against the names directly. Term bitsets are memoized, so a
+    user's excluded set is a few ORs of cached ints.
+    """
+
+    def __init__(self, names):
+        self.names = [name.lower() for name in names]
+        self.size = len(self.names)
+        self._token_bits = {}
+        for i, name in enumerate(self.names):
+            bit = 1 << i
+            for token in set(_WORD.findall(name)):
+                self._token_bits[token] = self._token_bits.get(token, 0) | bit
+        self._term_bits = {}
+        self._all = (1 << self.size) - 1
+
+    def term_bits(self, term) -> int:
+        """Bitset of the foods one restriction term excludes"""
+        term = term.lower()
+        bits = self._term_bits.get(term)
+        if bits is None:
+            bits = 0
+            if _WORD.fullmatch(term):
+                for token, token_bits in self._token_bits.items():
+                    if term in token:
+                        bits |= token_bits
+            else:
+                for i, name in enumerate(self.names):
+                    if term in name:
+                        bits |= 1 << i
+            self._term_bits[term] = bits
+        return bits
+
+    def excluded(self, restrictions) -> int:
+        """Bitset of the foods excluded by any of the restrictions"""
+        bits = 0
+        for term in restrictions:
+            bits |= self.term_bits(term)
+        return bits
+
+    def allowed(self, restrictions) -> int:
+        """Bitset of the foods none of the restrictions exclude"""
+        return self._all & ~self.excluded(restrictions)
+
+    def mask(self, bits) -> np.ndarray:
+        """Boolean array with one entry per food from a bitset"""
+        packed = np.frombuffer(bits.to_bytes((self.size + 7) // 8, "little"), dtype=np.uint8)
+        return np.unpackbits(packed, count=self.size, bitorder="little").astype(bool)
+
+    def allowed_mask(self, restrictions) -> np.ndarray:
+        return self.mask(self.allowed(restrictions))
@@ -0,0 +1,111 @@
+import itertools
+import threading
+
+import numpy as np
+
+from utils.dataset_io import load_records
+
+# Fields a workout can be looked up by; level is matched case-insensitively
+INDEX_FIELDS = ("level", "equipment", "body_part", "type")
+
+
+def _normalize(field, value):
+    if value is None or value != value:  # missing or NaN
+        return None
+    return value.lower() if field == "level" else value
+
+
+class WorkoutCatalog:
+    """
+    Workouts loaded once and indexed by (level, equipment, body_part, type)
+
+    Every row is registered under each combination of its own field values
+    and ANY (None), so a lookup with any subset of the fields is a single
+    dict access returning a precomputed array of row ids. Each equipment
+    value in the catalog also gets a bit, so a list of equipment is cached
+    by its bitmask: the cache is bounded by the catalog, not by the lists
+    requests happen to send.
+    """
+
+    ANY = None
+
+    def __init__(self, records):
+        self.records = list(records)
+        buckets = {}
+        for row_id, record in enumerate(self.records):
+            values = [_normalize(field, record.get(field)) for field in INDEX_FIELDS]
+            # A set, because a missing value and ANY give the same key
+            keys = {
+                tuple(value if keep else self.ANY for keep, value in zip(mask, values))
+                for mask in itertools.product((False, True), repeat=len(INDEX_FIELDS))
+            }
+            for key in keys:
+                buckets.setdefault(key, []).append(row_id)
+        self._index = {key: np.array(row_ids, dtype=np.int64) for key, row_ids in buckets.items()}
+        self._empty = np.zeros(0, dtype=np.int64)
+        equipment = {key[1] for key in self._index if key[1] is not self.ANY}
+        self._equipment_bits = {value: 1 << i for i, value in enumerate(sorted(equipment, key=str))}
+        self._equipment_cache = {}  # (level, body_part, type, equipment bitmask) -> row ids
+
+    @classmethod
+    def from_file(cls, workout_file):
+        return cls(load_records(workout_file))
+
+    def __len__(self):
+        return len(self.records)
+
+    def rows(self, level=ANY, equipment=ANY, body_part=ANY, type=ANY):
+        """
+        Row ids matching the given fields; ANY (None) matches everything
+
+        equipment can also be a list, meaning any of those; the union is
+        cached per set of catalog equipment values it names.
+        """
+        level = _normalize("level", level)
+        if isinstance(equipment, (list, tuple, set, frozenset)):
+            if self.ANY in equipment:
+                return self._index.get((level, self.ANY, body_part, type), self._empty)
+            mask = 0
+            for item in equipment:
+                mask |= self._equipment_bits.get(item, 0)
+            # Nothing to cache when no row can match (unknown equipment, level, body part or type)
+            if not mask or (level, self.ANY, body_part, type) not in self._index:
+                return self._empty
+            cache_key = (level, body_part, type, mask)
+            rows = self._equipment_cache.get(cache_key)
+            if rows is None:
+                parts = [self._index.get((level, item, body_part, type), self._empty)
+                         for item, bit in self._equipment_bits.items() if mask & bit]
+                # Sorted and unique, as sample() expects
+                rows = np.unique(np.concatenate(parts))
+                self._equipment_cache[cache_key] = rows
+            return rows
+        return self._index.get((level, equipment, body_part, type), self._empty)
+
+    def sample(self, rows, n=1, rng=None):
+        """Pick n distinct workouts among rows and return them as dicts"""
+        rng = rng if rng is not None else np.random
+        picked = rng.choice(rows, size=n, replace=False)
+        return [dict(self.records[row_id]) for row_id in picked.tolist()]
+
+
+_catalogs = {}
+_lock = threading.Lock()
+
+
+def get_workout_catalog(workout_file="data/workouts_cleaned.json") -> WorkoutCatalog:
+    """Return the catalog for a workout file, loading and indexing it on first use"""
+    catalog = _catalogs.get(workout_file)
+    if catalog is None:
+        with _lock:
+            catalog = _catalogs.get(workout_file)
+            if catalog is None:
+                catalog = WorkoutCatalog.from_file(workout_file)
+                _catalogs[workout_file] = catalog
+    return catalog
+
+
+def reset_workout_catalogs():
+    """Drop the loaded catalogs so the next use reloads them from disk"""
+    with _lock:
+        _catalogs.clear()
@@ -0,0 +1,139 @@
+import numpy as np
+
+from workout_catalog import WorkoutCatalog
+
+# Exercises per training day by type, per goal
+DEFAULT_TYPE_MIX = {
+    "muscle_gain": {"Strength": 4, "Stretching": 1},
+    "weight_loss": {"Strength": 2, "Plyometrics": 1, "Cardio": 1, "Stretching": 1},
+    "maintenance": {"Strength": 3, "Stretching": 1},
+}
+
+# Training days (0 = first day of the week) per fitness level
+DEFAULT_TRAINING_DAYS = {
+    "beginner": [0, 2, 4],
+    "intermediate": [0, 1, 3, 4],
+    "expert": [0, 1, 2, 4, 5],
+}
+
+# Types that do not load a body part, so they neither need nor cost a recovery day
+RECOVERY_EXEMPT_TYPES = {"Stretching", "Cardio"}
+
+
+def _randint(rng, n):
+    """Random index below n from a numpy Generator or RandomState"""
+    return int(rng.integers(n)) if isinstance(rng, np.random.Generator) else int(rng.randint(n))
+
+
+class WeeklyWorkoutScheduler:
+    """
+    Assign exercises to the days of a week
+
+    Each training day is filled type by type following the goal's type mix.
+    For every slot the scheduler looks at the body parts that still have an
+    unused exercise of that type for the user's level and equipment, skips
+    the body parts loaded the day before (stretching and cardio don't count)
+    and picks among the ones trained least so far this week, so the week
+    rotates through the body parts instead of sampling them independently.
+    max_per_equipment caps how many exercises of a day use the same
+    equipment. A user without listed equipment can use any. When the user's
+    level has nothing left for a slot, any level is allowed, then any
+    equipment, like select_daily_workout's fallback to the whole catalog; a
+    slot nothing can fill is left out.
+
+    rng is a numpy Generator or RandomState (np.random by default).
+
+    Every lookup is a bucket of the indexed WorkoutCatalog, so a week takes
+    a few milliseconds.
+    """
+
+    def __init__(self, catalog: WorkoutCatalog, type_mix=None, training_days=None, max_per_equipment=None,
+                 num_days=7):
+        self.catalog = catalog
+        self.type_mix = type_mix
+        self.training_days = training_days
+        self.max_per_equipment = max_per_equipment
+        self.num_days = num_days
+        self.body_parts = sorted({record["body_part"] for record in catalog.records if record.get("body_part")})
+
+    def _candidates(self, level, equipment, body_part, workout_type, used, equipment_counts):
+        """Unused row ids for one slot, honoring the per-day equipment cap"""
+        capped = []
+        if self.max_per_equipment is not None:
+            capped = [item for item, count in equipment_counts.items() if count >= self.max_per_equipment]
+            if equipment is not WorkoutCatalog.ANY:
+                equipment = [item for item in equipment if item not in capped]
+        rows = self.catalog.rows(level=level, equipment=equipment, body_part=body_part, type=workout_type)
+        if equipment is WorkoutCatalog.ANY and capped and len(rows):
+            rows = rows[~np.isin(rows, self.catalog.rows(equipment=capped))]
+        if used and len(rows):
+            rows = rows[~np.isin(rows, list(used))]
+        return rows
+
+    def _fill_slot(self, level, equipment, workout_type, blocked, week_counts, used, equipment_counts, rng):
+        passes = [(level, equipment), (WorkoutCatalog.ANY, equipment)]
+        if equipment is not WorkoutCatalog.ANY:
+            passes.append((WorkoutCatalog.ANY, WorkoutCatalog.ANY))
+        for slot_level, slot_equipment in passes:
+            options = []
+            for body_part in self.body_parts:
+                if workout_type not in RECOVERY_EXEMPT_TYPES and body_part in blocked:
+                    continue
+                rows = self._candidates(slot_level, slot_equipment, body_part, workout_type, used, equipment_counts)
+                if len(rows):
+                    options.append((week_counts.get(body_part, 0), body_part, rows))
+            if options:
+                fewest = min(count for count, _, _ in options)
+                least_trained = [(body_part, rows) for count, body_part, rows in options if count == fewest]
+                body_part, rows = least_trained[_randint(rng, len(least_trained))]
+                return int(rows[_randint(rng, len(rows))])
+        return None
+
+    def schedule(self, user, rng=None):
+        """
+        Build one week for a user
+
+        Returns one dict per day with the day number, whether it is a rest
+        day, the body parts it loads and its exercises as catalog records.
+        """
+        rng = rng if rng is not None else np.random
+        level = user.fitness_level
+        equipment = list(user.available_equipment) or WorkoutCatalog.ANY
+        type_mix = self.type_mix or DEFAULT_TYPE_MIX.get(user.goal, DEFAULT_TYPE_MIX["maintenance"])
+        training_days = self.training_days
+        if training_days is None:
+            training_days = DEFAULT_TRAINING_DAYS.get(level.lower(), DEFAULT_TRAINING_DAYS["beginner"])
+        training_days = set(training_days)
+
+        week_counts = {}  # body part -> loaded exercises so far this week
+        used = set()  # row ids already scheduled this week
+        loaded_yesterday = set()
+        week = []
+
+        for day in range(self.num_days):
+            exercises, loaded_today, equipment_counts = [], [], {}
+            if day in training_days:
+                for workout_type, count in type_mix.items():
+                    for _ in range(count):
+                        row_id = self._fill_slot(level, equipment, workout_type, loaded_yesterday,
+                                                 week_counts, used, equipment_counts, rng)
+                        if row_id is None:
+                            continue
+                        record = self.catalog.records[row_id]
+                        used.add(row_id)
+                        equipment_counts[record.get("equipment")] = equipment_counts.get(record.get("equipment"), 0) + 1
+                        if workout_type not in RECOVERY_EXEMPT_TYPES:
+                            week_counts[record["body_part"]] = week_counts.get(record["body_part"], 0) + 1
+                            if record["body_part"] not in loaded_today:
+                                loaded_today.append(record["body_part"])
+                        exercises.append(dict(record))
+
+            week.append({
+                "day": day + 1,
+                "rest": day not in training_days,
+                "body_parts": loaded_today,
+                "exercises": exercises
+            })
+            loaded_yesterday = set(loaded_today)
+
+        return week
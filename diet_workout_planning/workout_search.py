@@ -0,0 +1,199 @@
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+
+from workout_catalog import WorkoutCatalog, get_workout_catalog
+
+INDEX_SUFFIX = ".bm25.npz"
+INDEX_VERSION = 1
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it its of on or the this that to with".split()
+)
+
+
+def _stem(token):
+    # Just enough to match plurals, e.g. "variations" -> "variation", "exercises" -> "exercise"
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed and plurals folded"""
+    return [_stem(token) for token in _TOKEN.findall((text or "").lower()) if token not in _STOPWORDS]
+
+
+def index_path(workout_file):
+    """Where the search index for a workout file is persisted"""
+    return workout_file.rstrip("/\\") + INDEX_SUFFIX
+
+
+def _source_stamp(workout_file):
+    stat = os.stat(workout_file)
+    return np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+class WorkoutSearchIndex:
+    """
+    Inverted index with BM25 ranking over workout titles and descriptions
+
+    Postings are stored as flat arrays (CSR: one offset range per term), and
+    each posting already holds its BM25 term weight, so a query only sums
+    the posting weights of its terms into a per-row score array. Title
+    tokens are counted title_weight times, so a match in the title outranks
+    the same match in the description. Row ids are positions in the
+    WorkoutCatalog the index was built from.
+    """
+
+    def __init__(self, vocabulary, offsets, doc_ids, weights, num_docs):
+        self.vocabulary = vocabulary  # term -> term id
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.num_docs = num_docs
+
+    @classmethod
+    def build(cls, records, k1=1.2, b=0.75, title_weight=2):
+        term_ids = {}
+        postings = []  # per term: {row id: term frequency}
+        doc_lengths = np.zeros(len(records))
+
+        for row_id, record in enumerate(records):
+            tokens = tokenize(record.get("title")) * title_weight + tokenize(record.get("desc"))
+            doc_lengths[row_id] = len(tokens)
+            for token in tokens:
+                term_id = term_ids.setdefault(token, len(term_ids))
+                if term_id == len(postings):
+                    postings.append({})
+                postings[term_id][row_id] = postings[term_id].get(row_id, 0) + 1
+
+        num_docs = len(records)
+        average_length = doc_lengths.mean() if num_docs else 0.0
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        np.cumsum([len(docs) for docs in postings], out=offsets[1:])
+        doc_ids = np.fromiter((row_id for docs in postings for row_id in docs), dtype=np.int32, count=offsets[-1])
+        frequencies = np.fromiter((tf for docs in postings for tf in docs.values()), dtype=np.float64, count=offsets[-1])
+
+        document_frequency = np.diff(offsets).astype(np.float64)
+        idf = np.log(1 + (num_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = k1 * (1 - b + b * doc_lengths[doc_ids] / max(average_length, 1e-9))
+        weights = np.repeat(idf, np.diff(offsets)) * frequencies * (k1 + 1) / (frequencies + norm)
+
+        return cls(term_ids, offsets, doc_ids, weights.astype(np.float32), num_docs)
+
+    def save(self, path, stamp=None):
+        """Write the index to path atomically, so readers never see a partly written file"""
+        terms = sorted(self.vocabulary, key=self.vocabulary.__getitem__)
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                        dir=os.path.dirname(path) or ".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    terms=np.array(terms, dtype=str),
+                    offsets=self.offsets,
+                    doc_ids=self.doc_ids,
+                    weights=self.weights,
+                    num_docs=np.array(self.num_docs),
+                    stamp=stamp if stamp is not None else np.zeros(3, dtype=np.int64)
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, stamp=None):
+        """Load a saved index, or return None when stamp shows it was built from another version of the data"""
+        with np.load(path) as data:
+            if stamp is not None and not np.array_equal(data["stamp"], stamp):
+                return None
+            vocabulary = {term: term_id for term_id, term in enumerate(data["terms"].tolist())}
+            return cls(vocabulary, data["offsets"], data["doc_ids"], data["weights"], int(data["num_docs"]))
+
+    def scores(self, query):
+        """BM25 score of every row for a free-text query"""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for token in set(tokenize(query)):
+            term_id = self.vocabulary.get(token)
+            if term_id is not None:
+                start, end = self.offsets[term_id], self.offsets[term_id + 1]
+                scores[self.doc_ids[start:end]] += self.weights[start:end]
+        return scores
+
+    def search(self, query, k=10, rows=None):
+        """
+        Top-k (row id, score) pairs for a query, best first
+
+        rows restricts the results to those row ids, e.g. a
+        WorkoutCatalog.rows() lookup. Rows that match no query term are
+        never returned.
+        """
+        scores = self.scores(query)
+        if rows is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            candidate_scores = scores[rows]
+        else:
+            rows = np.arange(self.num_docs)
+            candidate_scores = scores
+
+        matched = np.flatnonzero(candidate_scores > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-candidate_scores[matched], k - 1)[:k]]
+        # Best first; ties keep catalog order
+        matched = matched[np.lexsort((rows[matched], -candidate_scores[matched]))]
+        return [(int(rows[i]), float(candidate_scores[i])) for i in matched]
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_workout_search_index(workout_file="data/workouts_cleaned.json") -> WorkoutSearchIndex:
+    """
+    Return the search index for a workout file
+
+    The index is loaded from its file next to the dataset when that file
+    matches the dataset's size and modification time; otherwise it is
+    rebuilt from the catalog and saved there for the next process.
+    """
+    index = _indexes.get(workout_file)
+    if index is None:
+        with _lock:
+            index = _indexes.get(workout_file)
+            if index is None:
+                index = _load_or_build(workout_file, get_workout_catalog(workout_file))
+                _indexes[workout_file] = index
+    return index
+
+
+def _load_or_build(workout_file, catalog: WorkoutCatalog):
+    path = index_path(workout_file)
+    stamp = _source_stamp(workout_file)
+    if os.path.exists(path):
+        try:
+            index = WorkoutSearchIndex.load(path, stamp)
+            if index is not None and index.num_docs == len(catalog):
+                return index
+        except Exception as e:  # truncated or corrupt files fail in many ways (BadZipFile, EOFError, ...)
+            print(f"Warning: Could not read search index {path}, rebuilding it: {e}")
+
+    index = WorkoutSearchIndex.build(catalog.records)
+    try:
+        index.save(path, stamp)
+    except OSError as e:
+        print(f"Warning: Could not save search index to {path}: {e}")
+    return index
+
+
+def reset_workout_search_indexes():
+    """Drop the loaded indexes so the next use reloads them"""
+    with _lock:
+        _indexes.clear()
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from diet_workout_planning.diet.creativity_engine import MealCreativityEngine
+from diet_workout_planning.diet.food_model import (
+    DailyPlan, DietaryRequirements, DietGuideGroup, FoodDatabase, FoodItem, Meal, MealAssignment, MealType,
+    WeeklyPlan
+)
+from diet_workout_planning.diet.restrictions import get_food_restrictions
+
+FOODS = [
+    ("Cheese, feta", DietGuideGroup.DAIRY, 260.0),
+    ("Cheese, cheddar", DietGuideGroup.DAIRY, 400.0),
+    ("Milk, whole", DietGuideGroup.DAIRY, 150.0),
+    ("Yogurt, plain", DietGuideGroup.DAIRY, 100.0),
+    ("Fish, salmon", DietGuideGroup.SEAFOOD, 200.0),
+    ("Fish, cod", DietGuideGroup.SEAFOOD, 90.0),
+    ("Shrimp, cooked", DietGuideGroup.SEAFOOD, 100.0),
+    ("Tomato, raw", DietGuideGroup.RED_ORANGE_VEGETABLES, 20.0),
+    ("Pepper, red", DietGuideGroup.RED_ORANGE_VEGETABLES, 30.0),
+    ("Olive oil", DietGuideGroup.OIL, 120.0),
+    ("Avocado", DietGuideGroup.OIL, 160.0),
+    ("Lemon", DietGuideGroup.FRUITS, 20.0),
+    ("Apple", DietGuideGroup.FRUITS, 95.0),
+    ("Rice, brown", DietGuideGroup.WHOLE_GRAINS, 215.0),
+    ("Oats", DietGuideGroup.WHOLE_GRAINS, 150.0),
+    ("Almonds", DietGuideGroup.NUTS_SEEDS_SOY, 170.0),
+    ("Tofu", DietGuideGroup.NUTS_SEEDS_SOY, 90.0),
+    ("Spinach, raw", DietGuideGroup.DARK_GREEN_VEGETABLES, 7.0),
+]
+
+
+def make_food_db():
+    food_db = FoodDatabase()
+    for food_id, (name, group, calories) in enumerate(FOODS, start=1):
+        food_db.foods[food_id] = FoodItem(id=food_id, name=name, diet_guide_group=group, calories=calories,
+                                          proteins=5.0, meal_suitability={meal_type: True for meal_type in MealType})
+    return food_db
+
+
+def make_plan(food_db, allowed):
+    rng = random.Random(0)
+    plan = WeeklyPlan()
+    for day_of_week in range(1, 8):
+        day = DailyPlan(day_of_week=day_of_week)
+        for meal_type in MealType:
+            meal = Meal(meal_type=meal_type)
+            for food_id in rng.sample(allowed, 3):
+                food = food_db.get_by_id(food_id)
+                meal.add_food(MealAssignment(food_id=food_id, food_name=food.name, quantity=1.0,
+                                             calories=food.calories, proteins=food.proteins,
+                                             diet_guide_group=food.diet_guide_group))
+            day.meals[meal_type] = meal
+        plan.days.append(day)
+    return plan
+
+
+@pytest.mark.parametrize("flavor_exploration", [0.0, 1.0])
+def test_enhanced_plans_never_add_restricted_foods(flavor_exploration):
+    food_db = make_food_db()
+    requirements = DietaryRequirements(restrictions=["cheese", "fish"])
+    restricted = get_food_restrictions(food_db).excluded_food_ids(requirements.restrictions)
+    assert restricted
+    plan = make_plan(food_db, [food_id for food_id in food_db.foods if food_id not in restricted])
+    engine = MealCreativityEngine(food_db)
+
+    for seed in range(20):
+        random.seed(seed)
+        enhanced = engine.enhance_meal_plan(plan, creativity_level=1.0, flavor_exploration=flavor_exploration,
+                                            maintain_nutrition=False, requirements=requirements)
+        added = {food.food_id for day in enhanced.days for meal in day.meals.values() for food in meal.food_items}
+        assert not added & restricted
@@ -0,0 +1,57 @@
+import dataclasses
+
+import pytest
+
+from diet_workout_planning.diet.food_model import DietGuideGroup, Meal, MealAssignment, MealType
+
+
+def assignment(food_id, quantity, calories=100.0, proteins=10.0, group=DietGuideGroup.FRUITS):
+    return MealAssignment(food_id=food_id, food_name=f"food {food_id}", quantity=quantity,
+                          calories=calories, proteins=proteins, diet_guide_group=group)
+
+
+def make_meal():
+    meal = Meal(meal_type=MealType.LUNCH)
+    meal.add_food(assignment(1, 1.0))
+    meal.add_food(assignment(2, 2.0, calories=50.0, group=DietGuideGroup.DAIRY))
+    return meal
+
+
+def test_quantities_cannot_change_in_place():
+    meal = make_meal()
+    assert meal.total_calories == 200.0
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        meal.food_items[0].quantity = 3.0
+
+
+def test_quantity_edit_updates_totals():
+    meal = make_meal()
+    assert meal.total_calories == 200.0
+    meal.replace_food(0, dataclasses.replace(meal.food_items[0], quantity=3.0))
+    assert meal.total_calories == 400.0
+    assert meal.group_totals[DietGuideGroup.FRUITS] == 3.0
+
+
+def test_direct_item_edits_are_noticed():
+    meal = make_meal()
+    assert meal.total_calories == 200.0
+
+    # Same length, different assignment
+    meal.food_items[0] = dataclasses.replace(meal.food_items[0], quantity=3.0)
+    assert meal.total_calories == 400.0
+    assert meal.total_proteins == 50.0
+
+    meal.food_items.append(assignment(3, 1.0, calories=25.0))
+    assert meal.total_calories == 425.0
+
+    del meal.food_items[1]
+    assert meal.total_calories == 325.0
+    assert DietGuideGroup.DAIRY not in meal.group_totals or meal.group_totals[DietGuideGroup.DAIRY] == 0
+
+
+def test_clone_keeps_totals_independent():
+    meal = make_meal()
+    copy = meal.clone()
+    copy.replace_food(1, dataclasses.replace(copy.food_items[1], quantity=4.0))
+    assert meal.total_calories == 200.0
+    assert copy.total_calories == 300.0
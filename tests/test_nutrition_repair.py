@@ -0,0 +1,101 @@
+import pytest
+
+from diet_workout_planning.diet.food_model import (
+    Constraint, ConstraintOperation, ConstraintType, DailyPlan, DietaryRequirements, DietGuideGroup, FoodDatabase,
+    FoodItem, Meal, MealAssignment, MealType, WeeklyPlan
+)
+from diet_workout_planning.diet.nutrition_repair import RepairTargets, repair_daily_nutrition, violated_days
+from diet_workout_planning.diet.plan_validator import PlanValidator
+
+DAIRY = DietGuideGroup.DAIRY.value
+FRUITS = DietGuideGroup.FRUITS.value
+
+
+def make_food_db():
+    food_db = FoodDatabase()
+    for food_id, name, group, calories in [(1, "yogurt", DAIRY, 500.0), (2, "apple", FRUITS, 100.0)]:
+        food_db.foods[food_id] = FoodItem(id=food_id, name=name, diet_guide_group=group, calories=calories,
+                                          proteins=5.0, meal_suitability={meal_type: True for meal_type in MealType})
+    return food_db
+
+
+def make_plan(food_db, *days):
+    """One day per argument, each mapping meal types to {food id: servings}"""
+    plan = WeeklyPlan()
+    for day_of_week, quantities in enumerate(days, start=1):
+        day = DailyPlan(day_of_week=day_of_week)
+        for meal_type, foods in quantities.items():
+            meal = Meal(meal_type=meal_type)
+            for food_id, quantity in foods.items():
+                food = food_db.get_by_id(food_id)
+                meal.add_food(MealAssignment(food_id=food_id, food_name=food.name, quantity=quantity,
+                                             calories=food.calories, proteins=food.proteins,
+                                             diet_guide_group=food.diet_guide_group))
+            day.meals[meal_type] = meal
+        plan.days.append(day)
+    return plan
+
+
+def test_over_cap_day_with_conflicting_group_minimums_keeps_its_calorie_band():
+    food_db = make_food_db()
+    # 3400 kcal against a 2000 kcal cap, and 6 servings of dairy need 3000 kcal on their own
+    plan = make_plan(food_db, {
+        MealType.BREAKFAST: {1: 2.0, 2: 1.0},
+        MealType.LUNCH: {1: 2.0, 2: 1.0},
+        MealType.DINNER: {1: 2.0, 2: 1.0},
+    })
+    targets = RepairTargets(calorie_ranges=[(1500.0, 2000.0)], meal_balance=(0.2, 0.45),
+                            group_minimums=[(frozenset([DAIRY]), 6.0), (frozenset([FRUITS]), 2.0)])
+
+    assert repair_daily_nutrition(plan, food_db, targets) == 1
+
+    day = plan.days[0]
+    assert 1500.0 <= day.total_calories <= 2000.0
+    for meal in day.meals.values():
+        assert 0.2 <= meal.total_calories / day.total_calories <= 0.45
+        assert type(meal.total_calories) is float
+    # Calories and meal balance hold; only the impossible group minimum is given up
+    relaxed = RepairTargets(calorie_ranges=targets.calorie_ranges, meal_balance=targets.meal_balance)
+    assert not violated_days(plan, food_db, relaxed).any()
+
+
+def test_feasible_day_meets_every_target():
+    food_db = make_food_db()
+    plan = make_plan(food_db, {
+        MealType.BREAKFAST: {1: 1.0, 2: 1.0},
+        MealType.LUNCH: {1: 2.0, 2: 1.0},
+        MealType.DINNER: {1: 2.0, 2: 1.0},
+    })
+    targets = RepairTargets(calorie_ranges=[(1500.0, 2400.0)], meal_balance=(0.2, 0.45),
+                            group_minimums=[(frozenset([DAIRY]), 4.0), (frozenset([FRUITS]), 2.0)])
+
+    assert repair_daily_nutrition(plan, food_db, targets) == 1
+    assert not violated_days(plan, food_db, targets).any()
+    assert plan.days[0].total_calories == pytest.approx(2400.0, rel=1e-4)
+
+
+def test_repaired_plan_passes_validation_with_a_missing_meal():
+    food_db = make_food_db()
+    requirements = DietaryRequirements(constraints=[
+        Constraint(name="Daily Calories", type=ConstraintType.DAILY, attribute="calories",
+                   operation=ConstraintOperation.RANGE, value=[1500.0, 2000.0]),
+        Constraint(name="Meal Calorie Balance", type=ConstraintType.DAILY, attribute="meal_balance",
+                   operation=ConstraintOperation.RANGE, value=[0.2, 0.6]),
+        Constraint(name=DietGuideGroup.FRUITS, type=ConstraintType.DAILY, attribute="diet_guide_group",
+                   operation=ConstraintOperation.GREATER_EQUAL, value=2.0),
+    ])
+    # The second day has no dinner: meal balance applies to its breakfast and lunch only
+    plan = make_plan(
+        food_db,
+        {MealType.BREAKFAST: {1: 1.0, 2: 1.0}, MealType.LUNCH: {1: 2.0, 2: 1.0}, MealType.DINNER: {1: 2.0}},
+        {MealType.BREAKFAST: {1: 0.5, 2: 1.0}, MealType.LUNCH: {1: 4.0, 2: 1.0}},
+    )
+    validator = PlanValidator(requirements, food_db, num_days=2)
+    assert not validator.validate(plan).valid[0]
+
+    targets = RepairTargets.from_requirements(requirements, num_days=2)
+    assert repair_daily_nutrition(plan, food_db, targets) == 2
+
+    result = validator.validate(plan)
+    assert result.valid[0], result.violated()
+    assert result.slack[0, result.labels.index(("Meal Calorie Balance", 2, MealType.DINNER))] == float("inf")